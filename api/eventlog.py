@@ -0,0 +1,74 @@
+from flask import Blueprint, jsonify, request
+
+from simulation.eventlog import KINDS, EventReader, list_runs, run_path
+from api.sessions import current_world
+
+def build_eventlog_bp(worlds):
+    bp = Blueprint("eventlog", __name__)
+
+    def reader(name: str) -> EventReader:
+        """Lecteur du journal `name` ; journal du run en cours du monde courant : segment en cours écrit d'abord."""
+        ctx = current_world(worlds)
+        with ctx["lock"]:
+            log = ctx["events"]
+            if log is not None and log.name == name:
+                log.sync()
+        return EventReader(run_path(name))
+
+    @bp.get("/eventlog")
+    def api_eventlog_runs():
+        ctx = current_world(worlds)
+        log = ctx["events"]
+        return jsonify({"current": log.name if log is not None else None, "runs": list_runs()})
+
+    @bp.get("/eventlog/<name>")
+    def api_eventlog_info(name):
+        """Méta-données du journal et nombre d'événements par type sur ?t0=&t1=."""
+        try:
+            r = reader(name)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 404
+        t0 = max(0, request.args.get("t0", 0, type=int))
+        t1 = request.args.get("t1", None, type=int)
+        meta = {k: v for k, v in r.meta.items() if k != "species"}
+        return jsonify(dict(meta, ok=True, species=r.species, totals=r.totals(t0, t1)))
+
+    @bp.get("/eventlog/<name>/replay")
+    def api_eventlog_replay(name):
+        """?t= : effectifs et énergie moyenne par espèce après le step t, recalculés depuis le journal."""
+        try:
+            r = reader(name)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 404
+        t = request.args.get("t", None, type=int)
+        if t is None or t < 0:
+            return jsonify({"ok": False, "error": "t doit être un entier >= 0"}), 400
+        state = r.replay(t)
+        species = {}
+        for u, sp in state["species"].items():
+            row = species.setdefault(sp or "unknown", {"count": 0, "energy": 0})
+            row["count"] += 1
+            row["energy"] += state["energy"][u]
+        for row in species.values():
+            row["energy_mean"] = row.pop("energy") / row["count"]
+        return jsonify({"ok": True, "t": t, "individuals": len(state["species"]), "species": species})
+
+    @bp.get("/eventlog/<name>/per_step")
+    def api_eventlog_per_step(name):
+        """
+        ?kind=hunt&by=species|prey&t0=&t1= : événements par step et par espèce
+        (ex. proies tuées par espèce de prédateur).
+        """
+        kind = request.args.get("kind", "hunt")
+        by = request.args.get("by", "species")
+        if kind not in KINDS or by not in ("species", "prey"):
+            return jsonify({"ok": False, "error": f"kind : {', '.join(KINDS)} ; by : species, prey"}), 400
+        try:
+            r = reader(name)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 404
+        t0 = max(0, request.args.get("t0", 0, type=int))
+        t1 = request.args.get("t1", None, type=int)
+        return jsonify({"ok": True, "kind": kind, "by": by, "series": r.per_step(KINDS.index(kind), t0, t1, by)})
+
+    return bp
@@ -0,0 +1,60 @@
+import copy
+import os
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from simulation.export import available_formats, export_path, history_csv, list_exports, read_chunks
+from api.sessions import current_world
+
+MIMETYPES = {
+    ".parquet": "application/vnd.apache.parquet",
+    ".arrow": "application/vnd.apache.arrow.file",
+    ".csv": "text/csv",
+}
+
+def build_export_bp(worlds):
+    bp = Blueprint("export", __name__)
+
+    @bp.get("/export")
+    def api_exports():
+        ctx = current_world(worlds)
+        rec = ctx["export"]
+        return jsonify({
+            "formats": list(available_formats()),
+            "current": rec.sink.name if rec is not None else None,
+            "files": list_exports(),
+        })
+
+    @bp.get("/export/history.csv")
+    def api_export_history():
+        """Historique d'effectifs du monde courant en CSV, généré par blocs de steps (sans fichier)."""
+        ctx = current_world(worlds)
+        chunk = max(1, request.args.get("chunk", 1000, type=int))
+        with ctx["lock"]:
+            # copie (taille bornée par max_rows) : la boucle serveur continue pendant l'envoi
+            history = copy.deepcopy(ctx["state"].history)
+        return Response(stream_with_context(history_csv(history, chunk)), mimetype="text/csv",
+                        headers={"Content-Disposition": "attachment; filename=history.csv"})
+
+    @bp.get("/export/<name>")
+    def api_export_file(name):
+        """Fichier d'export servi par morceaux ; Parquet / Arrow du run en cours : disponible à la fin du run."""
+        try:
+            path = export_path(name)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        ctx = current_world(worlds)
+        with ctx["lock"]:
+            rec = ctx["export"]
+            if rec is not None and name.startswith(rec.sink.name + "."):
+                if rec.sink.fmt != "csv":
+                    return jsonify({"ok": False, "error": "Export en cours (fichier complet à la fin du run)"}), 409
+                rec.flush()
+        if not os.path.isfile(path):
+            return jsonify({"ok": False, "error": f"Export introuvable: {name}"}), 404
+        mimetype = MIMETYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        size = os.path.getsize(path)  # CSV d'un run en cours : servi jusqu'au dernier lot écrit
+        return Response(stream_with_context(read_chunks(path, limit=size)), mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename={name}", "Content-Length": str(size)})
+
+    return bp
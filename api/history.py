@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, request
+
+from api.sessions import current_world
+
+HISTORY_BUCKETS = 200
+HISTORY_MAX_BUCKETS = 2000
+
+def build_history_bp(worlds):
+    bp = Blueprint("history", __name__)
+
+    @bp.get("/history")
+    def api_history():
+        """
+        ?t0=&t1=&buckets=&species=URI (répétable) : min / max / moyenne par
+        intervalle, taille bornée par `buckets` quelle que soit la durée du run.
+        """
+        ctx = current_world(worlds)
+        buckets = min(request.args.get("buckets", HISTORY_BUCKETS, type=int), HISTORY_MAX_BUCKETS)
+        species = request.args.getlist("species") or None
+        with ctx["lock"]:
+            q = ctx["state"].history.query(
+                t0=max(0, request.args.get("t0", 0, type=int)),
+                t1=request.args.get("t1", None, type=int),
+                buckets=max(1, buckets),
+                species=species,
+            )
+        return jsonify(q)
+
+    return bp
@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, jsonify, request
+
+from api.sessions import current_world
+from simulation.metrics import StepProfile, sum_gauges
+
+PROFILE_MAX_STEPS = 1000
+
+def build_metrics_bp(worlds, metrics):
+    bp = Blueprint("metrics", __name__)
+
+    @bp.get("/metrics")
+    def api_metrics():
+        # format texte Prometheus : temps par phase, compteurs, reasoner, jauges
+        text = metrics.render(sum_gauges(worlds.contexts()), worlds.reasoner.stats.snapshot())
+        return Response(text, mimetype="text/plain; version=0.0.4")
+
+    @bp.post("/metrics/profile")
+    def api_profile_start():
+        """{"steps": N} : capture cProfile des N prochains steps du monde courant."""
+        data = request.get_json(silent=True) or {}
+        steps = data.get("steps", 20)
+        if not isinstance(steps, int) or isinstance(steps, bool) or not 0 < steps <= PROFILE_MAX_STEPS:
+            return jsonify({"ok": False, "error": f"steps : entier entre 1 et {PROFILE_MAX_STEPS}"}), 400
+        ctx = current_world(worlds)
+        with ctx["lock"]:
+            ctx["profile"] = StepProfile(steps)
+        return jsonify({"ok": True, "steps": steps})
+
+    @bp.get("/metrics/profile")
+    def api_profile():
+        ctx = current_world(worlds)
+        prof = ctx["profile"]
+        if prof is None:
+            return jsonify({"ok": False, "error": "Aucune capture"}), 404
+        return jsonify(dict(prof.report(), ok=True))
+
+    return bp
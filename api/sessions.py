@@ -0,0 +1,68 @@
+from flask import Blueprint, abort, g, jsonify, request
+
+from simulation.registry import RegistryFull
+
+SESSION_COOKIE = "eco_session"
+SESSION_HEADER = "X-Session-Id"
+
+def session_id():
+    """Session de la requête : en-tête, ?session=, puis cookie."""
+    return request.headers.get(SESSION_HEADER) or request.args.get("session") or request.cookies.get(SESSION_COOKIE)
+
+def create_world(worlds):
+    """(sid, ctx) d'une nouvelle session ; 503 si max_worlds est atteint sans monde évinçable."""
+    try:
+        return worlds.create()
+    except RegistryFull as e:
+        resp = jsonify({"ok": False, "error": str(e)})
+        resp.status_code = 503
+        abort(resp)
+
+def current_world(worlds) -> dict:
+    """
+    ctx du monde de la session courante ; nouvelle session (cookie posé en
+    réponse) seulement au premier contact, sans id. Id inconnu ou évincé : 404
+    (cookie effacé : la requête suivante ouvre une nouvelle session).
+    """
+    sid = session_id()
+    if not sid:
+        sid, ctx = create_world(worlds)
+        g.new_session = sid
+        return ctx
+    ctx = worlds.get(sid)
+    if ctx is None:
+        resp = jsonify({"ok": False, "error": "Session inconnue ou expirée (POST /api/sessions pour en ouvrir une)"})
+        resp.status_code = 404
+        if sid == request.cookies.get(SESSION_COOKIE):
+            resp.delete_cookie(SESSION_COOKIE)
+        abort(resp)
+    return ctx
+
+def build_sessions_bp(worlds):
+    bp = Blueprint("sessions", __name__)
+
+    @bp.after_app_request
+    def set_session_cookie(resp):
+        sid = g.pop("new_session", None)
+        if sid:
+            resp.set_cookie(SESSION_COOKIE, sid, httponly=True, samesite="Lax")
+        return resp
+
+    @bp.post("/sessions")
+    def api_create_session():
+        sid, _ = create_world(worlds)
+        resp = jsonify({"ok": True, "session": sid})
+        resp.set_cookie(SESSION_COOKIE, sid, httponly=True, samesite="Lax")
+        return resp
+
+    @bp.get("/sessions")
+    def api_sessions():
+        # mémoire par session (hors ontologie partagée)
+        worlds.evict()
+        return jsonify(worlds.report())
+
+    @bp.delete("/sessions/<sid>")
+    def api_drop_session(sid):
+        return jsonify({"ok": worlds.drop(sid)})
+
+    return bp
@@ -1,115 +1,262 @@
 from flask import Blueprint, jsonify, request
-from rdflib import URIRef, RDF
-
-from ontology.species import is_subclass_of, local_name
-from ontology.loader import BIOLOGICAL_SPECIES, PLANT, AWO4
-from ontology.species import rebuild_species_mapping_and_rules, pop_by_species
-from graph.eats import auto_generate_eats_links_full, cleanup_dead_eats_links
-from simulation.rules import simulation_step_energy
-from simulation.stopping import update_history_and_check_stop
-
-def build_simulation_bp(ctx):
+from rdflib import URIRef
+
+from graph.overlay import remove_individual_triples
+from graph.foodweb import FoodWeb
+from simulation.world import ENGINES, add_individual, add_population, rebuild_rules, sync_world, meanfield_population, fast_forward
+from simulation.meanfield import meanfield_run
+from simulation.params import validate_params
+from simulation.scenario import load_scenario, parse_scenario, list_scenarios
+from simulation.runner import run_loop, start_run, advance
+from simulation.eventlog import close_log
+from simulation.export import close_export, resolve_format
+from simulation.view import writing
+from api.sessions import current_world
+
+def parse_seed(data: dict):
+    """Graine optionnelle du body ({"seed": int >= 0}) ; ValueError sinon."""
+    seed = data.get("seed")
+    if seed is None:
+        return None
+    if isinstance(seed, bool) or not isinstance(seed, int) or seed < 0:
+        raise ValueError("seed doit être un entier >= 0")
+    return seed
+
+def run_seed(ctx, data: dict):
+    """Graine d'un run : celle du body, sinon celle du scénario chargé (None : tirée)."""
+    seed = parse_seed(data)
+    return ctx["run_seed"] if seed is None else seed
+
+def parse_events(data: dict):
+    """Journal d'événements optionnel du body ({"events": bool}) ; ValueError sinon."""
+    events = data.get("events")
+    if events is not None and not isinstance(events, bool):
+        raise ValueError("events doit être un booléen")
+    return events
+
+def parse_export(data: dict):
+    """Export optionnel du body ({"export": "parquet" | "arrow" | "csv" | true}) ; ValueError si indisponible."""
+    export = data.get("export")
+    if export is None or export is False:
+        return None
+    return resolve_format(None if export is True else str(export))
+
+PREVIEW_STEPS = 200
+PREVIEW_MAX_STEPS = 10000
+
+def parse_meanfield(data: dict) -> dict:
+    """{"steps", "tol", "params"} des endpoints de champ moyen ; ValueError si invalide."""
+    steps = data.get("steps", PREVIEW_STEPS)
+    if isinstance(steps, bool) or not isinstance(steps, int) or not 1 <= steps <= PREVIEW_MAX_STEPS:
+        raise ValueError(f"steps doit être un entier entre 1 et {PREVIEW_MAX_STEPS}")
+    tol = data.get("tol")
+    if tol is not None and (isinstance(tol, bool) or not isinstance(tol, (int, float)) or tol <= 0):
+        raise ValueError("tol doit être un nombre > 0")
+    return {"steps": steps, "tol": tol, "params": validate_params(data.get("params") or {})}
+
+def build_simulation_bp(worlds):
     bp = Blueprint("simulation", __name__)
 
     @bp.post("/add_individual")
     def api_add_individual():
+        ctx = current_world(worlds)
         if ctx["state"].running:
             return jsonify({"ok": False, "error": "Simulation en cours"}), 400
 
         data = request.get_json(force=True)
-        species_uri = URIRef(data["species"])
+        try:
+            with writing(ctx):
+                u = add_individual(ctx, URIRef(data["species"]))
+                uri = ctx["ids"].uri(u)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        return jsonify({"ok": True, "id": str(uri)})
 
-        if not (is_subclass_of(ctx["base_g"], species_uri, BIOLOGICAL_SPECIES) or is_subclass_of(ctx["base_g"], species_uri, PLANT)):
-            return jsonify({"ok": False, "error": "Classe non supportée"}), 400
+    @bp.post("/populate")
+    def api_populate():
+        """
+        Ensemencement en un batch : {"population": {espèce: effectif}} ou
+        {"scenario": nom | objet} (scenarios/*.json) ; "reset": true vide le monde avant.
+        """
+        ctx = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        if ctx["state"].running and not data.get("reset"):
+            return jsonify({"ok": False, "error": "Simulation en cours"}), 400
 
-        uri = AWO4[f"{local_name(species_uri).lower()}{ctx['rng']()}"]
-        ctx["overlay_g"].add((uri, RDF.type, species_uri))
-        ctx["state"].active.add(uri)
-        ctx["state"].energy[uri] = ctx["state"].params["E_INIT"]
+        try:
+            scenario = data.get("scenario")
+            if scenario is None:
+                scenario = parse_scenario({"population": data.get("population")})
+            elif isinstance(scenario, str):
+                scenario = load_scenario(scenario)
+            else:
+                scenario = parse_scenario(scenario)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        if data.get("reset"):
+            run_loop(ctx).stop()
+        with writing(ctx):
+            if data.get("reset"):
+                _reset(ctx)
+            params = ctx["state"].params
+            old = dict(params)
+            params.update(scenario["params"])
+            try:
+                added = add_population(ctx, scenario["population"])
+            except ValueError as e:
+                params.clear()
+                params.update(old)
+                return jsonify({"ok": False, "error": str(e)}), 400
+            individuals = len(ctx["state"].active)
+            # moteur / graine du scénario : défauts des runs suivants (/api/start, /api/run)
+            if scenario["engine"] is not None:
+                ctx["engine"] = scenario["engine"]
+            if scenario["seed"] is not None:
+                ctx["run_seed"] = scenario["seed"]
+        if data.get("reset"):
+            ctx["feed"].reset()
+        return jsonify({
+            "ok": True,
+            "added": added,
+            "total": sum(added.values()),
+            "individuals": individuals,
+            "params": scenario["params"],
+            "seed": scenario["seed"],
+            "engine": scenario["engine"],
+        })
 
-        ctx["reasoner"].mark_dirty()
-        return jsonify({"ok": True, "id": str(uri)})
+    @bp.get("/scenarios")
+    def api_scenarios():
+        return jsonify(list_scenarios())
 
     @bp.post("/remove_individual")
     def api_remove_individual():
+        ctx = current_world(worlds)
         if ctx["state"].running:
             return jsonify({"ok": False, "error": "Simulation en cours"}), 400
 
         uri = URIRef(request.get_json(force=True)["id"])
 
         # remove
-        ctx["state"].active.discard(uri)
-        ctx["indiv_species"].pop(uri, None)
-        ctx["state"].energy.pop(uri, None)
-        for t in list(ctx["overlay_g"].triples((uri, None, None))) + list(ctx["overlay_g"].triples((None, None, uri))):
-            ctx["overlay_g"].remove(t)
-
-        cleanup_dead_eats_links(ctx["overlay_g"], ctx["state"].active)
-        ctx["reasoner"].mark_dirty()
+        with writing(ctx):
+            sync_world(ctx)  # individus ensemencés en mode lazy : URIRef internée au flush
+            u = ctx["ids"].lookup(uri)
+            if u is not None:
+                ctx["state"].active.discard(u)
+                ctx["indiv_species"].pop(u, None)
+                ctx["state"].energy.pop(u, None)
+                ctx["ids"].release(u)
+            remove_individual_triples(ctx["overlay_g"], uri)
+
+            ctx["reasoner"].mark_dirty()
         return jsonify({"ok": True})
 
     @bp.post("/auto_eats")
     def api_auto_eats():
+        ctx = current_world(worlds)
         if ctx["state"].running:
             return jsonify({"ok": False, "error": "Simulation en cours"}), 400
 
-        # reason + rebuild mapping/rules + edges
-        g = ctx["reasoner"].reasoned_graph(ctx["base_g"], ctx["overlay_g"], freeze_ok=False, frozen_reasoner=False)
-        rebuild_species_mapping_and_rules(
-            reasoned_g=g,
-            active=ctx["state"].active,
-            eats_cache=ctx["eats_cache"],
-            base_g=ctx["base_g"],
-            indiv_species=ctx["indiv_species"],
-            species_traits=ctx["species_traits"],
-            species_prey=ctx["species_prey"],
-            known_species=ctx["state"].known_species,
-        )
-        auto_generate_eats_links_full(ctx["overlay_g"], ctx["state"].active, ctx["indiv_species"], ctx["species_prey"])
-        ctx["reasoner"].mark_dirty()
-        return jsonify({"ok": True})
+        # reason + rebuild mapping/rules + réseau trophique (niveau espèces)
+        with writing(ctx):
+            rebuild_rules(ctx)
+            n = len(ctx["food_web"])
+        return jsonify({"ok": True, "species_edges": n})
+
+    @bp.post("/preview")
+    def api_preview():
+        """
+        Trajectoires attendues (modèle de champ moyen, déterministe) depuis la
+        population courante : {"steps", "tol", "params": {surcharges}} ; le monde n'est pas modifié.
+        """
+        ctx = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        try:
+            q = parse_meanfield(data)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        with writing(ctx):
+            if not ctx["state"].running:
+                rebuild_rules(ctx)  # traits / proies à jour pour la population courante
+            pop = meanfield_population(ctx)
+            params = dict(ctx["state"].params, **q["params"])
+            t0 = ctx["state"].t if ctx["state"].running else 0
+        # intégration hors lock : pop est une copie (histogrammes, rôles des espèces), le step suivant n'attend pas
+        res = meanfield_run(pop, params, q["steps"], q["tol"])
+        return jsonify(dict(res, ok=True, t0=t0))
+
+    @bp.post("/fast_forward")
+    def api_fast_forward():
+        """
+        Hors run : remplace la population par l'état du champ moyen après
+        {"steps"} steps (ou à l'équilibre : {"tol": 1e-3}) ; le run suivant part de là.
+        """
+        ctx = current_world(worlds)
+        if ctx["state"].running:
+            return jsonify({"ok": False, "error": "Simulation en cours"}), 400
+        data = request.get_json(silent=True) or {}
+        try:
+            q = parse_meanfield(data)
+            if q["params"]:
+                raise ValueError("params : non supporté ici (paramètres du monde)")
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        with writing(ctx):
+            rebuild_rules(ctx)
+            res = fast_forward(ctx, q["steps"], q["tol"])
+            individuals = len(ctx["state"].active)
+        return jsonify({
+            "ok": True,
+            "steps": res["steps"],
+            "equilibrium": res["equilibrium"],
+            "counts": res["counts"],
+            "individuals": individuals,
+        })
 
     @bp.post("/start")
     def api_start():
-        # 1) calc OWL une fois
-        g = ctx["reasoner"].reasoned_graph(ctx["base_g"], ctx["overlay_g"], freeze_ok=False, frozen_reasoner=False)
-
-        # 2) rebuild mapping + traits + prey rules
-        rebuild_species_mapping_and_rules(
-            reasoned_g=g,
-            active=ctx["state"].active,
-            eats_cache=ctx["eats_cache"],
-            base_g=ctx["base_g"],
-            indiv_species=ctx["indiv_species"],
-            species_traits=ctx["species_traits"],
-            species_prey=ctx["species_prey"],
-            known_species=ctx["state"].known_species,
-        )
-
-        # 3) init énergie manquante
-        for u in list(ctx["state"].active):
-            ctx["state"].energy.setdefault(u, ctx["state"].params["E_INIT"])
-
-        # 4) edges affichage (one-time)
-        auto_generate_eats_links_full(ctx["overlay_g"], ctx["state"].active, ctx["indiv_species"], ctx["species_prey"])
-
-        # 5) init history t=0
-        ctx["state"].history = {}
-        pop0 = pop_by_species(ctx["state"].active, ctx["indiv_species"])
-        for sp in set(list(pop0.keys())):
-            ctx["state"].known_species.add(sp)
-        for sp in ctx["state"].known_species:
-            ctx["state"].history[sp] = [len(pop0.get(sp, []))]
-
-        # 6) start
-        ctx["state"].t = 0
-        ctx["state"].frozen_reasoner = True
-        ctx["state"].running = True
-
-        return jsonify({"ok": True})
+        ctx = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        engine = data.get("engine", ctx["engine"])
+        if engine not in ENGINES:
+            return jsonify({"ok": False, "error": f"Moteur inconnu: {engine}"}), 400
+        try:
+            seed = run_seed(ctx, data)
+            events = parse_events(data)
+            export = parse_export(data)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        run_loop(ctx).stop()
+        start_run(ctx, engine=engine, seed=seed, events=events, export=export)
+        # graine effective : la renvoyer dans {"seed"} rejoue le même run
+        log, rec = ctx["events"], ctx["export"]
+        return jsonify({"ok": True, "engine": engine, "run": ctx["feed"].run, "seed": ctx["rng"].seed,
+                        "events": log.name if log is not None else None,
+                        "export": rec.sink.name if rec is not None else None})
     
     @bp.post("/reset")
     def api_reset():
+        ctx = current_world(worlds)
+        # stop boucle serveur (avant de prendre le lock : elle le prend à chaque step)
+        run_loop(ctx).stop()
+        with writing(ctx):
+            _reset(ctx)
+        ctx["feed"].reset()
+        return jsonify({"ok": True})
+
+    def _reset(ctx):
+        # journal / export du run interrompu
+        close_log(ctx)
+        close_export(ctx)
+
+        # paramètres / moteur / graine de la session (surchargés par un scénario)
+        ctx["state"].params.clear()
+        ctx["state"].params.update(ctx["defaults"]["params"])
+        ctx["engine"] = ctx["defaults"]["engine"]
+        ctx["run_seed"] = None
+
         # stop simulation
         ctx["state"].running = False
         ctx["state"].frozen_reasoner = False
@@ -120,84 +267,30 @@ def build_simulation_bp(ctx):
         ctx["state"].energy.clear()
         ctx["state"].history.clear()
         ctx["state"].known_species.clear()
+        ctx["state"].population = None
+        ctx["overlay_journal"].clear()
+        ctx["ids"].clear()
 
         # clear mappings
         ctx["indiv_species"].clear()
         ctx["species_traits"].clear()
         ctx["species_prey"].clear()
+        ctx["food_web"] = FoodWeb()
 
-        # clear overlay graph (individuals + eats edges)
+        # clear overlay graph (individuals)
         ctx["overlay_g"].remove((None, None, None))
 
         # mark reasoner dirty
         ctx["reasoner"].mark_dirty()
 
-        return jsonify({"ok": True})
-
 
     @bp.post("/step")
     def api_step():
-        if not ctx["state"].running:
+        ctx = current_world(worlds)
+        # delta du step (effectifs courants), pas l'historique complet : cf. /api/events
+        delta = advance(ctx)
+        if delta is None:
             return jsonify({"ok": False})
-
-        # wrappers lifecycle
-        def create_individual(species_str: str):
-            from simulation.lifecycle import create_individual as _create
-            return _create(
-                overlay_g=ctx["overlay_g"],
-                active=ctx["state"].active,
-                energy=ctx["state"].energy,
-                params=ctx["state"].params,
-                indiv_species=ctx["indiv_species"],
-                known_species=ctx["state"].known_species,
-                species_prey=ctx["species_prey"],
-                species_str=species_str,
-            )
-
-        def remove_individual(u):
-            from simulation.lifecycle import remove_individual as _remove
-            return _remove(
-                overlay_g=ctx["overlay_g"],
-                active=ctx["state"].active,
-                energy=ctx["state"].energy,
-                indiv_species=ctx["indiv_species"],
-                u=u,
-            )
-
-        simulation_step_energy(
-            overlay_g=ctx["overlay_g"],
-            active=ctx["state"].active,
-            energy=ctx["state"].energy,
-            params=ctx["state"].params,
-            indiv_species=ctx["indiv_species"],
-            species_traits=ctx["species_traits"],
-            species_prey=ctx["species_prey"],
-            create_individual_fn=create_individual,
-            remove_individual_fn=remove_individual,
-        )
-
-        ctx["state"].t += 1
-
-        status = update_history_and_check_stop(
-            active=ctx["state"].active,
-            indiv_species=ctx["indiv_species"],
-            history=ctx["state"].history,
-            known_species=ctx["state"].known_species,
-            t=ctx["state"].t,
-            params=ctx["state"].params,
-        )
-
-        if status:
-            ctx["state"].running = False
-            ctx["state"].frozen_reasoner = False
-
-        ctx["reasoner"].mark_dirty()
-
-        return jsonify({
-            "ok": True,
-            "t": ctx["state"].t,
-            "status": status,
-            "history": ctx["state"].history
-        })
+        return jsonify(dict(delta, ok=True))
 
     return bp
@@ -0,0 +1,104 @@
+import shutil
+
+from flask import Blueprint, jsonify, request
+
+from config import SNAPSHOT_EVERY
+from simulation.params import validate_params
+from simulation.runner import run_loop
+from simulation.view import writing
+from simulation.snapshot import Checkpoint, fork_world, list_snapshots, load_snapshot, save_snapshot, snapshot_path
+from api.sessions import create_world, current_world
+from api.simulation import parse_seed
+
+def parse_params(data: dict) -> dict:
+    """Surcharges {"params": {...}} d'un fork ; ValueError si invalides (cf. validate_params)."""
+    return validate_params(data.get("params") or {})
+
+def build_snapshots_bp(worlds):
+    bp = Blueprint("snapshots", __name__)
+
+    @bp.get("/snapshots")
+    def api_snapshots():
+        return jsonify(list_snapshots())
+
+    @bp.post("/snapshots")
+    def api_save_snapshot():
+        """{"name"} : sauvegarde le monde courant (pendant un run aussi : entre deux steps)."""
+        ctx = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        try:
+            path = snapshot_path(str(data.get("name", "")))
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        with ctx["lock"]:
+            summary = save_snapshot(ctx, path)
+        return jsonify(dict(summary, ok=True, name=data["name"]))
+
+    @bp.post("/snapshots/<name>/load")
+    def api_load_snapshot(name):
+        """Remplace le monde courant par le snapshot ; un run sauvegardé en cours reprend avec /api/run."""
+        ctx = current_world(worlds)
+        run_loop(ctx).stop()
+        try:
+            path = snapshot_path(name)
+            with writing(ctx):
+                summary = load_snapshot(ctx, path)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        return jsonify(dict(summary, ok=True, name=name, run=ctx["feed"].run))
+
+    @bp.delete("/snapshots/<name>")
+    def api_drop_snapshot(name):
+        try:
+            path = snapshot_path(name)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        shutil.rmtree(path, ignore_errors=True)
+        return jsonify({"ok": True})
+
+    @bp.post("/checkpoint")
+    def api_checkpoint():
+        """
+        {"name", "every"} : la boucle serveur sauvegarde le run dans le snapshot
+        `name` tous les `every` steps (et au dernier) ; {"name": null} désactive.
+        """
+        ctx = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        loop = run_loop(ctx)
+        if data.get("name") is None:
+            loop.checkpoint = None
+            return jsonify({"ok": True, "checkpoint": None})
+        every = data.get("every", SNAPSHOT_EVERY)
+        try:
+            path = snapshot_path(str(data["name"]))
+            if isinstance(every, bool) or not isinstance(every, int) or every < 1:
+                raise ValueError("every doit être un entier >= 1")
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        loop.checkpoint = Checkpoint(path, every)
+        return jsonify({"ok": True, "checkpoint": data["name"], "every": every})
+
+    @bp.post("/fork")
+    def api_fork():
+        """
+        Copie le monde courant (à son step t) dans une nouvelle session :
+        {"params": {surcharges}, "seed": int} ; le monde d'origine n'est pas modifié.
+        La nouvelle session est renvoyée (X-Session-Id / ?session=), le cookie ne change pas.
+        """
+        src = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        try:
+            params = parse_params(data)
+            seed = parse_seed(data)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        sid, dst = create_world(worlds)
+        try:
+            with src["lock"], writing(dst):
+                summary = fork_world(src, dst, params=params, seed=seed)
+        except ValueError as e:
+            worlds.drop(sid)
+            return jsonify({"ok": False, "error": str(e)}), 400
+        return jsonify(dict(summary, ok=True, session=sid, run=dst["feed"].run))
+
+    return bp
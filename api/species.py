@@ -1,12 +1,11 @@
 from flask import Blueprint, jsonify
 
-from ontology.species import list_species
-
-def build_species_bp(ctx):
+def build_species_bp(worlds):
     bp = Blueprint("species", __name__)
 
     @bp.get("/species")
     def api_species():
-        return jsonify(list_species(ctx["base_g"]))
+        # liste partagée par tous les mondes (ontologie commune)
+        return jsonify(worlds.species_list)
 
     return bp
@@ -1,42 +1,244 @@
-from flask import Blueprint, jsonify
+import numpy as np
+from flask import Blueprint, jsonify, request
 from rdflib.namespace import RDF
 
-from ontology.species import local_name
-from ontology.loader import AWO1, AWO4, EATS
+from ontology.species import local_name, trophic_levels, TROPHIC_LEVELS
+from ontology.loader import AWO1, AWO4
+from simulation.world import sync_world
+from simulation.ids import IdAllocator
+from simulation.view import read_view
+from api.sessions import current_world
 
-def build_state_bp(ctx):
+EDGES_PAGE = 500
+NODES_PAGE = 500
+NODES_MAX_PAGE = 10000
+
+NODE_FIELDS = ("id", "species", "levels", "types", "energy")
+DEFAULT_FIELDS = ("id", "types", "energy")
+
+def build_state_bp(worlds):
     bp = Blueprint("state", __name__)
 
-    def list_entities():
-        g = ctx["reasoner"].reasoned_graph(
-            ctx["base_g"], ctx["overlay_g"],
-            freeze_ok=True,
-            frozen_reasoner=ctx["state"].frozen_reasoner
+    def parse_query(present, tax):
+        """
+        Filtres / pagination / champs de la requête ; ValueError si invalide.
+        present : espèces du monde (sans ?species=, filtrées par ?level=) ; tax : TaxonomyIndex.
+        """
+        fields = request.args.get("fields")
+        fields = tuple(f for f in fields.split(",") if f) if fields else DEFAULT_FIELDS
+        bad = [f for f in fields if f not in NODE_FIELDS]
+        if bad:
+            raise ValueError(f"Champs inconnus: {', '.join(bad)} (possibles : {', '.join(NODE_FIELDS)})")
+        levels = request.args.getlist("level")
+        bad = [lvl for lvl in levels if lvl not in TROPHIC_LEVELS]
+        if bad:
+            raise ValueError(f"Niveaux inconnus: {', '.join(bad)} (possibles : {', '.join(TROPHIC_LEVELS)})")
+        return {
+            "fields": fields,
+            "species": species_filter(present, tax, request.args.getlist("species"), levels),
+            "offset": max(0, request.args.get("offset", 0, type=int)),
+            "limit": min(max(0, request.args.get("limit", NODES_PAGE, type=int)), NODES_MAX_PAGE),
+        }
+
+    def species_filter(present, tax, species, levels):
+        """Espèces retenues (None : pas de filtre) : ?species= et ?level= se combinent (intersection)."""
+        if not species and not levels:
+            return None
+        keep = set(species) if species else set(present)
+        if levels:
+            # TBox raisonnée : niveaux inférés (ex. Lion -> Carnivore via ses restrictions)
+            keep = {sp for sp in keep if set(trophic_levels(sp, tax)) & set(levels)}
+        return keep
+
+    def select(view, ids, keep):
+        """Ids (triés) dont l'espèce passe le filtre."""
+        if keep is not None:
+            sp = view.species
+            ids = [i for i in ids if sp.get(i) in keep]
+        return sorted(ids)
+
+    type_names = {}  # espèce -> noms locaux de ses types inférés (ontologie partagée par tous les mondes)
+
+    def local_types(types) -> list:
+        names = set()
+        for t in types:
+            ts = str(t)
+            if ts.startswith(str(AWO1)) or ts.startswith(str(AWO4)):
+                if "#" in ts:
+                    names.add(local_name(t))
+        return sorted(names)
+
+    def species_type_names(ctx, sp: str) -> list:
+        names = type_names.get(sp)
+        if names is None:
+            # premier accès : species_types remplit les caches du reasoner du monde (sous son lock)
+            with ctx["lock"]:
+                names = type_names[sp] = local_types(ctx["reasoner"].species_types(ctx["base_g"], sp))
+        return names
+
+    def reasoned_type_names(ctx, u) -> list:
+        # individu sans espèce connue : repli sur le graphe raisonné (seule lecture sous le lock)
+        with ctx["lock"]:
+            sync_world(ctx)
+            g = ctx["reasoner"].reasoned_graph(
+                ctx["base_g"], ctx["overlay_g"],
+                freeze_ok=True,
+                frozen_reasoner=ctx["state"].frozen_reasoner
+            )
+            return local_types(g.objects(u, RDF.type))
+
+    def entities(ctx, view, page, fields):
+        """Nœuds de la page ; types lus dans la table espèce -> types inférés (pas de reasoner)."""
+        species, energy, tax = view.species, view.energy, view.taxonomy
+        out = []
+        for i in page:
+            sp = species.get(i)
+            u = view.uri(i)
+            node = {}
+            if "id" in fields:
+                node["id"] = str(u)
+            if "species" in fields:
+                node["species"] = sp
+            if "levels" in fields:
+                node["levels"] = trophic_levels(sp, tax) if sp else []
+            if "types" in fields:
+                node["types"] = species_type_names(ctx, sp) if sp else reasoned_type_names(ctx, u)
+            if "energy" in fields:
+                node["energy"] = energy.get(i, None)
+            out.append(node)
+        return out
+
+    def list_edges(view, keep, new=None):
+        # arêtes individuelles matérialisées à la demande depuis le réseau trophique
+        sample = request.args.get("edges_sample", None, type=int)
+        pairs, total = view.food_web.individual_edges(
+            view.active, view.species,
+            offset=max(0, request.args.get("edges_offset", 0, type=int)),
+            limit=max(0, request.args.get("edges_limit", EDGES_PAGE, type=int)),
+            sample=sample if sample is None else max(0, sample),
+            species=keep,
+            new=new,
         )
-        entities = []
-        for u in sorted(ctx["state"].active, key=lambda x: str(x)):
-            types = set()
-            for t in g.objects(u, RDF.type):
-                ts = str(t)
-                if ts.startswith(str(AWO1)) or ts.startswith(str(AWO4)):
-                    if "#" in ts:
-                        types.add(local_name(t))
-            entities.append({
-                "id": str(u),
-                "types": sorted(types),
-                "energy": ctx["state"].energy.get(u, None)
-            })
-        return entities
+        uri = view.uri
+        edges = [{"source": str(uri(s)), "target": str(uri(o)), "pred": "eats"} for s, o in pairs]
+        return edges, total
+
+    def species_edges(view, keep):
+        return [
+            {"source": s, "target": o, "pred": "eats"}
+            for s, o in view.food_web.species_edges()
+            if keep is None or (s in keep and o in keep)
+        ]
+
+    def full_state(ctx, view, q):
+        nodes = select(view, view.active, q["species"])
+        page = nodes[q["offset"]:q["offset"] + q["limit"]]
+        edges, total = list_edges(view, q["species"])
+        return {
+            "version": view.version,
+            "delta": False,
+            "t": view.t,
+            "nodes": entities(ctx, view, page, q["fields"]),
+            "nodes_total": len(nodes),
+            "edges": edges,
+            "edges_total": total,
+            "species_edges": species_edges(view, q["species"]),
+        }
+
+    def delta_state(ctx, view, q, changes):
+        """Nœuds ajoutés / modifiés (paginés), ids retirés, arêtes touchant un nœud ajouté."""
+        added, removed, updated, web_changed = changes
+        keep = q["species"]
+        nodes = select(view, added | updated, keep)
+        page = nodes[q["offset"]:q["offset"] + q["limit"]]
+        gone = sorted(i for i, sp in removed.items() if keep is None or sp in keep)
+        # réseau trophique reconstruit : toutes les arêtes ont pu changer
+        edges, total = list_edges(view, keep, new=None if web_changed else added)
+        return {
+            "version": view.version,
+            "delta": True,
+            "t": view.t,
+            "nodes": entities(ctx, view, page, q["fields"]),
+            "nodes_total": len(nodes),
+            "removed": [str(IdAllocator.mint(i, removed[i])) for i in gone],
+            "edges": edges,
+            "edges_total": total,
+            "edges_reset": web_changed,
+            "species_edges": species_edges(view, keep),
+        }
 
-    def list_edges():
-        edges = []
-        for s, _, o in ctx["overlay_g"].triples((None, EATS, None)):
-            if s in ctx["state"].active and o in ctx["state"].active:
-                edges.append({"source": str(s), "target": str(o), "pred": "eats"})
-        return edges
+    def summary(view, keep):
+        """Effectifs et énergie par espèce, calculés sur la vue (hors lock)."""
+        rows = [
+            dict(st, species=sp, levels=trophic_levels(sp, view.taxonomy))
+            for sp, st in sorted(view.stats.items())
+            if keep is None or sp in keep
+        ]
+        return {
+            "t": view.t,
+            "total": len(view.active),
+            "species": rows,
+            "species_edges": species_edges(view, keep),
+        }
 
     @bp.get("/state")
     def api_state():
-        return jsonify({"nodes": list_entities(), "edges": list_edges()})
+        """
+        ?offset=&limit= : page de nœuds (triés par id) ; ?species= / ?level= (répétables) :
+        filtres ; ?fields=id,species,levels,types,energy ; ?since=<version> : seulement
+        ce qui a changé depuis cette version ; ?view=summary : agrégats par espèce.
+        Servi depuis un WorldView (simulation/view.py) : sans le lock du monde,
+        donc sans attendre le step en cours (vue du step précédent dans ce cas).
+        """
+        ctx = current_world(worlds)
+        view = read_view(ctx)
+        try:
+            q = parse_query(view.species.values(), view.taxonomy)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        if request.args.get("view") == "summary":
+            return jsonify(summary(view, q["species"]))
+
+        since = request.args.get("since", None, type=int)
+        changes = view.since(since) if since is not None else None
+        if changes is None:
+            # pas de version, ou version trop ancienne : état complet
+            return jsonify(full_state(ctx, view, q))
+        return jsonify(delta_state(ctx, view, q, changes))
+
+    @bp.get("/grid")
+    def api_grid():
+        """
+        Effectifs par cellule du run spatial : {"width", "height", "t", "cells"} (cells[y][x]) ;
+        ?species= / ?level= : filtres ; ?block=k : cellules regroupées par blocs k x k.
+        """
+        ctx = current_world(worlds)
+        with ctx["lock"]:
+            state = ctx["state"]
+            if state.engine != "spatial" or state.population is None:
+                return jsonify({"ok": False, "error": "Pas de run spatial en cours (engine=spatial)"}), 400
+            try:
+                q = parse_query(state.population.species, ctx["reasoner"].taxonomy(ctx["base_g"]))
+            except ValueError as e:
+                return jsonify({"ok": False, "error": str(e)}), 400
+            pop = state.population
+            mask = None
+            if q["species"] is not None:
+                mask = np.array([sp in q["species"] for sp in pop.species], dtype=bool)
+            cells = pop.grid_counts(state.params["GRID_W"], state.params["GRID_H"], mask)
+            k = max(1, request.args.get("block", 1, type=int))
+            if k > 1:
+                # blocs incomplets en bord de grille : complétés par des zéros
+                h, w = -(-cells.shape[0] // k), -(-cells.shape[1] // k)
+                padded = np.zeros((h * k, w * k), dtype=cells.dtype)
+                padded[:cells.shape[0], :cells.shape[1]] = cells
+                cells = padded.reshape(h, k, w, k).sum(axis=(1, 3))
+            return jsonify({
+                "width": int(cells.shape[1]),
+                "height": int(cells.shape[0]),
+                "t": state.t,
+                "cells": cells.tolist(),
+            })
 
     return bp
@@ -0,0 +1,106 @@
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from config import RUN_RATE
+from simulation.world import ENGINES
+from simulation.runner import run_loop, start_run, snapshot
+from api.sessions import current_world
+from api.simulation import run_seed, parse_events, parse_export
+
+KEEPALIVE = 15.0  # s sans step avant un commentaire SSE ":"
+
+def parse_cursor(raw):
+    """"run:t" -> (run, t) ; None si absent / invalide."""
+    try:
+        run, t = str(raw).split(":")
+        return int(run), int(t)
+    except (TypeError, ValueError):
+        return None
+
+def _sse(event: str, data: dict, id_: str = None) -> str:
+    head = f"id: {id_}\n" if id_ else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def build_stream_bp(worlds):
+    bp = Blueprint("stream", __name__)
+
+    @bp.post("/run")
+    def api_run():
+        """Lance (ou reprend) la boucle serveur ; body optionnel {"rate", "engine", "seed", "events", "export"}."""
+        ctx = current_world(worlds)
+        data = request.get_json(silent=True) or {}
+        rate = data.get("rate", RUN_RATE)
+        engine = data.get("engine", ctx["engine"])
+        if engine not in ENGINES:
+            return jsonify({"ok": False, "error": f"Moteur inconnu: {engine}"}), 400
+        try:
+            seed = run_seed(ctx, data)
+            events = parse_events(data)
+            export = parse_export(data)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        if not ctx["state"].running:
+            start_run(ctx, engine=engine, seed=seed, events=events, export=export)
+        run_loop(ctx).start(rate)
+        return jsonify({"ok": True, "run": ctx["feed"].run, "rate": run_loop(ctx).rate, "seed": ctx["rng"].seed})
+
+    @bp.post("/pause")
+    def api_pause():
+        ctx = current_world(worlds)
+        run_loop(ctx).stop()
+        return jsonify({"ok": True, "t": ctx["state"].t})
+
+    def catch_up(ctx, cursor):
+        """(cursor, deltas) ou (None, snapshot) si le curseur n'est plus servi par le feed."""
+        if cursor is not None:
+            run, deltas = ctx["feed"].since(*cursor)
+            if deltas is not None:
+                return cursor, deltas
+        with ctx["lock"]:
+            snap = snapshot(ctx)
+        return None, snap
+
+    @bp.get("/events")
+    def api_events():
+        """Polling : deltas après ?cursor=run:t, ou snapshot complet pour (re)partir."""
+        ctx = current_world(worlds)
+        cursor, payload = catch_up(ctx, parse_cursor(request.args.get("cursor")))
+        if cursor is None:
+            return jsonify({"snapshot": payload, "cursor": f"{payload['run']}:{payload['t']}"})
+        last = payload[-1]["t"] if payload else cursor[1]
+        return jsonify({"deltas": payload, "cursor": f"{cursor[0]}:{last}"})
+
+    @bp.get("/stream")
+    def api_stream():
+        """SSE : `snapshot` puis un event `step` par step ; reprise via Last-Event-ID ou ?cursor=."""
+        ctx = current_world(worlds)
+        cursor = parse_cursor(request.headers.get("Last-Event-ID") or request.args.get("cursor"))
+
+        def gen():
+            nonlocal cursor
+            while True:
+                if cursor is None:
+                    _, snap = catch_up(ctx, None)
+                    cursor = (snap["run"], snap["t"])
+                    yield _sse("snapshot", snap, f"{snap['run']}:{snap['t']}")
+
+                run, deltas = ctx["feed"].wait(cursor[0], cursor[1], timeout=KEEPALIVE)
+                if deltas is None:
+                    cursor = None  # nouveau run ou retard : on repart d'un snapshot
+                    continue
+                if not deltas:
+                    yield ": keepalive\n\n"
+                    continue
+                for d in deltas:
+                    yield _sse("step", d, f"{run}:{d['t']}")
+                cursor = (run, deltas[-1]["t"])
+
+        return Response(
+            stream_with_context(gen()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    return bp
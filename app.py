@@ -1,59 +1,61 @@
 import os
-import random
 from flask import Flask, send_from_directory
 
-from config import ONTO_PATH, SIMULATION_PARAMS
-from simulation.state import SimulationState
+from config import ONTO_PATH, ONTO_CACHE, SIMULATION_PARAMS, SIMULATION_ENGINE, LAZY_OVERLAY, SESSION_MAX_WORLDS, SESSION_TTL, METRICS_ENABLED, EVENT_LOG, RUN_EXPORT
 
-from ontology.loader import load_base_graph, new_overlay_graph
+from ontology.cache import load_ontology
 from ontology.reasoner import ReasonerCache
 from ontology.species import EatsRulesCache
+from simulation.registry import WorldRegistry
+from simulation.metrics import Metrics
 
 from api.species import build_species_bp
 from api.state import build_state_bp
 from api.simulation import build_simulation_bp
+from api.stream import build_stream_bp
+from api.sessions import build_sessions_bp
+from api.history import build_history_bp
+from api.metrics import build_metrics_bp
+from api.snapshots import build_snapshots_bp
+from api.eventlog import build_eventlog_bp
+from api.export import build_export_bp
 
 
-def create_app() -> Flask:
+def create_app(onto_path: str = ONTO_PATH) -> Flask:
     app = Flask(__name__)
 
-    # --- Load graphs ---
-    base_g = load_base_graph(ONTO_PATH)
-    overlay_g = new_overlay_graph()
-
-    # --- Simulation state ---
-    state = SimulationState(params=SIMULATION_PARAMS)
-
-    # --- Caches & mappings ---
+    # --- Caches ---
     reasoner = ReasonerCache()
     eats_cache = EatsRulesCache()
 
-    indiv_species = {}   # URIRef -> species_str
-    species_traits = {}  # species_str -> traits dict
-    species_prey = {}    # pred_species_str -> [prey_species_str]
+    # --- Load graphs (cache disque : base parsée + TBox raisonnée) ---
+    base_g, onto_meta = load_ontology(onto_path, reasoner, eats_cache, use_cache=ONTO_CACHE)
 
-    # rng helper (stable format used in original code)
-    def rng4():
-        return random.randint(1000, 9999)
+    # --- métriques du processus (temps par phase, compteurs) : /api/metrics ---
+    metrics = Metrics() if METRICS_ENABLED else None
 
-    # --- shared context dict (simple & explicite) ---
-    ctx = {
-        "base_g": base_g,
-        "overlay_g": overlay_g,
-        "state": state,
-        "reasoner": reasoner,
-        "eats_cache": eats_cache,
-        "indiv_species": indiv_species,
-        "species_traits": species_traits,
-        "species_prey": species_prey,
-        "rng": rng4,
-    }
+    # --- un monde (ctx dict : overlay, état, mappings) par session ; ontologie partagée ---
+    worlds = WorldRegistry(
+        base_g, reasoner, eats_cache, onto_meta,
+        params=SIMULATION_PARAMS, engine=SIMULATION_ENGINE, lazy_overlay=LAZY_OVERLAY,
+        max_worlds=SESSION_MAX_WORLDS, ttl=SESSION_TTL, metrics=metrics, event_log=EVENT_LOG,
+        export=RUN_EXPORT,
+    )
+    app.extensions["worlds"] = worlds  # accès hors requête (bench/, scripts)
 
     # --- API blueprints ---
     api_prefix = "/api"
-    app.register_blueprint(build_species_bp(ctx), url_prefix=api_prefix)
-    app.register_blueprint(build_state_bp(ctx), url_prefix=api_prefix)
-    app.register_blueprint(build_simulation_bp(ctx), url_prefix=api_prefix)
+    app.register_blueprint(build_species_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_state_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_simulation_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_stream_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_sessions_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_history_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_snapshots_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_eventlog_bp(worlds), url_prefix=api_prefix)
+    app.register_blueprint(build_export_bp(worlds), url_prefix=api_prefix)
+    if metrics is not None:
+        app.register_blueprint(build_metrics_bp(worlds, metrics), url_prefix=api_prefix)
 
     # --- UI route ---
     @app.get("/")
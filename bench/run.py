@@ -0,0 +1,357 @@
+"""
+Benchmarks du pipeline de step, du raisonnement, de l'extraction des règles
+et des handlers API, sur des écosystèmes synthétiques (bench/synthetic.py).
+
+    python -m bench.run --sizes 100,1000,10000 --species 5,50 --steps 20
+    python -m bench.run --check                # compare à bench/baseline.json
+    python -m bench.run --save-baseline        # remplace la baseline
+
+--check compare des temps calibrés : chaque run mesure aussi une charge de
+référence (calibrate : dicts / sets Python et NumPy, sans code du dépôt) et
+les temps de la baseline sont mis à l'échelle du rapport des deux
+calibrations ; une baseline sans calibration n'est comparable que sur la
+machine qui l'a produite.
+
+Chaque mesure est le meilleur temps sur --repeat essais ; --memory ajoute un
+passage sous tracemalloc (pic d'allocation Python + NumPy, en Mo). Les cibles
+liées au graphe RDF (raisonnement, /api/state, ...) sont limitées à --rdf-max
+individus, auto_generate_eats_links_full (quadratique) à --eats-max.
+"""
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import rdflib
+from rdflib import Graph
+
+from config import SIMULATION_PARAMS
+from app import create_app
+from ontology.cache import load_ontology
+from ontology.reasoner import ReasonerCache
+from ontology.species import EatsRulesCache, rebuild_species_mapping_and_rules
+from graph.eats import auto_generate_eats_links_full
+from simulation.state import ActiveSet
+from simulation.world import new_world, add_population, sync_world, rebuild_rules, begin_run, step_world
+from simulation.view import writing
+from bench.synthetic import write_ontology, population_for
+
+BASELINE_PATH = "bench/baseline.json"
+CELL_OCCUPANCY = 4
+
+def bench_params(population: Dict[str, int]) -> dict:
+    """
+    Paramètres du bench : pas d'arrêt avant la fin des steps, plantes loin de K ;
+    moteur spatial : grille carrée d'environ CELL_OCCUPANCY individus par cellule.
+    """
+    side = max(1, math.ceil(math.sqrt(sum(population.values()) / CELL_OCCUPANCY)))
+    return dict(
+        SIMULATION_PARAMS,
+        K_PLANT=max(SIMULATION_PARAMS["K_PLANT"], 2 * max(population.values(), default=1)),
+        GRID_W=side,
+        GRID_H=side,
+        K_CELL=max(SIMULATION_PARAMS["K_CELL"], 4 * CELL_OCCUPANCY),
+        stop_conditions=["timeout"],
+        max_steps=10 ** 9,
+    )
+
+def populate(ctx, population: Dict[str, int]) -> None:
+    """Ensemencement + overlay à jour (les cibles mesurées ensuite ne paient pas le flush du journal)."""
+    with writing(ctx):
+        add_population(ctx, population)
+        sync_world(ctx)
+
+def measure(fn: Callable[[], object], repeat: int, memory: bool, setup: Optional[Callable[[], None]] = None) -> dict:
+    """
+    Meilleur temps sur `repeat` appels (+ pic mémoire d'un appel supplémentaire) ;
+    `setup` (non chronométré) avant chaque appel, fn peut renvoyer des compteurs.
+    """
+    best, extra = math.inf, {}
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()  # pas de collecte des déchets d'une mesure précédente pendant celle-ci
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        if dt < best:
+            best, extra = dt, (out if isinstance(out, dict) else {})
+    row = {"seconds": best}
+    if extra.get("steps"):
+        row["steps_per_s"] = extra["steps"] / best
+        row["ind_steps_per_s"] = extra["individuals"] / best
+        row["seconds"] = best / extra["steps"]  # par step
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        fn()
+        row["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return row
+
+def calibrate(repeat: int = 5) -> float:
+    """Temps de la charge de référence (meilleur sur `repeat`), indépendante du code du dépôt."""
+    def work():
+        d = {i: i * 7 % 1009 for i in range(200_000)}
+        odd = {v for v in d.values() if v & 1}
+        sorted(d.items(), key=lambda kv: kv[1])
+        a = np.random.default_rng(0).random(1_000_000)
+        np.sort(a)
+        np.bincount((a * 1000).astype(np.int64))
+        return len(odd)
+    return measure(work, repeat, False)["seconds"]
+
+def rewind(ctx, engine: str) -> Callable[[], None]:
+    """Setup : remet la population initiale (capturée maintenant) et relance un run graine 0."""
+    state = ctx["state"]
+    active, energy, indiv_species = list(state.active), dict(state.energy), dict(ctx["indiv_species"])
+
+    def setup():
+        with writing(ctx):
+            state.active = ActiveSet(active)
+            state.energy = dict(energy)
+            ctx["indiv_species"].clear()
+            ctx["indiv_species"].update(indiv_species)
+            ctx["overlay_journal"].clear()  # l'overlay n'a pas bougé (mode lazy)
+            begin_run(ctx, engine, seed=0)
+    return setup
+
+def run_steps(ctx, steps: int) -> Callable[[], dict]:
+    """`steps` step_world ; compte individus x steps."""
+    def fn():
+        state = ctx["state"]
+        done = individuals = 0
+        for _ in range(steps):
+            if not state.running:
+                break
+            step_world(ctx)
+            done += 1
+            individuals += state.population.n_alive if state.population is not None else len(state.active)
+        return {"steps": done, "individuals": individuals}
+    return fn
+
+def bench_core(path: str, species: int, n: int, args, rows: List[dict]) -> None:
+    """Cibles hors Flask pour une taille de population."""
+    reasoner, eats_cache = ReasonerCache(), EatsRulesCache()
+    base_g, meta = load_ontology(path, reasoner, eats_cache)
+    population = population_for(meta["species"], n)
+    params = bench_params(population)
+
+    def world(engine: str):
+        ctx = new_world(base_g, reasoner.fork(), eats_cache, meta, params=params, engine=engine)
+        populate(ctx, population)
+        rebuild_rules(ctx)
+        return ctx
+
+    def add(target, row):
+        rows.append(dict(row, target=target, individuals=n, species=species))
+        print(_fmt(rows[-1]), file=sys.stderr)
+
+    fresh = {}
+
+    def new_empty():
+        fresh["ctx"] = new_world(base_g, reasoner.fork(), eats_cache, meta, params=params)
+    add("populate", measure(lambda: add_population(fresh["ctx"], population), args.repeat, args.memory, setup=new_empty))
+
+    for engine in ("dict", "array", "spatial", "aggregate"):
+        ctx = world(engine)
+        add(f"step_{engine}", measure(run_steps(ctx, args.steps), args.repeat, args.memory, setup=rewind(ctx, engine)))
+
+    if n > args.rdf_max:
+        return
+    ctx = world("dict")
+    r = ctx["reasoner"]
+
+    def reason():
+        r.mark_dirty()
+        r.reasoned_graph(base_g, ctx["overlay_g"], freeze_ok=False, frozen_reasoner=False)
+    add("reasoned_graph", measure(reason, args.repeat, args.memory))
+
+    g = r.reasoned_graph(base_g, ctx["overlay_g"], freeze_ok=False, frozen_reasoner=False)
+    state = ctx["state"]
+    add("rebuild_mapping", measure(lambda: rebuild_species_mapping_and_rules(
+        reasoned_g=g, active=state.active, eats_cache=eats_cache, base_g=base_g,
+        indiv_species=ctx["indiv_species"], species_traits=ctx["species_traits"],
+        species_prey=ctx["species_prey"], known_species=state.known_species,
+        taxonomy=r.taxonomy(base_g), uri_of=ctx["ids"].uri,
+    ), args.repeat, args.memory))
+
+    if n <= args.eats_max:
+        # fonction historique sur URIRef : on lui donne la vue RDF des individus
+        uri = ctx["ids"].uri
+        active = {uri(i) for i in state.active}
+        indiv_species = {uri(i): sp for i, sp in ctx["indiv_species"].items()}
+        add("eats_links_full", measure(lambda: auto_generate_eats_links_full(
+            Graph(), active, indiv_species, ctx["species_prey"],
+        ), args.repeat, args.memory))
+
+def bench_api(app, species: int, n: int, args, rows: List[dict]) -> None:
+    """/api/start, /api/step, /api/state via le test client, sur un monde peuplé directement."""
+    client = app.test_client()
+    worlds = app.extensions["worlds"]
+    sid = client.post("/api/sessions").get_json()["session"]
+    headers = {"X-Session-Id": sid}
+    ctx = worlds.peek(sid)
+    population = population_for(worlds.species_list, n)
+    ctx["state"].params.update(bench_params(population))
+    populate(ctx, population)
+
+    def add(target, row):
+        rows.append(dict(row, target=target, individuals=n, species=species))
+        print(_fmt(rows[-1]), file=sys.stderr)
+
+    def start():
+        ctx["reasoner"].mark_dirty()
+        client.post("/api/start", json={"engine": "dict", "seed": 0}, headers=headers)
+    add("api_start", measure(start, 1, args.memory))
+    setup = rewind(ctx, "dict")
+
+    def steps():
+        done = individuals = 0
+        for _ in range(args.steps):
+            if not client.post("/api/step", headers=headers).get_json()["ok"]:
+                break
+            done += 1
+            individuals += len(ctx["state"].active)
+        return {"steps": done, "individuals": individuals}
+    add("api_step", measure(steps, args.repeat, args.memory, setup=setup))
+
+    if n <= args.rdf_max:
+        add("api_state", measure(lambda: client.get("/api/state", headers=headers), args.repeat, args.memory, setup=setup))
+    client.delete(f"/api/sessions/{sid}")
+
+def scaling(rows: List[dict]) -> Dict[str, dict]:
+    """Courbes temps = f(individus) par (cible, espèces) et exposant ajusté (pente log-log)."""
+    curves: Dict[str, list] = {}
+    for r in rows:
+        if r["target"] != "load_ontology":
+            curves.setdefault(f"{r['target']}/{r['species']}", []).append((r["individuals"], r["seconds"]))
+    out = {}
+    for key, pts in curves.items():
+        pts.sort()
+        out[key] = {"points": pts}
+        if len(pts) >= 2 and all(x > 0 and y > 0 for x, y in pts):
+            out[key]["exponent"] = round(float(np.polyfit(np.log([x for x, _ in pts]), np.log([y for _, y in pts]), 1)[0]), 2)
+    return out
+
+def row_key(r: dict) -> str:
+    return f"{r['target']}/{r['species']}/{r['individuals']}"
+
+def compare(rows: List[dict], baseline: dict, tolerance: float, min_delta: float = 1e-3, scale: float = 1.0) -> List[dict]:
+    """
+    Mesures plus lentes que la baseline de plus de `tolerance` (et d'au moins min_delta s) ;
+    scale : calibration courante / calibration de la baseline (temps de la baseline multipliés).
+    """
+    ref = baseline.get("results", {})
+    out = []
+    for r in rows:
+        old = ref.get(row_key(r))
+        if old is None:
+            continue
+        old *= scale
+        ratio = r["seconds"] / old if old else math.inf
+        if ratio > 1 + tolerance and r["seconds"] - old > min_delta:
+            out.append({"key": row_key(r), "baseline": old, "seconds": r["seconds"], "ratio": round(ratio, 2)})
+    return out
+
+def _fmt(r: dict) -> str:
+    s = f"{r['target']:<16} species={r['species']:<4} n={r['individuals']:<8} {r['seconds'] * 1e3:10.2f} ms"
+    if "steps_per_s" in r:
+        s += f"  {r['steps_per_s']:8.1f} steps/s  {r['ind_steps_per_s']:.3g} ind.steps/s"
+    if "peak_mb" in r:
+        s += f"  peak {r['peak_mb']:.1f} MB"
+    return s
+
+def _ints(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks du pipeline de simulation.")
+    ap.add_argument("--sizes", type=_ints, default=[100, 1000, 10000], help="individus, ex. 100,1000,1000000")
+    ap.add_argument("--species", type=_ints, default=[5, 50], help="espèces, ex. 5,50,500")
+    ap.add_argument("--steps", type=int, default=20, help="steps par mesure de step")
+    ap.add_argument("--repeat", type=int, default=3, help="essais par mesure (meilleur temps)")
+    ap.add_argument("--rdf-max", type=int, default=20000, help="taille max pour les cibles RDF / /api/state")
+    ap.add_argument("--eats-max", type=int, default=2000, help="taille max pour auto_generate_eats_links_full")
+    ap.add_argument("--only", nargs="*", default=None, choices=("core", "api"), help="groupes de cibles")
+    ap.add_argument("--memory", action="store_true", help="pic mémoire (tracemalloc) par cible")
+    ap.add_argument("--out", default=None, help="fichier JSON de résultats (sinon stdout)")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="code de sortie 1 si régression vs baseline")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="ralentissement toléré (0.5 = +50%%)")
+    args = ap.parse_args(argv)
+    groups = set(args.only or ("core", "api"))
+
+    calibration = calibrate()
+    rows: List[dict] = []
+    with tempfile.TemporaryDirectory(prefix="eco-bench-") as tmp:
+        for species in args.species:
+            path = write_ontology(species, tmp)
+            # à froid : parse + clôture TBox + templates + écriture du cache disque
+            t0 = time.perf_counter()
+            load_ontology(path, ReasonerCache(), EatsRulesCache())
+            rows.append({"target": "load_ontology", "species": species, "individuals": 0, "seconds": time.perf_counter() - t0})
+            print(_fmt(rows[-1]), file=sys.stderr)
+
+            app = create_app(path) if "api" in groups else None
+            for n in args.sizes:
+                if "core" in groups:
+                    bench_core(path, species, n, args, rows)
+                if app is not None:
+                    bench_api(app, species, n, args, rows)
+
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "rdflib": rdflib.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "steps": args.steps,
+            "calibration": calibration,
+        },
+        "results": {row_key(r): r["seconds"] for r in rows},
+        "rows": rows,
+        "scaling": scaling(rows),
+    }
+
+    status = 0
+    if args.check:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            raise SystemExit(f"Baseline absente: {args.baseline} (créer avec --save-baseline)")
+        ref = baseline.get("meta", {}).get("calibration")
+        scale = calibration / ref if ref else 1.0
+        if not ref:
+            print("Baseline sans calibration : temps bruts (régénérer avec --save-baseline)", file=sys.stderr)
+        print(f"calibration: {calibration * 1e3:.2f} ms (x{scale:.2f} vs baseline)", file=sys.stderr)
+        result["regressions"] = compare(rows, baseline, args.tolerance, scale=scale)
+        for reg in result["regressions"]:
+            print(f"REGRESSION {reg['key']}: {reg['baseline'] * 1e3:.2f} -> {reg['seconds'] * 1e3:.2f} ms (x{reg['ratio']})", file=sys.stderr)
+        status = 1 if result["regressions"] else 0
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": result["meta"], "results": result["results"]}, f, indent=2, sort_keys=True)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    elif not args.save_baseline:
+        print(text)
+    return status
+
+if __name__ == "__main__":
+    raise SystemExit(main())
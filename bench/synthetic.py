@@ -0,0 +1,98 @@
+import os
+from typing import Dict, List
+
+import numpy as np
+from rdflib import BNode, Graph, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from ontology.loader import AWO1, AWO4, EATS, PLANT, BIOLOGICAL_SPECIES
+from ontology.species import local_name
+
+SYN = Namespace("http://example.org/ecosystem/synthetic#")
+
+# répartition des espèces et des individus entre niveaux trophiques
+SPECIES_MIX = {"plant": 0.4, "herbivore": 0.4, "carnivore": 0.2}
+INDIVIDUALS_MIX = {"plant": 0.85, "herbivore": 0.12, "carnivore": 0.03}
+PREY_PER_CARNIVORE = 3
+
+def _code(i: int) -> str:
+    """0 -> "A", 25 -> "Z", 26 -> "BA" ... (pas de chiffres : les URIs d'individus sont <espèce><id>)."""
+    s = ""
+    while True:
+        s = chr(ord("A") + i % 26) + s
+        i //= 26
+        if not i:
+            return s
+
+def _split(n: int, mix: Dict[str, float]) -> Dict[str, int]:
+    """n réparti selon `mix`, au moins 1 par niveau (le reste au premier)."""
+    out = {k: max(1, int(n * f)) for k, f in mix.items()}
+    first = next(iter(mix))
+    out[first] = max(1, n - sum(v for k, v in out.items() if k != first))
+    return out
+
+def _eats_some(g: Graph, cls: URIRef, prey: URIRef) -> None:
+    r = BNode()
+    g.add((r, RDF.type, OWL.Restriction))
+    g.add((r, OWL.onProperty, EATS))
+    g.add((r, OWL.someValuesFrom, prey))
+    g.add((cls, RDFS.subClassOf, r))
+
+def synthetic_ontology(n_species: int, seed: int = 0) -> Graph:
+    """
+    TBox minimale au format de l'AWO : plantes (sous-classes de awo1:Plant),
+    herbivores (mangent awo1:Plant) et carnivores (mangent PREY_PER_CARNIVORE
+    espèces d'herbivores tirées au hasard), tous sous awo4:BiologicalSpecies.
+    """
+    rng = np.random.default_rng(seed)
+    g = Graph()
+    g.bind("awo1", AWO1)
+    g.bind("awo4", AWO4)
+    g.bind("syn", SYN)
+
+    for cls in (AWO1.Animal, PLANT, AWO1.Herbivore, AWO1.Carnivore, BIOLOGICAL_SPECIES):
+        g.add((cls, RDF.type, OWL.Class))
+    g.add((EATS, RDF.type, OWL.ObjectProperty))
+    g.add((AWO1.Herbivore, RDFS.subClassOf, AWO1.Animal))
+    g.add((AWO1.Carnivore, RDFS.subClassOf, AWO1.Animal))
+
+    counts = _split(n_species, SPECIES_MIX)
+    herbivores = []
+    for level, parent in (("plant", PLANT), ("herbivore", AWO1.Herbivore), ("carnivore", AWO1.Carnivore)):
+        for i in range(counts[level]):
+            cls = SYN[f"{level.capitalize()}{_code(i)}"]
+            g.add((cls, RDF.type, OWL.Class))
+            g.add((cls, RDFS.subClassOf, parent))
+            if level == "plant":
+                continue
+            g.add((cls, RDFS.subClassOf, BIOLOGICAL_SPECIES))
+            if level == "herbivore":
+                _eats_some(g, cls, PLANT)
+                herbivores.append(cls)
+            else:
+                k = min(PREY_PER_CARNIVORE, len(herbivores))
+                for j in rng.choice(len(herbivores), size=k, replace=False).tolist():
+                    _eats_some(g, cls, herbivores[j])
+    return g
+
+def write_ontology(n_species: int, directory: str, seed: int = 0) -> str:
+    """Écrit l'ontologie synthétique en RDF/XML (format lu par ontology/loader.py) ; renvoie le chemin."""
+    path = os.path.join(directory, f"synthetic-{n_species}-{seed}.owl")
+    if not os.path.exists(path):
+        synthetic_ontology(n_species, seed).serialize(path, format="xml")
+    return path
+
+def population_for(species_list: List[str], n_individuals: int) -> Dict[str, int]:
+    """Effectifs par espèce : INDIVIDUALS_MIX entre niveaux, réparti uniformément dans chaque niveau."""
+    ours = [sp for sp in species_list if sp.startswith(str(SYN))]  # sans awo1:Plant / awo4:BiologicalSpecies
+    levels = {lvl: [sp for sp in ours if local_name(sp).lower().startswith(lvl)] for lvl in SPECIES_MIX}
+    totals = _split(n_individuals, INDIVIDUALS_MIX)
+    out = {}
+    for lvl, members in levels.items():
+        if not members:
+            continue
+        base, extra = divmod(totals[lvl], len(members))
+        for i, sp in enumerate(members):
+            if base + (i < extra):
+                out[sp] = base + (i < extra)
+    return out
@@ -2,6 +2,44 @@
 
 ONTO_PATH = "AfricanWildlifeOntology4_enriched.owl"
 
+# cache disque (.onto_cache/ à côté de l'ontologie) : graphe parsé + TBox raisonnée,
+# invalidé automatiquement quand le fichier OWL change
+ONTO_CACHE = True
+
+# "dict" : individus en URIRef (simulation/rules.py)
+# "array" : population en colonnes NumPy (simulation/vectorized.py)
+# "spatial" : colonnes NumPy sur une grille, interactions par cellule (simulation/spatial.py)
+# "aggregate" : histogrammes espèce x énergie, tirages binomiaux / hypergéométriques (simulation/aggregate.py)
+SIMULATION_ENGINE = "dict"
+
+# True : pendant les steps, naissances/morts ne touchent pas overlay_g ;
+# le graphe est resynchronisé en un batch quand /api/state ou le reasoner le lit
+LAZY_OVERLAY = True
+
+# boucle serveur (/api/run) : steps par seconde (0 = au plus vite)
+RUN_RATE = 4
+
+# un monde par session (cookie / X-Session-Id) : au plus SESSION_MAX_WORLDS (LRU),
+# évincé après SESSION_TTL secondes d'inactivité
+SESSION_MAX_WORLDS = 32
+SESSION_TTL = 3600
+
+# snapshots (snapshots/<nom>/) : /api/checkpoint sauvegarde le run de la boucle serveur
+# tous les SNAPSHOT_EVERY steps par défaut
+SNAPSHOT_EVERY = 100
+
+# journal d'événements (events/<run>/, simulation/eventlog.py) : naissances, broutages,
+# chasses, morts de faim de chaque run ; activable par run avec /api/start {"events": true}
+EVENT_LOG = False
+
+# export en colonnes de chaque run (exports/<run>.trajectory.* / .outcome.*, simulation/export.py) :
+# None (pas d'export), "parquet" / "arrow" (pyarrow) ou "csv" ; par run avec /api/start {"export": "parquet"}
+RUN_EXPORT = None
+
+# /api/metrics (Prometheus) : temps par phase de step, compteurs, reasoner ;
+# coût : un perf_counter par phase
+METRICS_ENABLED = True
+
 SIMULATION_PARAMS = {
     "E_MAX": 10,
     "E_INIT": 6,
@@ -21,7 +59,20 @@ SIMULATION_PARAMS = {
 
     "HUNT_PROB": 0.35,
 
+    # moteur spatial : grille torique GRID_W x GRID_H, pas de déplacement max MOVE (cellules),
+    # K_CELL plantes max par cellule (remplace K_PLANT), H_CELL : demi-saturation du broutage par cellule
+    "GRID_W": 8,
+    "GRID_H": 8,
+    "MOVE": 1,
+    "K_CELL": 8,
+    "H_CELL": 4,
+
     "stable_window": 15,
     "stable_range": 1,
-    "max_steps": 300
+    "max_steps": 300,
+
+    # conditions d'arrêt (simulation/stopping.py), évaluées dans l'ordre : "nom" ou {"name": ..., **options}
+    # ex. {"name": "trophic_extinction", "level": "carnivore"}, {"name": "oscillation", "window": 60},
+    #     {"name": "cv_stable", "max_cv": 0.05}
+    "stop_conditions": ["extinction", "stable", "timeout"],
 }
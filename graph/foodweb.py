@@ -0,0 +1,129 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+class FoodWeb:
+    """
+    Réseau trophique au niveau espèces : matrice creuse espèce x espèce
+    (format CSR : indptr / indices), construite depuis species_prey.
+    Les arêtes individu -> individu ne sont jamais stockées ; elles sont
+    énumérées à la demande (pagination ou échantillonnage).
+    """
+
+    def __init__(self, species_prey: Optional[Dict[str, List[str]]] = None):
+        species_prey = species_prey or {}
+        names = set(species_prey)
+        for prey in species_prey.values():
+            names.update(prey)
+        self.species = sorted(names)
+        self.species_index = {sp: i for i, sp in enumerate(self.species)}
+
+        indptr = [0]
+        indices = []
+        for sp in self.species:
+            indices.extend(sorted(self.species_index[p] for p in set(species_prey.get(sp, [])) if p != sp))
+            indptr.append(len(indices))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+
+    def __len__(self) -> int:
+        """Nombre d'arêtes espèce -> espèce."""
+        return len(self.indices)
+
+    def prey_of(self, sp: str) -> List[str]:
+        i = self.species_index.get(sp)
+        if i is None:
+            return []
+        return [self.species[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def eats(self, pred_sp: str, prey_sp: str) -> bool:
+        return prey_sp in self.prey_of(pred_sp)
+
+    def species_edges(self) -> List[Tuple[str, str]]:
+        return [(pred, prey) for pred in self.species for prey in self.prey_of(pred)]
+
+    def as_matrix(self) -> np.ndarray:
+        """Matrice dense (booléens) alignée sur self.species."""
+        m = np.zeros((len(self.species), len(self.species)), dtype=bool)
+        rows = np.repeat(np.arange(len(self.species)), np.diff(self.indptr))
+        m[rows, self.indices] = True
+        return m
+
+    # --- arêtes individuelles (matérialisées à la demande) ---
+
+    def _blocks(
+        self,
+        active: Set[int],
+        indiv_species: Dict[int, str],
+        species: Optional[Set[str]] = None,
+        new: Optional[Set[int]] = None,
+    ):
+        """
+        Blocs (membres prédateurs, membres proies) dans un ordre stable.
+        species : seulement les arêtes entre ces espèces ; new : seulement
+        les arêtes dont une extrémité est dans `new` (nouveaux x tous + anciens x nouveaux).
+        """
+        members = defaultdict(list)
+        for u in active:
+            sp = indiv_species.get(u)
+            if sp in self.species_index and (species is None or sp in species):
+                members[sp].append(u)
+        for sp in members:
+            members[sp].sort()
+
+        blocks = []
+        for pred, prey in self.species_edges():
+            preds, preys = members.get(pred), members.get(prey)
+            if not (preds and preys):
+                continue
+            if new is None:
+                blocks.append((preds, preys))
+                continue
+            new_preds = [u for u in preds if u in new]
+            new_preys = [u for u in preys if u in new]
+            if new_preds:
+                blocks.append((new_preds, preys))
+            if new_preys:
+                old_preds = [u for u in preds if u not in new]
+                if old_preds:
+                    blocks.append((old_preds, new_preys))
+        sizes = np.array([len(a) * len(b) for a, b in blocks], dtype=np.int64)
+        return blocks, sizes
+
+    def edge_count(self, active: Set[int], indiv_species: Dict[int, str]) -> int:
+        return int(self._blocks(active, indiv_species)[1].sum())
+
+    def individual_edges(
+        self,
+        active: Set[int],
+        indiv_species: Dict[int, str],
+        offset: int = 0,
+        limit: Optional[int] = None,
+        sample: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+        species: Optional[Set[str]] = None,
+        new: Optional[Set[int]] = None,
+    ) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Arêtes (prédateur, proie) entre ids d'individus actifs : une page
+        [offset, offset + limit) ou `sample` arêtes tirées sans remise.
+        `species` / `new` : voir _blocks. Renvoie (arêtes, nombre total d'arêtes).
+        """
+        blocks, sizes = self._blocks(active, indiv_species, species, new)
+        total = int(sizes.sum())
+        if sample is not None:
+            rng = rng or np.random.default_rng()
+            k = np.sort(rng.choice(total, size=min(sample, total), replace=False)) if total else np.zeros(0, dtype=np.int64)
+        else:
+            end = total if limit is None else min(total, offset + limit)
+            k = np.arange(min(offset, total), end, dtype=np.int64)
+
+        ends = np.cumsum(sizes)
+        b = np.searchsorted(ends, k, side="right")
+        local = k - (ends[b] - sizes[b]) if len(k) else k
+        edges = []
+        for bi, li in zip(b.tolist(), local.tolist()):
+            preds, preys = blocks[bi]
+            edges.append((preds[li // len(preys)], preys[li % len(preys)]))
+        return edges, total
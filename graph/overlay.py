@@ -0,0 +1,57 @@
+from typing import Dict, Set
+
+from rdflib import Graph, URIRef, RDF
+
+def remove_individual_triples(overlay_g: Graph, u: URIRef) -> None:
+    for t in list(overlay_g.triples((u, None, None))) + list(overlay_g.triples((None, None, u))):
+        overlay_g.remove(t)
+
+class OverlayJournal:
+    """
+    Naissances / morts de la simulation pas encore reportées dans overlay_g.
+    Le graphe n'est mis à jour qu'en un batch, quand quelqu'un le lit
+    (/api/state, reasoner, export). Indexé par id d'individu : les URIRef
+    ne sont créées qu'au flush (simulation/ids.py::IdAllocator).
+    """
+
+    def __init__(self):
+        self.born: Dict[int, str] = {}   # id -> species_str
+        self.dead: Set[int] = set()
+
+    def record_birth(self, u: int, species_str: str) -> None:
+        self.born[u] = species_str
+
+    def record_births(self, first: int, count: int, species_str: str) -> None:
+        """Ids consécutifs first .. first + count - 1 (ensemencement en bloc)."""
+        self.born.update(dict.fromkeys(range(first, first + count), species_str))
+
+    def record_death(self, u: int) -> None:
+        # né et mort depuis le dernier flush : rien à reporter
+        if self.born.pop(u, None) is None:
+            self.dead.add(u)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.born or self.dead)
+
+    def clear(self) -> None:
+        self.born.clear()
+        self.dead.clear()
+
+    def flush(self, overlay_g: Graph, ids) -> int:
+        """Applique le journal à overlay_g (`ids` : IdAllocator du monde) ; renvoie le nombre d'individus ajoutés / retirés."""
+        if not self.dirty:
+            return 0
+        n = len(self.dead) + len(self.born)
+
+        for i in self.dead:
+            u = ids.uris.get(i)
+            if u is not None:
+                remove_individual_triples(overlay_g, u)
+                ids.release(i)
+
+        for i, sp in self.born.items():
+            overlay_g.add((ids.uri(i, sp), RDF.type, URIRef(sp)))
+
+        self.clear()
+        return n
@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Optional, Tuple
+
+import owlrl
+import rdflib
+from rdflib import Graph, URIRef
+
+from .loader import load_base_graph
+from .reasoner import ReasonerCache
+from .species import EatsRulesCache, list_species
+from .taxonomy import TaxonomyIndex
+
+CACHE_VERSION = 2
+CACHE_DIRNAME = ".onto_cache"
+CACHE_KEYS = ("base_g", "base_taxonomy", "tbox_g", "tbox_taxonomy", "templates", "eats_relations", "meta")
+# fichier tronqué, pickle d'une autre version des classes / de rdflib
+CACHE_ERRORS = (pickle.UnpicklingError, EOFError, KeyError, AttributeError, ImportError)
+
+log = logging.getLogger(__name__)
+
+def ontology_hash(path: str) -> str:
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}|rdflib {rdflib.__version__}|owlrl {owlrl.__version__}|".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+class OntologyCache:
+    """
+    Cache disque de l'ontologie, indexé par le hash du fichier OWL.
+    Un seul fichier binaire (pickle) contient le graphe parsé, la clôture
+    OWL-RL de la TBox, les templates du reasoner (mêmes blank nodes partout ;
+    la clôture contient des triples généralisés, non sérialisables en N-Triples)
+    les index de subsomption (base et TBox) et les métadonnées : espèces,
+    relations eats.
+    Un changement du fichier OWL change le hash, donc le fichier : l'ancien est supprimé.
+    """
+
+    def __init__(self, onto_path: str, cache_dir: Optional[str] = None):
+        self.onto_path = onto_path
+        self.root = cache_dir or os.path.join(os.path.dirname(os.path.abspath(onto_path)), CACHE_DIRNAME)
+        self.stem = os.path.splitext(os.path.basename(onto_path))[0]
+        self.key = ontology_hash(onto_path)
+        self.path = os.path.join(self.root, f"{self.stem}-{self.key}.pickle")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read(self) -> dict:
+        """Contenu du fichier ; CACHE_ERRORS s'il est corrompu ou incompatible."""
+        with open(self.path, "rb") as f:
+            data = pickle.load(f)
+        missing = [k for k in CACHE_KEYS if k not in data]
+        if missing:
+            raise KeyError(f"clés absentes: {', '.join(missing)}")
+        return data
+
+    def load(self, reasoner: ReasonerCache, eats_cache: EatsRulesCache, data: Optional[dict] = None) -> Tuple[Graph, dict]:
+        data = data if data is not None else self.read()
+        base_g = data["base_g"]
+        reasoner.import_tbox(base_g, data["tbox_g"], data["templates"], data["tbox_taxonomy"])
+        eats_cache.seed(data["eats_relations"])
+        return base_g, dict(data["meta"], taxonomy=data["base_taxonomy"])
+
+    def save(self, base_g: Graph, reasoner: ReasonerCache, eats_cache: EatsRulesCache) -> dict:
+        base_taxonomy = TaxonomyIndex(base_g)
+        species = list_species(base_g, base_taxonomy)
+        reasoner.precompute_templates(base_g, [URIRef(s) for s in species])
+        tbox_g, templates, tbox_taxonomy = reasoner.export_tbox(base_g)
+
+        meta = {
+            "key": self.key,
+            "ontology": os.path.basename(self.onto_path),
+            "species": species,
+        }
+        data = {
+            "base_g": base_g,
+            "base_taxonomy": base_taxonomy,
+            "tbox_g": tbox_g,
+            "tbox_taxonomy": tbox_taxonomy,
+            "templates": templates,
+            "eats_relations": eats_cache.class_level_eats_relations(base_g),
+            "meta": meta,
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self._remove_stale()
+        return dict(meta, taxonomy=base_taxonomy)
+
+    def _remove_stale(self) -> None:
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(f"{self.stem}-") and path != self.path:
+                os.remove(path)
+
+def load_ontology(onto_path: str, reasoner: ReasonerCache, eats_cache: EatsRulesCache, use_cache: bool = True, cache_dir: Optional[str] = None) -> Tuple[Graph, dict]:
+    """
+    Charge base_g et pré-remplit reasoner / eats_cache depuis le cache disque,
+    en le construisant au premier démarrage (ou si le fichier OWL a changé).
+    """
+    if not use_cache:
+        base_g = load_base_graph(onto_path)
+        taxonomy = TaxonomyIndex(base_g)
+        return base_g, {"species": list_species(base_g, taxonomy), "taxonomy": taxonomy}
+
+    cache = OntologyCache(onto_path, cache_dir)
+    if cache.exists():
+        try:
+            data = cache.read()
+        except CACHE_ERRORS as e:
+            log.warning("Cache ontologie %s illisible (%s: %s) : reconstruction", cache.path, type(e).__name__, e)
+        else:
+            return cache.load(reasoner, eats_cache, data)
+
+    base_g = load_base_graph(onto_path)
+    try:
+        meta = cache.save(base_g, reasoner, eats_cache)
+    except OSError:
+        # dossier non inscriptible : on tourne sans cache
+        taxonomy = TaxonomyIndex(base_g)
+        meta = {"species": list_species(base_g, taxonomy), "taxonomy": taxonomy}
+    return base_g, meta
@@ -1,14 +1,75 @@
-from rdflib import Graph
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from rdflib import Graph, URIRef, RDF
+from rdflib.graph import ReadOnlyGraphAggregate
 from owlrl import DeductiveClosure, OWLRL_Semantics
 
+from .taxonomy import TaxonomyIndex
+
+# individu fictif utilisé pour calculer les conséquences d'un typage
+TEMPLATE_NS = "urn:x-onto-eco:template:"
+
+Triple = Tuple  # (s, p, o) ; None = individu dans un template
+
+class ReasonerStats:
+    """Compteurs du reasoner (partagés entre forks) : cache hit / miss, clôtures OWL-RL et leur durée."""
+
+    FIELDS = ("hits", "misses", "closures", "closure_seconds", "recompute_seconds")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, key: str, v=1) -> None:
+        with self._lock:
+            self.values[key] += v
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.values)
+
 class ReasonerCache:
+    """
+    Graphe raisonné (base + overlay) mis en cache.
+
+    La clôture OWL-RL de la TBox (base_g seul) est calculée une fois. Tant que
+    l'overlay ne contient que des assertions rdf:type d'individus, chaque
+    changement est appliqué par delta : pour un ensemble de classes asserté,
+    les conséquences sur un individu sont calculées une fois sur un individu
+    fictif ("template"), puis recopiées / retirées individu par individu.
+    Sinon, on retombe sur une clôture complète.
+
+    En mode incrémental, le graphe raisonné est une vue (lecture seule) sur la
+    clôture TBox, non copiée (partageable entre mondes, cf. fork), et sur les
+    triples dérivés des individus.
+    """
+
     def __init__(self):
         self._cache = None
         self._dirty = True
 
+        self._tbox: Optional[Tuple[int, Graph]] = None                # (id(base_g), clôture)
+        self._templates: Dict[FrozenSet[URIRef], List[Triple]] = {}  # classes -> triples sur TEMPLATE_X
+        self._species_types: Dict[URIRef, FrozenSet[URIRef]] = {}     # classe -> types inférés (rdf:type des templates)
+        self._asserted: Dict[URIRef, FrozenSet[URIRef]] = {}          # individu -> classes reflétées dans _cache
+        self._derived: Dict[URIRef, List[Triple]] = {}                # individu -> triples ajoutés pour lui
+        self._incremental = False                                     # _cache = TBox + templates ?
+        self._abox: Optional[Graph] = None                            # triples dérivés des individus (mode incrémental)
+        self._tbox_taxonomy: Optional[TaxonomyIndex] = None
+        self._cache_taxonomy: Optional[TaxonomyIndex] = None          # index de _cache hors mode incrémental
+        self.stats = ReasonerStats()
+
     def mark_dirty(self) -> None:
         self._dirty = True
 
+    def memory_triples(self) -> int:
+        """Triples propres à ce reasoner (hors clôture TBox, partagée en mode incrémental)."""
+        if self._incremental:
+            return len(self._abox)
+        return len(self._cache) if self._cache is not None else 0
+
     def merged_graph_raw(self, base_g: Graph, overlay_g: Graph) -> Graph:
         g = Graph()
         for t in base_g:
@@ -17,24 +78,190 @@ class ReasonerCache:
             g.add(t)
         return g
 
+    def tbox_graph(self, base_g: Graph) -> Graph:
+        """Clôture OWL-RL de l'ontologie seule (calculée une fois par base_g)."""
+        if self._tbox is None or self._tbox[0] != id(base_g):
+            g = self.merged_graph_raw(base_g, Graph())
+            self._closure(g)
+            self._tbox = (id(base_g), g)
+            self._tbox_taxonomy = None
+            self._templates.clear()
+            self._species_types.clear()
+            self._incremental = False
+        return self._tbox[1]
+
+    def taxonomy(self, base_g: Graph) -> TaxonomyIndex:
+        """
+        Index de subsomption du graphe raisonné courant. En mode incrémental,
+        l'ABox n'ajoute aucun rdfs:subClassOf : c'est l'index de la TBox, construit une fois.
+        """
+        if self._incremental or self._cache is None:
+            if self._tbox_taxonomy is None:
+                self._tbox_taxonomy = TaxonomyIndex(self.tbox_graph(base_g))
+            return self._tbox_taxonomy
+        if self._cache_taxonomy is None:
+            self._cache_taxonomy = TaxonomyIndex(self._cache)
+        return self._cache_taxonomy
+
+    # --- ABox par delta ---
+
+    @staticmethod
+    def _type_only_abox(overlay_g: Graph) -> Optional[Dict[URIRef, FrozenSet[URIRef]]]:
+        """individu -> classes assertées, ou None si l'overlay contient autre chose que des rdf:type."""
+        abox: Dict[URIRef, set] = {}
+        for s, p, o in overlay_g:
+            if p != RDF.type or not isinstance(s, URIRef) or not isinstance(o, URIRef):
+                return None
+            abox.setdefault(s, set()).add(o)
+        return {u: frozenset(cs) for u, cs in abox.items()}
+
+    def export_tbox(self, base_g: Graph) -> Tuple[Graph, Dict[FrozenSet[URIRef], List[Triple]], TaxonomyIndex]:
+        """Clôture TBox + templates déjà calculés + index de subsomption (pour le cache disque)."""
+        tbox_g = self.tbox_graph(base_g)
+        if self._tbox_taxonomy is None:
+            self._tbox_taxonomy = TaxonomyIndex(tbox_g)
+        return tbox_g, dict(self._templates), self._tbox_taxonomy
+
+    def import_tbox(self, base_g: Graph, tbox_g: Graph, templates: Dict[FrozenSet[URIRef], List[Triple]], taxonomy: Optional[TaxonomyIndex] = None) -> None:
+        """Réutilise une clôture TBox / des templates / un index calculés ailleurs (cache disque)."""
+        self._tbox = (id(base_g), tbox_g)
+        self._tbox_taxonomy = taxonomy
+        self._templates = dict(templates)
+        self._species_types = {}
+        self._incremental = False
+        self._cache = None
+        self._dirty = True
+
+    def fork(self) -> "ReasonerCache":
+        """
+        Reasoner d'un autre monde sur la même ontologie : clôture TBox, index et
+        templates partagés (lecture seule / ajouts), cache ABox propre.
+        """
+        other = ReasonerCache()
+        other._tbox = self._tbox
+        other._tbox_taxonomy = self._tbox_taxonomy
+        other._templates = self._templates
+        other._species_types = self._species_types
+        other.stats = self.stats
+        return other
+
+    def precompute_templates(self, base_g: Graph, classes: Iterable[URIRef]) -> None:
+        """Templates des individus typés par une seule classe, pour chaque classe donnée."""
+        self._ensure_templates(base_g, (frozenset([c]) for c in classes))
+
+    def species_types(self, base_g: Graph, cls) -> FrozenSet[URIRef]:
+        """
+        Types inférés d'un individu dont la seule classe assertée est `cls` :
+        rdf:type de son template, donc sans graphe raisonné ni clôture
+        (templates des espèces précalculés au chargement, cf. ontology/cache.py).
+        """
+        cls = URIRef(cls)
+        types = self._species_types.get(cls)
+        if types is None:
+            key = frozenset([cls])
+            self._ensure_templates(base_g, [key])
+            types = self._species_types[cls] = frozenset(
+                o for s, p, o in self._templates[key] if s is None and p == RDF.type and isinstance(o, URIRef)
+            )
+        return types
+
+    def _ensure_templates(self, base_g: Graph, keys: Iterable[FrozenSet[URIRef]]) -> None:
+        """Calcule en une seule clôture les templates manquants."""
+        missing = [k for k in set(keys) if k not in self._templates]
+        if not missing:
+            return
+
+        g = self.merged_graph_raw(self.tbox_graph(base_g), Graph())
+        xs = [URIRef(f"{TEMPLATE_NS}{i}") for i in range(len(missing))]
+        for x, classes in zip(xs, missing):
+            for c in classes:
+                g.add((x, RDF.type, c))
+        self._closure(g)
+
+        for x, classes in zip(xs, missing):
+            triples = set(g.triples((x, None, None))) | set(g.triples((None, None, x)))
+            # None = emplacement de l'individu ; on ignore les triples mêlant deux individus fictifs
+            self._templates[classes] = sorted(
+                (
+                    tuple(None if n == x else n for n in t)
+                    for t in triples
+                    if not any(n != x and str(n).startswith(TEMPLATE_NS) for n in t)
+                ),
+                key=lambda t: tuple(str(n) for n in t),
+            )
+
+    def _apply_delta(self, base_g: Graph, abox: Dict[URIRef, FrozenSet[URIRef]]) -> Graph:
+        if not self._incremental or self._cache is None:
+            self._abox = Graph()
+            self._cache = ReadOnlyGraphAggregate([self.tbox_graph(base_g), self._abox])
+            self._asserted = {}
+            self._derived = {}
+            self._incremental = True
+
+        # les triples d'un template contiennent toujours l'individu : jamais dans la TBox
+        g = self._abox
+
+        # individus retirés ou retypés
+        for u in [u for u, cs in self._asserted.items() if abox.get(u) != cs]:
+            for t in self._derived.pop(u, []):
+                g.remove(t)
+            del self._asserted[u]
+
+        # individus nouveaux
+        new = [u for u in abox if u not in self._asserted]
+        self._ensure_templates(base_g, (abox[u] for u in new))
+        for u in new:
+            triples = [tuple(u if n is None else n for n in t) for t in self._templates[abox[u]]]
+            for t in triples:
+                g.add(t)
+            self._derived[u] = triples
+            self._asserted[u] = abox[u]
+        return self._cache
+
+    def _closure(self, g: Graph) -> None:
+        t0 = time.perf_counter()
+        DeductiveClosure(OWLRL_Semantics).expand(g)
+        self.stats.add("closures")
+        self.stats.add("closure_seconds", time.perf_counter() - t0)
+
+    def _recompute(self, base_g: Graph, overlay_g: Graph) -> Graph:
+        t0 = time.perf_counter()
+        try:
+            return self._recompute_graph(base_g, overlay_g)
+        finally:
+            self.stats.add("misses")
+            self.stats.add("recompute_seconds", time.perf_counter() - t0)
+
+    def _recompute_graph(self, base_g: Graph, overlay_g: Graph) -> Graph:
+        abox = self._type_only_abox(overlay_g)
+        if abox is not None:
+            return self._apply_delta(base_g, abox)
+
+        # overlay quelconque : clôture complète
+        g = self.merged_graph_raw(base_g, overlay_g)
+        self._closure(g)
+        self._incremental = False
+        self._abox = None
+        self._cache_taxonomy = None
+        return g
+
     def reasoned_graph(self, base_g: Graph, overlay_g: Graph, freeze_ok: bool, frozen_reasoner: bool) -> Graph:
         """
         - Pendant simu (freeze_ok=True + frozen_reasoner=True), on renvoie le cache.
-        - Hors simu ou si dirty, on recalcule.
+        - Hors simu ou si dirty, on recalcule (par delta si possible).
         """
         if freeze_ok and frozen_reasoner:
             if self._cache is None:
-                g = self.merged_graph_raw(base_g, overlay_g)
-                DeductiveClosure(OWLRL_Semantics).expand(g)
-                self._cache = g
+                self._cache = self._recompute(base_g, overlay_g)
                 self._dirty = False
+            else:
+                self.stats.add("hits")
             return self._cache
 
         if self._cache is not None and not self._dirty:
+            self.stats.add("hits")
             return self._cache
 
-        g = self.merged_graph_raw(base_g, overlay_g)
-        DeductiveClosure(OWLRL_Semantics).expand(g)
-        self._cache = g
+        self._cache = self._recompute(base_g, overlay_g)
         self._dirty = False
-        return g
+        return self._cache
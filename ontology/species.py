@@ -6,6 +6,7 @@ from rdflib import Graph, URIRef, RDF
 from rdflib.namespace import RDFS, OWL
 
 from .loader import AWO1, AWO4, PLANT, EATS, BIOLOGICAL_SPECIES
+from .taxonomy import TaxonomyIndex
 
 def local_name(uri) -> str:
     s = str(uri)
@@ -24,13 +25,14 @@ def is_subclass_of(g: Graph, cls: URIRef, parent: URIRef) -> bool:
                 stack.append(sup)
     return False
 
-def list_species(base_g: Graph) -> List[str]:
+def list_species(base_g: Graph, taxonomy: TaxonomyIndex | None = None) -> List[str]:
+    tax = taxonomy or TaxonomyIndex(base_g)
     out = []
     for cls in base_g.subjects(RDF.type, OWL.Class):
         s = str(cls)
         if s.startswith(str(OWL)) or s.startswith(str(RDFS)):
             continue
-        if is_subclass_of(base_g, cls, BIOLOGICAL_SPECIES) or is_subclass_of(base_g, cls, PLANT):
+        if tax.is_subclass(cls, BIOLOGICAL_SPECIES) or tax.is_subclass(cls, PLANT):
             out.append(s)
     return sorted(out)
 
@@ -38,6 +40,9 @@ class EatsRulesCache:
     def __init__(self):
         self._class_eats_cache = None
 
+    def seed(self, relations: List[Tuple[URIRef, URIRef]]) -> None:
+        self._class_eats_cache = list(relations)
+
     def class_level_eats_relations(self, base_g: Graph) -> List[Tuple[URIRef, URIRef]]:
         if self._class_eats_cache is not None:
             return self._class_eats_cache
@@ -71,14 +76,27 @@ def _depth(g: Graph, cls: URIRef) -> int:
                 stack.append(sup)
     return d
 
-def most_specific_species_class(g: Graph, u: URIRef) -> URIRef | None:
+def most_specific_species_class(g: Graph, u: URIRef, taxonomy: TaxonomyIndex | None = None) -> URIRef | None:
+    """taxonomy : index de `g` (sinon parcours du graphe à chaque appel)."""
+    is_sub = taxonomy.is_subclass if taxonomy else (lambda c, p: is_subclass_of(g, c, p))
+    depth = taxonomy.depth if taxonomy else (lambda c: _depth(g, c))
+
     candidates = []
     for t in g.objects(u, RDF.type):
-        if is_subclass_of(g, t, BIOLOGICAL_SPECIES) or is_subclass_of(g, t, PLANT):
+        # une espèce est une classe nommée (pas une intersection / restriction anonyme équivalente)
+        if not isinstance(t, URIRef):
+            continue
+        if is_sub(t, BIOLOGICAL_SPECIES) or is_sub(t, PLANT):
             candidates.append(t)
     if not candidates:
         return None
-    return max(candidates, key=lambda c: _depth(g, c))
+    return max(candidates, key=depth)
+
+# niveaux trophiques (filtres / résumés de /api/state) ; un omnivore est dans deux niveaux
+TROPHIC_LEVELS = {"plant": PLANT, "herbivore": AWO1.Herbivore, "carnivore": AWO1.Carnivore}
+
+def trophic_levels(sp, taxonomy: TaxonomyIndex) -> List[str]:
+    return [lvl for lvl, cls in TROPHIC_LEVELS.items() if taxonomy.is_subclass(URIRef(sp), cls)]
 
 def pop_by_species(active: Set[URIRef], indiv_species: Dict[URIRef, str]):
     pop = defaultdict(list)
@@ -97,6 +115,8 @@ def rebuild_species_mapping_and_rules(
     species_traits: Dict[str, dict],
     species_prey: Dict[str, List[str]],
     known_species: Set[str],
+    taxonomy: TaxonomyIndex | None = None,
+    uri_of=None,
 ) -> None:
     """
     Rebuild:
@@ -104,7 +124,12 @@ def rebuild_species_mapping_and_rules(
     - SPECIES_TRAITS
     - SPECIES_PREY
     - KNOWN_SPECIES
+
+    taxonomy : index de subsomption de reasoned_g (construit ici si absent).
+    uri_of : clé de `active` -> URIRef dans reasoned_g (active contient déjà des URIRef si absent).
     """
+    tax = taxonomy or TaxonomyIndex(reasoned_g)
+
     indiv_species.clear()
     species_traits.clear()
     species_prey.clear()
@@ -112,7 +137,7 @@ def rebuild_species_mapping_and_rules(
 
     # individu -> espèce (classe la plus spécifique)
     for u in list(active):
-        sp = most_specific_species_class(reasoned_g, u)
+        sp = most_specific_species_class(reasoned_g, uri_of(u) if uri_of else u, tax)
         if sp is None:
             continue
         indiv_species[u] = str(sp)
@@ -122,24 +147,17 @@ def rebuild_species_mapping_and_rules(
     for sp_str in set(indiv_species.values()):
         sp = URIRef(sp_str)
         species_traits[sp_str] = {
-            "is_plant": is_subclass_of(reasoned_g, sp, PLANT),
-            "is_carnivore": is_subclass_of(reasoned_g, sp, AWO1.Carnivore),
-            "is_herbivore": is_subclass_of(reasoned_g, sp, AWO1.Herbivore),
+            "is_plant": tax.is_subclass(sp, PLANT),
+            "is_carnivore": tax.is_subclass(sp, AWO1.Carnivore),
+            "is_herbivore": tax.is_subclass(sp, AWO1.Herbivore),
         }
 
     # règles eats au niveau espèces
     rules = eats_cache.class_level_eats_relations(base_g)
     species_list = list(set(indiv_species.values()))
 
-    subclass_cache: Dict[tuple, bool] = {}
-
     def is_sub(sp_str: str, cls: URIRef) -> bool:
-        key = (sp_str, str(cls))
-        if key in subclass_cache:
-            return subclass_cache[key]
-        res = is_subclass_of(reasoned_g, URIRef(sp_str), cls)
-        subclass_cache[key] = res
-        return res
+        return tax.is_subclass(URIRef(sp_str), cls)
 
     for pred_sp in species_list:
         prey_list = []
@@ -0,0 +1,66 @@
+from typing import Dict, List
+
+from rdflib import Graph
+from rdflib.namespace import RDFS
+
+class TaxonomyIndex:
+    """
+    Index de la hiérarchie rdfs:subClassOf d'un graphe, construit une fois :
+    pour chaque classe, l'ensemble de ses super-classes atteignables (bitset
+    dans un int Python) et sa "profondeur" (taille de cet ensemble, comme
+    _depth). Les tests de subsomption deviennent des lookups O(1).
+    """
+
+    def __init__(self, g: Graph):
+        self._index: Dict[object, int] = {}
+        parents: List[List[int]] = []
+
+        def idx(c) -> int:
+            i = self._index.get(c)
+            if i is None:
+                i = self._index[c] = len(parents)
+                parents.append([])
+            return i
+
+        for c, sup in g.subject_objects(RDFS.subClassOf):
+            parents[idx(c)].append(idx(sup))
+
+        # super-classes atteignables par >= 1 arc (cycles d'équivalence compris)
+        self._reach: List[int] = []
+        for start in range(len(parents)):
+            seen = 0
+            stack = [start]
+            while stack:
+                for sup in parents[stack.pop()]:
+                    bit = 1 << sup
+                    if not seen & bit:
+                        seen |= bit
+                        stack.append(sup)
+            self._reach.append(seen)
+        self._depth = [bin(r).count("1") for r in self._reach]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def is_subclass(self, cls, parent) -> bool:
+        """Même sémantique que is_subclass_of (réflexif)."""
+        if cls == parent:
+            return True
+        i = self._index.get(cls)
+        j = self._index.get(parent)
+        if i is None or j is None:
+            return False
+        return bool((self._reach[i] >> j) & 1)
+
+    def depth(self, cls) -> int:
+        """Même valeur que _depth(g, cls)."""
+        i = self._index.get(cls)
+        return 0 if i is None else self._depth[i]
+
+    def ancestors(self, cls) -> list:
+        """Super-classes atteignables de cls."""
+        i = self._index.get(cls)
+        if i is None:
+            return []
+        reach = self._reach[i]
+        return [c for c, j in self._index.items() if (reach >> j) & 1]
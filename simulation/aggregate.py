@@ -0,0 +1,347 @@
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from rdflib import Graph, URIRef, RDF
+
+from graph.overlay import remove_individual_triples
+from simulation.ids import IdAllocator
+from simulation.population import species_roles
+from simulation.rng import WorldRNG
+from simulation.metrics import StepTimer, no_lap
+from simulation.vectorized import H
+
+# au-delà, NumPy refuse les tirages hypergéométriques : approximation binomiale
+HYPER_MAX = 10 ** 9
+
+def _mvhyper(colors: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """`n` tirages sans remise parmi `colors` (effectifs par case) ; renvoie les effectifs tirés par case."""
+    colors = np.asarray(colors, dtype=np.int64)
+    total = int(colors.sum())
+    n = min(int(n), total)
+    if n <= 0:
+        return np.zeros(len(colors), dtype=np.int64)
+    if n == total:
+        return colors.copy()
+    if total < HYPER_MAX:
+        return rng.multivariate_hypergeometric(colors, n)
+    # binomiales conditionnelles successives, bornées par l'effectif de chaque case
+    out = np.zeros(len(colors), dtype=np.int64)
+    left, rest = n, total
+    for i, c in enumerate(colors.tolist()):
+        if not left:
+            break
+        if c:
+            out[i] = min(c, rng.binomial(left, c / rest))
+            left -= out[i]
+        rest -= c
+    # reliquat (cases pleines) : reporté sur les cases qui ont encore de la place
+    for i in np.flatnonzero(out < colors).tolist():
+        if not left:
+            break
+        k = min(left, int(colors[i] - out[i]))
+        out[i] += k
+        left -= k
+    return out
+
+def _spread(demand: np.ndarray, rows: np.ndarray, avail: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Équivalent agrégé de vectorized._take_from_pools : demand[g] demandes du
+    groupe g, chacune choisit uniformément une espèce de rows[g] encore
+    disponible ; une espèce sur-demandée est partagée au hasard entre
+    groupes, les perdants retentent sur les autres. Renvoie les prises (G x S).
+    Au plus S + 1 tours : chaque tour avec perdants épuise une espèce.
+    """
+    taken = np.zeros(rows.shape, dtype=np.int64)
+    remaining = np.asarray(demand, dtype=np.int64).copy()
+    avail = np.asarray(avail, dtype=np.int64).copy()
+    while remaining.any():
+        choice = rows & (avail > 0)[None, :]
+        n_choice = choice.sum(axis=1)
+        remaining[n_choice == 0] = 0
+        req = np.zeros(rows.shape, dtype=np.int64)
+        for g in np.flatnonzero(remaining).tolist():
+            cols = np.flatnonzero(choice[g])
+            req[g, cols] = rng.multinomial(remaining[g], np.full(len(cols), 1.0 / len(cols)))
+        win = req
+        for s in np.flatnonzero(req.sum(axis=0) > avail).tolist():
+            win[:, s] = _mvhyper(req[:, s], avail[s], rng)
+        taken += win
+        avail -= win.sum(axis=0)
+        remaining -= win.sum(axis=1)
+    return taken
+
+def shift_levels(h: np.ndarray, d: int) -> np.ndarray:
+    """Histogrammes (... x niveaux) décalés de `d` niveaux, bornés aux niveaux extrêmes."""
+    if d == 0:
+        return h.copy()
+    out = np.zeros_like(h)
+    L = h.shape[-1]
+    if abs(d) >= L:
+        out[..., -1 if d > 0 else 0] = h.sum(axis=-1)
+        return out
+    if d > 0:
+        out[..., d:] = h[..., :L - d]
+        out[..., -1] += h[..., L - d:].sum(axis=-1)
+    else:
+        out[..., :L + d] = h[..., -d:]
+        out[..., 0] += h[..., :-d].sum(axis=-1)
+    return out
+
+class AggregatePopulation:
+    """
+    Population agrégée : par espèce, un histogramme des effectifs par niveau
+    d'énergie (les individus d'une espèce sont interchangeables). Deux
+    histogrammes pendant un step : `hungry` et `fed` (a mangé ce step).
+    Ligne supplémentaire en fin : individus d'espèce inconnue.
+    Pas d'identité individuelle : les ids ne sont réassociés qu'au sync.
+    """
+
+    def __init__(
+        self,
+        species: List[str],
+        species_traits: Dict[str, dict],
+        species_prey: Dict[str, List[str]],
+        ids: IdAllocator,
+        params: dict,
+    ):
+        self.species = list(species)
+        self.species_index = {sp: i for i, sp in enumerate(self.species)}
+        self.is_plant, self.is_herb, self.is_carn, self.prey = species_roles(self.species, species_traits, species_prey)
+
+        # niveaux lo..E_MAX : lo couvre un parent tombé à E_REPRO - REPRO_COST puis le coût du step suivant
+        p = params
+        self.lo = min(0, p["E_REPRO"] - p["REPRO_COST"]) - p["COST_STEP"]
+        self.levels = np.arange(self.lo, p["E_MAX"] + 1)
+        S = len(self.species)
+        self.hungry = np.zeros((S + 1, len(self.levels)), dtype=np.int64)
+        self.fed = np.zeros_like(self.hungry)
+
+        self.species_counts = np.zeros(S, dtype=np.int64)
+        self.n_alive = 0
+
+        self.id_alloc = ids
+        self._synced: List[List[int]] = [[] for _ in range(S + 1)]  # ids matérialisés, par ligne
+
+    @classmethod
+    def from_state(
+        cls,
+        active: Set[int],
+        energy: Dict[int, int],
+        indiv_species: Dict[int, str],
+        species_traits: Dict[str, dict],
+        species_prey: Dict[str, List[str]],
+        known_species: Set[str],
+        params: dict,
+        ids: IdAllocator,
+    ) -> "AggregatePopulation":
+        species = sorted(set(known_species) | set(indiv_species.values()))
+        pop = cls(species, species_traits, species_prey, ids, params)
+        unknown = len(species)
+        n = len(active)
+        row = np.fromiter((pop.species_index.get(indiv_species.get(u), unknown) for u in active), dtype=np.int64, count=n)
+        e = np.fromiter((energy.get(u, params["E_INIT"]) for u in active), dtype=np.int64, count=n)
+        col = np.clip(e, pop.lo, params["E_MAX"]) - pop.lo
+        np.add.at(pop.hungry, (row, col), 1)
+        for u, r in zip(active, row.tolist()):
+            pop._synced[r].append(u)
+        pop.update_counts()
+        return pop
+
+    @classmethod
+    def from_counts(
+        cls,
+        population: Dict[str, int],
+        species_traits: Dict[str, dict],
+        species_prey: Dict[str, List[str]],
+        params: dict,
+        ids: IdAllocator,
+    ) -> "AggregatePopulation":
+        """Sans passer par des individus (runs headless de très grande taille) : tous à E_INIT."""
+        pop = cls(sorted(population), species_traits, species_prey, ids, params)
+        for sp, n in population.items():
+            pop.hungry[pop.species_index[sp], min(params["E_INIT"], params["E_MAX"]) - pop.lo] = n
+        pop.update_counts()
+        return pop
+
+    def total(self) -> np.ndarray:
+        return self.hungry + self.fed
+
+    def update_counts(self) -> None:
+        counts = self.total().sum(axis=1)
+        self.species_counts = counts[:-1]
+        self.n_alive = int(counts.sum())
+
+    def alive_count(self) -> int:
+        return self.n_alive
+
+    def counts_by_species(self) -> Dict[str, int]:
+        return {sp: int(c) for sp, c in zip(self.species, self.species_counts)}
+
+    def energy_stats(self) -> Dict[str, dict]:
+        """Par espèce vivante : effectif, énergie moyenne / min / max (lus dans l'histogramme)."""
+        h = self.total()[:-1]
+        out = {}
+        for s in np.flatnonzero(self.species_counts).tolist():
+            nz = np.flatnonzero(h[s])
+            out[self.species[s]] = {
+                "count": int(self.species_counts[s]),
+                "energy_mean": float(h[s] @ self.levels / self.species_counts[s]),
+                "energy_min": int(self.levels[nz[0]]),
+                "energy_max": int(self.levels[nz[-1]]),
+            }
+        return out
+
+    # --- matérialisation vers les structures "dict" / RDF ---
+
+    def sync_to(
+        self,
+        overlay_g: Graph,
+        active: Set[int],
+        energy: Dict[int, int],
+        indiv_species: Dict[int, str],
+    ) -> int:
+        """
+        Matérialise les histogrammes (appelé seulement quand l'API lit l'état) :
+        par espèce, les premiers ids déjà présents sont conservés, les
+        surnuméraires retirés, les manquants créés ; énergies réparties
+        selon l'histogramme. Coût linéaire en population.
+        Renvoie le nombre d'individus ajoutés / retirés.
+        """
+        n = 0
+        h = self.total()
+        for r, synced in enumerate(self._synced):
+            count = int(h[r].sum())
+            sp = self.species[r] if r < len(self.species) else None
+            for i in synced[count:]:
+                active.discard(i)
+                energy.pop(i, None)
+                indiv_species.pop(i, None)
+                u = self.id_alloc.uris.get(i)
+                if u is not None:
+                    remove_individual_triples(overlay_g, u)
+                    self.id_alloc.release(i)
+            n += max(0, len(synced) - count)
+            del synced[count:]
+            missing = count - len(synced)
+            if missing > 0 and sp is not None:  # espèce inconnue : pas de naissances
+                first = self.id_alloc.reserve(missing)
+                cls = URIRef(sp)
+                for i in range(first, first + missing):
+                    active.add(i)
+                    indiv_species[i] = sp
+                    overlay_g.add((self.id_alloc.uri(i, sp), RDF.type, cls))
+                    synced.append(i)
+                n += missing
+            energy.update(zip(synced, np.repeat(self.levels, h[r]).tolist()))
+        return n
+
+def simulation_step_aggregate(
+    pop: AggregatePopulation,
+    params: dict,
+    rng: WorldRNG,
+    timer: Optional[StepTimer] = None,
+    events=None,
+) -> dict:
+    """
+    Version agrégée de simulation_step_arrays : mêmes règles R1-R4 et mêmes
+    flux feed / hunt / repro, en tirages binomiaux / multinomiaux /
+    hypergéométriques sur les histogrammes espèce x énergie. Même
+    dynamique en espérance, coût O(espèces x niveaux) indépendant de la population.
+    `events` : ignoré (pas d'individus, pas de journal d'événements pour ce moteur).
+    """
+    lap = timer.lap if timer else no_lap
+    p = params
+    S = len(pop.species)
+    lo = pop.lo
+    hungry = pop.hungry + pop.fed  # "a mangé" remis à zéro
+    fed = np.zeros_like(hungry)
+    animal = np.append(~pop.is_plant, True)  # ligne des espèces inconnues : coût et famine
+    deaths = 0
+
+    # R1: coût de vie (sauf plantes)
+    hungry[animal] = shift_levels(hungry[animal], -p["COST_STEP"])
+    lap("cost")
+
+    # R2a: herbivores mangent plantes (p_feed = T / (T + H), T décroissant par blocs, comme le moteur array)
+    plants = hungry[:S].sum(axis=1) * pop.is_plant
+    T = int(plants.sum())
+    herb_rows = np.flatnonzero(pop.is_herb)
+    n_herbs = int(hungry[herb_rows].sum())
+    feeders = 0
+    left = n_herbs
+    while T - feeders > 0 and left > 0:
+        rest = T - feeders
+        block = min(left, max(1, rest // 8, left // 64))
+        feeders += min(rest, int(rng.feed.binomial(block, min(1.0, rest / (rest + H)))))
+        left -= block
+    if feeders:
+        eaten = _spread(np.array([feeders]), pop.is_plant[None, :], plants, rng.feed)[0]
+        for s in np.flatnonzero(eaten).tolist():
+            hungry[s] -= _mvhyper(hungry[s], eaten[s], rng.feed)
+        picked = _mvhyper(hungry[herb_rows].ravel(), feeders, rng.feed).reshape(len(herb_rows), -1)
+        hungry[herb_rows] -= picked
+        fed[herb_rows] += shift_levels(picked, p["GAIN_PLANT"])
+        deaths += feeders
+    lap("graze")
+
+    # R2b: carnivores chassent (1 tentative max / step)
+    carn_rows = np.flatnonzero(pop.is_carn & pop.prey.any(axis=1))
+    counts = (hungry + fed).sum(axis=1)
+    hunters = rng.hunt.binomial(counts[carn_rows], p["HUNT_PROB"])
+    if hunters.any():
+        prey_avail = counts[:S] * ~pop.is_plant
+        taken = _spread(hunters, pop.prey[carn_rows], prey_avail, rng.hunt)
+        victims = taken.sum(axis=0)
+        for s in np.flatnonzero(victims).tolist():
+            both = np.concatenate([hungry[s], fed[s]])
+            gone = _mvhyper(both, victims[s], rng.hunt)
+            hungry[s] -= gone[:len(both) // 2]
+            fed[s] -= gone[len(both) // 2:]
+        deaths += int(victims.sum())
+        # un chasseur tué dans la même phase ne profite pas de sa proie
+        for k, s in enumerate(carn_rows.tolist()):
+            caught = int(taken[k].sum())
+            if not caught:
+                continue
+            killed = int(victims[s])
+            if killed:
+                caught -= int(rng.hunt.hypergeometric(caught, counts[s] - caught, killed)) if counts[s] < HYPER_MAX \
+                    else round(caught * killed / counts[s])
+            both = np.concatenate([hungry[s], fed[s]])
+            eater = _mvhyper(both, caught, rng.hunt)
+            L = len(both) // 2
+            hungry[s] -= eater[:L]
+            fed[s] -= eater[L:]
+            fed[s] += shift_levels(eater[:L] + eater[L:], p["GAIN_PREY"])
+    lap("hunt")
+
+    # R3: mort par famine (énergie <= 0), sauf plantes
+    dead = pop.levels <= 0
+    starving = int(hungry[animal][:, dead].sum() + fed[animal][:, dead].sum())
+    hungry[np.ix_(animal, dead)] = 0
+    fed[np.ix_(animal, dead)] = 0
+    deaths += starving
+    lap("starve")
+
+    # R4a: plantes (logistique)
+    counts = (hungry + fed).sum(axis=1)[:S]
+    K = p["K_PLANT"]
+    grow = pop.is_plant & (counts > 0) & (counts < K)
+    p_eff = np.where(grow, p["P_REPRO_PLANT"] * np.clip(1.0 - counts / K, 0.0, None), 0.0)
+    births = rng.repro.binomial(counts, p_eff)
+    lap("repro_plant")
+
+    # R4b/R4c: herbivores puis carnivores (ont mangé, énergie suffisante, >= 2 individus)
+    for role, p_repro in ((pop.is_herb, p["P_REPRO_HERB"]), (pop.is_carn, p["P_REPRO_CARN"])):
+        rows = np.flatnonzero(role & (counts >= 2))
+        cols = np.flatnonzero(pop.levels >= p["E_REPRO"])
+        k = np.zeros((len(rows), fed.shape[1]), dtype=np.int64)
+        k[:, cols] = rng.repro.binomial(fed[np.ix_(rows, cols)], p_repro)
+        fed[rows] += shift_levels(k, -p["REPRO_COST"]) - k
+        births[rows] += (k * (pop.levels - p["REPRO_COST"] > 0)).sum(axis=1)
+
+    hungry[:S, min(p["E_INIT"], p["E_MAX"]) - lo] += births
+    pop.hungry, pop.fed = hungry, fed
+    pop.update_counts()
+    lap("repro_animal")
+    return {"births": int(births.sum()), "deaths": deaths}
@@ -0,0 +1,290 @@
+"""
+Runs headless (sans Flask) et balayages de paramètres en parallèle.
+
+    python -m simulation.batch --population Lion=2 Impala=6 Grass=45 \\
+        --grid HUNT_PROB=0.2,0.35,0.5 --runs 200 --seed 1 --processes 8
+    python -m simulation.batch --scenario savanna --runs 50 --export exports/savanna --format parquet
+
+Le mapping espèces / traits / proies est calculé une fois (raisonnement OWL),
+puis partagé par tous les runs et tous les processus.
+"""
+import argparse
+import itertools
+import json
+import statistics
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import ONTO_PATH, ONTO_CACHE, SIMULATION_PARAMS
+from ontology.cache import load_ontology
+from ontology.reasoner import ReasonerCache
+from ontology.species import EatsRulesCache, local_name
+from simulation.world import ENGINES, new_world, add_population, rebuild_rules, begin_run, step_world, fast_forward, energy_stats
+from simulation.scenario import load_scenario
+from simulation.export import TrajectoryExport, TrajectoryRecorder, available_formats
+
+STATUSES = ("STABLE", "EXTINCTION", "TIMEOUT")
+
+def prepare(
+    population: Dict[str, int],
+    onto_path: str = ONTO_PATH,
+    params: Optional[dict] = None,
+    skip: int = 0,
+) -> dict:
+    """
+    Construit la population initiale et calcule une fois (reasoner) le mapping
+    individus -> espèces, traits et proies. skip > 0 : population avancée de
+    `skip` steps par le champ moyen (transitoire sauté). Renvoie un template picklable.
+    """
+    reasoner = ReasonerCache()
+    eats_cache = EatsRulesCache()
+    base_g, onto_meta = load_ontology(onto_path, reasoner, eats_cache, use_cache=ONTO_CACHE)
+    ctx = new_world(base_g, reasoner, eats_cache, onto_meta, params=params or SIMULATION_PARAMS)
+
+    add_population(ctx, population)
+    rebuild_rules(ctx)
+    if skip:
+        fast_forward(ctx, skip)
+
+    return {
+        "params": dict(ctx["state"].params),
+        "active": list(ctx["state"].active),  # ids, ordre d'insertion : fait partie de la graine
+        "next_id": ctx["ids"].next_id,
+        "indiv_species": dict(ctx["indiv_species"]),
+        "species_traits": dict(ctx["species_traits"]),
+        "species_prey": dict(ctx["species_prey"]),
+        "known_species": sorted(ctx["state"].known_species),
+        "species_list": onto_meta["species"],
+    }
+
+def run_one(
+    template: dict,
+    overrides: Optional[dict] = None,
+    seed: Optional[int] = None,
+    engine: str = "dict",
+    record: bool = False,
+) -> dict:
+    """
+    Un run complet jusqu'à STABLE / EXTINCTION / TIMEOUT. record : trajectoire
+    (step x espèce : effectif, énergie) renvoyée en colonnes dans "trajectory".
+    """
+    params = dict(template["params"], **(overrides or {}))
+    ctx = new_world(None, ReasonerCache(), None, {"species": template["species_list"], "taxonomy": None}, params=params)
+    ctx["headless"] = True
+
+    state = ctx["state"]
+    state.active.update(template["active"])
+    ctx["ids"].next_id = template["next_id"]
+    state.known_species.update(template["known_species"])
+    ctx["indiv_species"].update(template["indiv_species"])
+    ctx["species_traits"].update(template["species_traits"])
+    ctx["species_prey"].update(template["species_prey"])
+
+    begin_run(ctx, engine, seed=seed)
+    rec = None
+    if record:
+        rec = ctx["export"] = TrajectoryRecorder()
+        rec.record(0, state.history.last(), energy_stats(ctx))
+
+    status = None
+    while status is None:
+        status = step_world(ctx)
+
+    res = {
+        "status": status,
+        "t": state.t,
+        "final": {local_name(sp): n for sp, n in state.history.last().items()},
+        "overrides": overrides or {},
+        "seed": ctx["rng"].seed,  # graine effective (tirée si seed=None)
+    }
+    if rec is not None:
+        res["trajectory"] = rec.columns()
+    return res
+
+# --- balayages multi-process ---
+
+_TEMPLATE = None
+
+def _init_worker(template: dict) -> None:
+    global _TEMPLATE
+    _TEMPLATE = template
+
+def _run_task(task) -> dict:
+    point, overrides, seed, engine, run, record = task
+    res = run_one(_TEMPLATE, overrides, seed, engine, record)
+    res["point"] = point
+    res["run"] = run
+    return res
+
+def _export_run(export: TrajectoryExport, template: dict, engine: str, res: dict) -> None:
+    """Écrit la trajectoire d'un run terminé (colonne run = index du run) puis la libère."""
+    cols = res.pop("trajectory")
+    cols["run"] = [res["run"]] * len(cols["run"])
+    export.write(cols)
+    export.write_outcome(res["run"], res["status"], res["t"], res["seed"], engine,
+                         dict(template["params"], **res["overrides"]), res["final"])
+
+def grid_points(grid: Dict[str, list]) -> List[dict]:
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def monte_carlo_points(ranges: Dict[str, tuple], n: int, seed: Optional[int] = None) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    return [{k: float(rng.uniform(lo, hi)) for k, (lo, hi) in sorted(ranges.items())} for _ in range(n)]
+
+def summarize(results: List[dict]) -> dict:
+    if not results:
+        return {"runs": 0, "rates": dict.fromkeys(STATUSES, 0.0), "t_mean": None, "t_median": None,
+                "t_by_status": {}, "final_mean": {}}
+    statuses = Counter(r["status"] for r in results)
+    ts = [r["t"] for r in results]
+    out = {
+        "runs": len(results),
+        "rates": {s: statuses.get(s, 0) / len(results) for s in sorted(set(STATUSES) | set(statuses))},
+        "t_mean": statistics.fmean(ts),
+        "t_median": statistics.median(ts),
+        "t_by_status": {s: statistics.fmean([r["t"] for r in results if r["status"] == s]) for s in statuses},
+    }
+    finals = Counter()
+    for r in results:
+        finals.update(r["final"])
+    out["final_mean"] = {sp: v / len(results) for sp, v in sorted(finals.items())}
+    return out
+
+def sweep(
+    template: dict,
+    points: List[dict],
+    runs: int = 100,
+    seed: Optional[int] = None,
+    engine: str = "dict",
+    processes: Optional[int] = None,
+    export: Optional[TrajectoryExport] = None,
+) -> List[dict]:
+    """
+    `runs` runs par point de paramètres ; renvoie un résumé agrégé par point.
+    export : trajectoires et issues de tous les runs, écrites au fil des résultats.
+    """
+    seeds = np.random.SeedSequence(seed).generate_state(len(points) * runs).tolist()
+    record = export is not None
+    tasks = [
+        (i, point, seeds[i * runs + k], engine, i * runs + k, record)
+        for i, point in enumerate(points)
+        for k in range(runs)
+    ]
+
+    results = []
+
+    def collect(done) -> None:
+        for r in done:
+            if record:
+                _export_run(export, template, engine, r)
+            results.append(r)
+
+    if processes == 1:
+        _init_worker(template)
+        collect(map(_run_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(template,)) as pool:
+            collect(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (8 * (processes or 4)))))
+
+    by_point = [[] for _ in points]
+    for r in results:
+        by_point[r["point"]].append(r)
+    return [dict(params=point, **summarize(rs)) for point, rs in zip(points, by_point)]
+
+# --- CLI ---
+
+def _parse_value(v: str):
+    try:
+        return int(v)
+    except ValueError:
+        return float(v)
+
+def _parse_pairs(items: List[str]) -> Dict[str, str]:
+    out = {}
+    for item in items or []:
+        k, _, v = item.partition("=")
+        if not v:
+            raise SystemExit(f"Attendu CLE=VALEUR: {item}")
+        out[k] = v
+    return out
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Simulation headless et balayages de paramètres.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--population", nargs="+", metavar="ESPECE=N")
+    src.add_argument("--scenario", help="nom (scenarios/*.json) ou chemin d'un scénario : population, params, graine, moteur")
+    ap.add_argument("--set", nargs="*", default=[], metavar="PARAM=V", help="surcharge de SIMULATION_PARAMS")
+    ap.add_argument("--grid", nargs="*", default=[], metavar="PARAM=V1,V2", help="grille de valeurs")
+    ap.add_argument("--sample", nargs="*", default=[], metavar="PARAM=MIN:MAX", help="tirage Monte-Carlo uniforme")
+    ap.add_argument("--samples", type=int, default=20, help="nombre de points Monte-Carlo")
+    ap.add_argument("--runs", type=int, default=100, help="runs par point")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--engine", choices=ENGINES, default=None, help="défaut : moteur du scénario, sinon dict")
+    ap.add_argument("--fast-forward", type=int, default=0, metavar="STEPS",
+                    help="population initiale avancée de STEPS steps par le champ moyen (saute le transitoire)")
+    ap.add_argument("--processes", type=int, default=None)
+    ap.add_argument("--onto", default=ONTO_PATH)
+    ap.add_argument("--out", default=None, help="fichier JSON de résultats (sinon stdout)")
+    ap.add_argument("--export", default=None, metavar="BASE",
+                    help="trajectoires et issues de tous les runs : BASE.trajectory.<ext>, BASE.outcome.<ext>")
+    ap.add_argument("--format", choices=available_formats(), default=None, help="format d'export (défaut : parquet si pyarrow, sinon csv)")
+    args = ap.parse_args(argv)
+    if args.runs < 1:
+        ap.error("--runs doit être >= 1")
+
+    if args.scenario:
+        try:
+            scenario = load_scenario(args.scenario, allow_path=True)
+        except ValueError as e:
+            raise SystemExit(str(e))
+    else:
+        scenario = {"population": {k: int(v) for k, v in _parse_pairs(args.population).items()}, "params": {}, "seed": None, "engine": None}
+    population = scenario["population"]
+    base = {k: _parse_value(v) for k, v in _parse_pairs(args.set).items()}
+    params = dict(SIMULATION_PARAMS, **scenario["params"], **base)
+    if args.seed is None:
+        args.seed = scenario["seed"]
+    args.engine = args.engine or scenario["engine"] or "dict"
+
+    grid = {k: [_parse_value(x) for x in v.split(",")] for k, v in _parse_pairs(args.grid).items()}
+    ranges = {k: tuple(float(x) for x in v.split(":")) for k, v in _parse_pairs(args.sample).items()}
+    for k in list(grid) + list(ranges):
+        if k not in SIMULATION_PARAMS:
+            raise SystemExit(f"Paramètre inconnu: {k}")
+
+    points = grid_points(grid)
+    if ranges:
+        mc = monte_carlo_points(ranges, args.samples, args.seed)
+        points = [dict(p, **q) for p in points for q in mc]
+
+    template = prepare(population, onto_path=args.onto, params=params, skip=args.fast_forward)
+    export = TrajectoryExport(args.export, args.format) if args.export else None
+    try:
+        summary = sweep(template, points, runs=args.runs, seed=args.seed, engine=args.engine,
+                        processes=args.processes, export=export)
+    finally:
+        if export is not None:
+            print(f"export: {export.close()}", file=sys.stderr)
+
+    text = json.dumps({
+        "population": population, "params": params, "engine": args.engine,
+        "fast_forward": args.fast_forward, "points": summary,
+    }, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for row in summary:
+        rates = " ".join(f"{s}={row['rates'][s]:.2f}" for s in STATUSES)
+        print(f"{row['params']}  {rates}  t_mean={row['t_mean']:.1f}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+class StateChanges:
+    """
+    Versions de l'état servi par /api/state (?since=<version>). commit()
+    compare l'état courant (id -> espèce, énergie) au dernier commité et
+    journalise les ids ajoutés / retirés / modifiés ; les `keep` dernières
+    versions sont gardées, au-delà le client repart d'un état complet.
+    """
+
+    def __init__(self, keep: int = 32):
+        self.version = 0
+        self._seen: Dict[int, Tuple[Optional[str], Optional[int]]] = {}  # id -> (espèce, énergie) à self.version
+        self._log: deque = deque(maxlen=keep)  # (version, ajoutés, retirés, modifiés, réseau trophique changé)
+        self._key = None
+        self._web = None
+
+    def commit(self, ctx) -> int:
+        """Nouvelle version si l'état a changé depuis le dernier commit ; renvoie la version courante."""
+        state = ctx["state"]
+        # numéro d'écriture inchangé => état inchangé : toute mutation passe par writing(ctx)
+        # (simulation/view.py), y compris celles qui ne touchent que les énergies (fast_forward)
+        key = ctx["seq"]
+        if key == self._key and ctx["food_web"] is self._web:
+            return self.version
+        self._key = key
+
+        species, energy = ctx["indiv_species"], state.energy
+        seen = self._seen
+        now = {i: (species.get(i), energy.get(i)) for i in state.active}
+        added, updated = set(), set()
+        for i, v in now.items():
+            old = seen.get(i)
+            if old is None:
+                added.add(i)
+            elif old != v:
+                updated.add(i)
+        removed = {i: sp for i, (sp, _) in seen.items() if i not in now}
+        web_changed = ctx["food_web"] is not self._web
+
+        if added or removed or updated or web_changed:
+            self.version += 1
+            self._log.append((self.version, added, removed, updated, web_changed))
+            self._seen = now
+            self._web = ctx["food_web"]
+        return self.version
+
+    def log(self) -> tuple:
+        """Journal figé (entrées jamais modifiées après commit) : since() hors lock, cf. simulation/view.py."""
+        return tuple(self._log)
+
+    def since(self, version: int) -> Optional[Tuple[Set[int], Dict[int, Optional[str]], Set[int], bool]]:
+        """
+        (ajoutés, retirés {id: espèce}, modifiés, réseau changé) depuis `version` ;
+        None si la version est inconnue ou sortie du journal.
+        """
+        return changes_since(self._log, self.version, version)
+
+def changes_since(log, current: int, version: int) -> Optional[Tuple[Set[int], Dict[int, Optional[str]], Set[int], bool]]:
+    """StateChanges.since sur un journal `log` dont la dernière version est `current`."""
+    if version == current:
+        return set(), {}, set(), False
+    if version > current or not log or log[0][0] > version + 1:
+        return None
+
+    added, removed, updated = set(), {}, set()
+    web = False
+    for v, a, r, u, w in log:
+        if v <= version:
+            continue
+        for i, sp in r.items():
+            if i in added:
+                added.discard(i)
+            else:
+                updated.discard(i)
+                removed[i] = sp
+        for i in a:
+            if i in removed:  # id réutilisé (après un reset)
+                del removed[i]
+                updated.add(i)
+            else:
+                added.add(i)
+        updated.update(i for i in u if i not in added)
+        web = web or w
+    return added, removed, updated, web
@@ -0,0 +1,364 @@
+"""
+Journal d'événements d'un run : une ligne par naissance, reproduction,
+broutage, chasse ou mort de faim, en colonnes dans un répertoire
+
+    <run>/meta.json       format, graine, moteur, paramètres, table des espèces, plantes, segments
+    <run>/seg-000001.npz  t, kind, actor, victim, species, prey, delta (un segment par lot)
+
+Les step ajoutent en mémoire (listes / tableaux NumPy) ; tous les
+EVENT_CHUNK événements le lot est passé à un thread d'écriture : le step
+n'attend jamais le disque. Append-only : un segment écrit ne change plus.
+
+Rejeu : l'état au step t (qui est vivant, de quelle espèce, avec quelle
+énergie) se recalcule depuis les SEED de t=0, le coût de vie implicite de
+chaque step (COST_STEP, sauf plantes) et les deltas d'énergie journalisés.
+Moteurs dict, array et spatial (le moteur aggregate n'a pas d'individus).
+
+    python -m simulation.eventlog events/<run> --replay 50
+    python -m simulation.eventlog events/<run> --kills hunt
+"""
+import argparse
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ontology.species import local_name
+
+EVENT_FORMAT = 1
+EVENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "events")
+EVENT_CHUNK = 1 << 16  # événements par segment
+
+# actor : individu concerné ; victim : proie (GRAZE / HUNT), sinon -1 ;
+# delta : variation d'énergie de l'actor (SEED / BIRTH : énergie initiale)
+KINDS = ("seed", "birth", "repro", "graze", "hunt", "starve")
+SEED, BIRTH, REPRO, GRAZE, HUNT, STARVE = range(len(KINDS))
+
+COLUMNS = {
+    "t": np.int32,
+    "kind": np.int8,
+    "actor": np.int64,
+    "victim": np.int64,
+    "species": np.int32,  # code d'espèce de l'actor (table meta["species"]), -1 : inconnue
+    "prey": np.int32,     # code d'espèce de la victime, -1 sinon
+    "delta": np.int32,
+}
+
+def new_run_name(seed) -> str:
+    return f"run-{time.strftime('%Y%m%d-%H%M%S')}-{seed}-{secrets.token_hex(3)}"
+
+def run_path(name: str, directory: str = EVENT_DIR) -> str:
+    """Répertoire du journal `name` (nom simple, pas de chemin) ; ValueError sinon."""
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        raise ValueError(f"Nom de journal invalide: {name}")
+    return os.path.join(directory, name)
+
+def list_runs(directory: str = EVENT_DIR) -> list:
+    """Résumé (meta.json) des journaux de `directory`, par nom."""
+    if not os.path.isdir(directory):
+        return []
+    out = []
+    for name in sorted(os.listdir(directory)):
+        try:
+            meta = _read_meta(os.path.join(directory, name))
+        except ValueError:
+            continue
+        out.append({"name": name, "seed": meta["seed"], "engine": meta["engine"], "t": meta["t"],
+                    "events": meta["events"], "closed": meta["closed"]})
+    return out
+
+def _read_meta(path: str) -> dict:
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"Journal introuvable ou invalide: {os.path.basename(path)}")
+    if meta.get("format") != EVENT_FORMAT:
+        raise ValueError(f"Format de journal non supporté: {meta.get('format')}")
+    return meta
+
+# --- écriture ---
+
+class EventLog:
+    """
+    Journal append-only d'un run. `t` : step en cours (mis à jour par
+    step_world). add() pour le moteur dict (un événement), add_slots() pour
+    les moteurs à colonnes (un tableau de slots par appel).
+    """
+
+    def __init__(self, path: str, meta: dict, chunk: int = EVENT_CHUNK):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.chunk = chunk
+        self.t = 0
+        self.meta = dict(meta, format=EVENT_FORMAT, t=0, events=0, segments=0, closed=False)
+        self.species: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._pop_codes = (None, None)  # (liste d'espèces d'une population, codes correspondants)
+
+        self._rows: List[tuple] = []         # événements unitaires pas encore mis en colonnes
+        self._batches: List[tuple] = []      # lots de colonnes du segment en cours
+        self._size = 0
+        self.events = 0
+        self.segments = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=4)  # au-delà, le step attend l'écriture
+        self._writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+        self._writer.start()
+        self._queue.put((None, self._meta_snapshot()))
+
+    # --- ajout ---
+
+    def code(self, species_str: Optional[str]) -> int:
+        if species_str is None:
+            return -1
+        c = self._codes.get(species_str)
+        if c is None:
+            c = self._codes[species_str] = len(self.species)
+            self.species.append(species_str)
+        return c
+
+    def add(self, kind: int, actor: int, victim: int = -1, species: Optional[str] = None,
+            prey: Optional[str] = None, delta: int = 0) -> None:
+        self._rows.append((self.t, kind, actor, victim, self.code(species), self.code(prey), delta))
+        self._size += 1
+        if self._size >= self.chunk:
+            self.flush()
+
+    def add_slots(self, kind: int, pop, actors: np.ndarray, victims: Optional[np.ndarray] = None, delta=0) -> None:
+        """Un événement par slot de `actors` (PopulationArrays) ; `victims` : slots des proies, même longueur."""
+        n = len(actors)
+        if not n:
+            return
+        codes = self._species_codes(pop.species)
+        none = np.full(n, -1, dtype=np.int64)
+        self._seal_rows()
+        self._batches.append((
+            np.full(n, self.t, dtype=np.int32),
+            np.full(n, kind, dtype=np.int8),
+            pop.ids[actors],
+            pop.ids[victims] if victims is not None else none,
+            codes[pop.sp[actors]],
+            codes[pop.sp[victims]] if victims is not None else none,
+            np.broadcast_to(np.asarray(delta, dtype=np.int32), (n,)).copy(),
+        ))
+        self._size += n
+        if self._size >= self.chunk:
+            self.flush()
+
+    def _species_codes(self, species: List[str]) -> np.ndarray:
+        """Codes du journal par index d'espèce de la population ; dernier élément (index -1) : -1."""
+        key, codes = self._pop_codes
+        if key is not species:
+            codes = np.array([self.code(sp) for sp in species] + [-1], dtype=np.int32)
+            self._pop_codes = (species, codes)
+        return codes
+
+    def _seal_rows(self) -> None:
+        if self._rows:
+            cols = list(zip(*self._rows))
+            self._batches.append(tuple(np.array(c, dtype=d) for c, d in zip(cols, COLUMNS.values())))
+            self._rows = []
+
+    # --- écriture (thread) ---
+
+    def _meta_snapshot(self) -> dict:
+        return dict(self.meta, t=self.t, events=self.events, segments=self.segments, species=list(self.species))
+
+    def flush(self) -> None:
+        """Passe le segment en cours au thread d'écriture (sans attendre)."""
+        self._seal_rows()
+        if not self._batches:
+            return
+        cols = {name: np.concatenate([b[k] for b in self._batches]) for k, name in enumerate(COLUMNS)}
+        self.events += self._size
+        self.segments += 1
+        self._batches, self._size = [], 0
+        self._queue.put((os.path.join(self.path, f"seg-{self.segments:06d}.npz"), self._meta_snapshot(), cols))
+
+    def sync(self) -> None:
+        """flush() puis attend que tout soit sur disque (lecture du journal d'un run en cours)."""
+        self.flush()
+        self._queue.put((None, self._meta_snapshot()))
+        self._queue.join()
+
+    def close(self) -> None:
+        if self.meta["closed"]:
+            return
+        self.flush()
+        self.meta["closed"] = True
+        self._queue.put((None, self._meta_snapshot()))
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                seg, meta, *cols = job
+                if seg is not None:
+                    tmp = f"{seg}.tmp"
+                    with open(tmp, "wb") as f:
+                        np.savez(f, **cols[0])
+                    os.replace(tmp, seg)
+                tmp = os.path.join(self.path, "meta.json.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+                os.replace(tmp, os.path.join(self.path, "meta.json"))
+            finally:
+                self._queue.task_done()
+
+def open_log(ctx, directory: str = EVENT_DIR) -> EventLog:
+    """Journal d'un nouveau run de `ctx` (après begin_run) : SEED de la population à t=0."""
+    state = ctx["state"]
+    plants = sorted(sp for sp, tr in ctx["species_traits"].items() if tr.get("is_plant", False))
+    log = EventLog(os.path.join(directory, new_run_name(ctx["rng"].seed)), {
+        "seed": ctx["rng"].seed,
+        "engine": state.engine,
+        "params": state.params,
+        "plants": plants,
+    })
+    species = ctx["indiv_species"]
+    for u in state.active:
+        log.add(SEED, u, species=species.get(u), delta=state.energy[u])
+    return log
+
+def close_log(ctx) -> None:
+    log = ctx.get("events")
+    if log is not None:
+        log.close()
+        ctx["events"] = None
+
+# --- lecture ---
+
+class EventReader:
+    """Lecture d'un journal (fermé ou en cours, jusqu'au dernier segment écrit)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta = _read_meta(path)
+        self.species: List[str] = self.meta["species"]
+
+    def segments(self, t0: int = 0, t1: Optional[int] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Colonnes segment par segment, restreintes à t0 <= t <= t1 (segments en ordre de t)."""
+        for k in range(1, self.meta["segments"] + 1):
+            with np.load(os.path.join(self.path, f"seg-{k:06d}.npz")) as z:
+                t = z["t"]
+                if not len(t) or t[-1] < t0:
+                    continue
+                if t1 is not None and t[0] > t1:
+                    return
+                keep = (t >= t0) & (t <= t1 if t1 is not None else True)
+                yield {name: z[name][keep] for name in COLUMNS}
+
+    def replay(self, t: int) -> dict:
+        """État après le step t : {"t", "energy": {id: énergie}, "species": {id: espèce}}."""
+        p = self.meta["params"]
+        plant = {self.species.index(sp) for sp in self.meta["plants"] if sp in self.species}
+        energy: Dict[int, int] = {}
+        species: Dict[int, int] = {}
+        now = 0
+
+        def advance_to(s: int) -> None:
+            nonlocal now
+            # coût de vie de chaque step entamé (avant ses événements), sauf plantes
+            for _ in range(now, s):
+                for u, c in species.items():
+                    if c not in plant:
+                        energy[u] -= p["COST_STEP"]
+            now = s
+
+        for seg in self.segments(0, t):
+            cols = [seg[name].tolist() for name in ("t", "kind", "actor", "victim", "species", "delta")]
+            for s, kind, actor, victim, sp, delta in zip(*cols):
+                if s > now:
+                    advance_to(s)
+                if kind == SEED or kind == BIRTH:
+                    energy[actor], species[actor] = delta, sp
+                elif kind == STARVE:
+                    energy.pop(actor, None)
+                    species.pop(actor, None)
+                else:
+                    if victim >= 0:
+                        energy.pop(victim, None)
+                        species.pop(victim, None)
+                    if actor in energy:
+                        energy[actor] += delta
+        advance_to(t)
+        names = self.species
+        return {"t": t, "energy": energy, "species": {u: names[c] if c >= 0 else None for u, c in species.items()}}
+
+    def counts_at(self, t: int) -> Dict[str, int]:
+        """Effectifs par espèce après le step t (rejeu)."""
+        out: Dict[str, int] = defaultdict(int)
+        for sp in self.replay(t)["species"].values():
+            out[sp] += 1
+        return dict(out)
+
+    def per_step(self, kind: int, t0: int = 0, t1: Optional[int] = None, by: str = "species") -> Dict[str, dict]:
+        """
+        Nombre d'événements `kind` par step et par espèce (`by` : "species"
+        = espèce de l'actor, ex. prédateur ; "prey" = espèce de la victime) :
+        {espèce: {"t": [...], "count": [...]}}, steps sans événement et espèces inconnues omis.
+        """
+        acc: Dict[tuple, int] = defaultdict(int)
+        for seg in self.segments(t0, t1):
+            sel = seg["kind"] == kind
+            if not sel.any():
+                continue
+            key = seg["t"][sel].astype(np.int64) * (len(self.species) + 1) + (seg[by][sel] + 1)
+            keys, n = np.unique(key, return_counts=True)
+            for k, c in zip(keys.tolist(), n.tolist()):
+                acc[divmod(k, len(self.species) + 1)] += c
+        out: Dict[str, dict] = {}
+        for (s, c), n in sorted(acc.items()):
+            if not c:
+                continue
+            row = out.setdefault(self.species[c - 1], {"t": [], "count": []})
+            row["t"].append(s)
+            row["count"].append(n)
+        return out
+
+    def totals(self, t0: int = 0, t1: Optional[int] = None) -> Dict[str, int]:
+        """Nombre d'événements par type sur [t0, t1]."""
+        n = np.zeros(len(KINDS), dtype=np.int64)
+        for seg in self.segments(t0, t1):
+            n += np.bincount(seg["kind"], minlength=len(KINDS))
+        return dict(zip(KINDS, n.tolist()))
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Rejeu et requêtes sur un journal d'événements.")
+    ap.add_argument("path", help="répertoire du journal (events/<run>)")
+    ap.add_argument("--replay", type=int, metavar="T", help="effectifs par espèce après le step T")
+    ap.add_argument("--kills", choices=KINDS, metavar="KIND", help="événements KIND par step et par espèce de l'actor")
+    ap.add_argument("--by", choices=("species", "prey"), default="species")
+    ap.add_argument("--t0", type=int, default=0)
+    ap.add_argument("--t1", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    try:
+        reader = EventReader(args.path)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.replay is not None:
+        out = {local_name(sp) if sp else None: n for sp, n in sorted(reader.counts_at(args.replay).items(), key=str)}
+    elif args.kills:
+        out = {local_name(sp): row
+               for sp, row in reader.per_step(KINDS.index(args.kills), args.t0, args.t1, args.by).items()}
+    else:
+        out = dict(reader.meta, species=len(reader.species), totals=reader.totals(args.t0, args.t1))
+        out.pop("params")
+    print(json.dumps(out, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
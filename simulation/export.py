@@ -0,0 +1,248 @@
+"""
+Export en colonnes des trajectoires de runs, pour l'analyse hors ligne :
+
+    <nom>.trajectory.<ext>  run, t, species, count, energy_mean, energy_min, energy_max (une ligne par step et espèce)
+    <nom>.outcome.<ext>     run, status, t, seed, engine, params (JSON), final (JSON) (une ligne par run)
+
+Formats : Parquet (row groups), Arrow IPC (record batches) si pyarrow est
+installé, sinon CSV (toujours disponible). Les lignes sont écrites par lots
+de EXPORT_CHUNK pendant le run : la trajectoire n'est jamais gardée entière
+en mémoire. Un balayage (simulation.batch --export) écrit tous ses runs dans
+les deux mêmes fichiers, colonne `run` = index du run.
+"""
+import csv
+import json
+import math
+import os
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optionnel : export CSV seulement
+    pa = pq = None
+
+from simulation.eventlog import new_run_name
+
+EXPORT_FORMATS = ("parquet", "arrow", "csv")
+EXPORT_EXT = {"parquet": "parquet", "arrow": "arrow", "csv": "csv"}
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exports")
+EXPORT_CHUNK = 1 << 16  # lignes par lot (row group / record batch)
+EXPORT_READ_CHUNK = 1 << 20  # octets par morceau servi par /api/export
+
+TRAJECTORY_FIELDS = {
+    "run": "int64",
+    "t": "int32",
+    "species": "string",
+    "count": "int32",
+    "energy_mean": "float64",  # NaN si l'espèce est absente
+    "energy_min": "float64",
+    "energy_max": "float64",
+}
+OUTCOME_FIELDS = {
+    "run": "int64",
+    "status": "string",
+    "t": "int32",
+    "seed": "int64",
+    "engine": "string",
+    "params": "string",
+    "final": "string",
+}
+
+def available_formats() -> tuple:
+    return EXPORT_FORMATS if pa is not None else ("csv",)
+
+def resolve_format(fmt: Optional[str]) -> str:
+    """Format demandé (None : Parquet si disponible, sinon CSV) ; ValueError si indisponible."""
+    if fmt is None:
+        return available_formats()[0]
+    if fmt not in available_formats():
+        raise ValueError(f"Format d'export indisponible: {fmt} (disponibles: {', '.join(available_formats())})")
+    return fmt
+
+def export_path(name: str, directory: str = EXPORT_DIR) -> str:
+    """Fichier `name` de `directory` (nom simple, pas de chemin) ; ValueError sinon."""
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        raise ValueError(f"Nom d'export invalide: {name}")
+    return os.path.join(directory, name)
+
+def list_exports(directory: str = EXPORT_DIR) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return [{"name": e.name, "bytes": e.stat().st_size}
+            for e in sorted(os.scandir(directory), key=lambda e: e.name) if e.is_file() and not e.name.endswith(".tmp")]
+
+def read_chunks(path: str, limit: Optional[int] = None, size: int = EXPORT_READ_CHUNK) -> Iterator[bytes]:
+    """Contenu du fichier (ses `limit` premiers octets) par morceaux de `size` octets (réponse HTTP en flux)."""
+    left = limit if limit is not None else float("inf")
+    with open(path, "rb") as f:
+        while left > 0:
+            block = f.read(int(min(size, left)))
+            if not block:
+                return
+            left -= len(block)
+            yield block
+
+# --- écriture ---
+
+class TableSink:
+    """Une table écrite par lots : Parquet (un row group par lot), Arrow IPC (un record batch) ou CSV."""
+
+    def __init__(self, path: str, fields: Dict[str, str], fmt: str):
+        self.path = path
+        self.fields = fields
+        self.fmt = fmt
+        self.rows = 0
+        if fmt == "csv":
+            self._file = open(path, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(fields)
+        else:
+            self._schema = pa.schema([(name, getattr(pa, typ)()) for name, typ in fields.items()])
+            if fmt == "parquet":
+                self._writer = pq.ParquetWriter(path, self._schema)
+            else:
+                self._file = pa.OSFile(path, "wb")
+                self._writer = pa.ipc.new_file(self._file, self._schema)
+
+    def write(self, cols: Dict[str, list]) -> None:
+        n = len(cols["run"])
+        if not n:
+            return
+        if self.fmt == "csv":
+            self._csv.writerows(
+                ("" if isinstance(v, float) and math.isnan(v) else v for v in row)
+                for row in zip(*(cols[name] for name in self.fields))
+            )
+            self._file.flush()
+        elif self.fmt == "parquet":
+            self._writer.write_table(pa.Table.from_pydict(cols, schema=self._schema))
+        else:
+            self._writer.write_batch(pa.RecordBatch.from_pydict(cols, schema=self._schema))
+        self.rows += n
+
+    def close(self) -> None:
+        if self.fmt == "csv":
+            self._file.close()
+            return
+        self._writer.close()
+        if self.fmt == "arrow":
+            self._file.close()
+
+class TrajectoryExport:
+    """Paire de fichiers (trajectoires, issues) d'un run ou d'un balayage."""
+
+    def __init__(self, base: str, fmt: Optional[str] = None):
+        self.fmt = resolve_format(fmt)
+        ext = EXPORT_EXT[self.fmt]
+        os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+        self.name = os.path.basename(base)
+        self.trajectory = TableSink(f"{base}.trajectory.{ext}", TRAJECTORY_FIELDS, self.fmt)
+        self.outcome = TableSink(f"{base}.outcome.{ext}", OUTCOME_FIELDS, self.fmt)
+        self.closed = False
+
+    def write(self, cols: Dict[str, list]) -> None:
+        self.trajectory.write(cols)
+
+    def write_outcome(self, run: int, status: Optional[str], t: int, seed: int, engine: str,
+                      params: dict, final: Dict[str, int]) -> None:
+        self.outcome.write({
+            "run": [run], "status": [status or "INCOMPLETE"], "t": [t], "seed": [seed], "engine": [engine],
+            "params": [json.dumps(params, sort_keys=True)], "final": [json.dumps(final, sort_keys=True)],
+        })
+
+    def close(self) -> dict:
+        if not self.closed:
+            self.trajectory.close()
+            self.outcome.close()
+            self.closed = True
+        return {
+            "format": self.fmt,
+            "trajectory": os.path.basename(self.trajectory.path),
+            "outcome": os.path.basename(self.outcome.path),
+            "rows": self.trajectory.rows,
+            "runs": self.outcome.rows,
+        }
+
+class TrajectoryRecorder:
+    """
+    Lignes (step, espèce) d'un run, en colonnes. Avec `sink`, passées par
+    lots de `chunk` lignes au fichier ; sans (worker d'un balayage), gardées
+    jusqu'à columns() : le processus parent les écrit et les libère.
+    """
+
+    def __init__(self, run: int = 0, sink: Optional[TrajectoryExport] = None, chunk: int = EXPORT_CHUNK):
+        self.run = run
+        self.sink = sink
+        self.chunk = chunk
+        self._cols: Dict[str, List] = {name: [] for name in TRAJECTORY_FIELDS}
+
+    def record(self, t: int, counts: Dict[str, int], stats: Dict[str, dict]) -> None:
+        """Effectifs de toutes les espèces suivies (0 compris) et énergie des espèces présentes."""
+        c = self._cols
+        nan = math.nan
+        for sp, n in counts.items():
+            st = stats.get(sp) if n else None
+            c["run"].append(self.run)
+            c["t"].append(t)
+            c["species"].append(sp)
+            c["count"].append(n)
+            c["energy_mean"].append(st["energy_mean"] if st else nan)
+            c["energy_min"].append(float(st["energy_min"]) if st else nan)
+            c["energy_max"].append(float(st["energy_max"]) if st else nan)
+        if self.sink is not None and len(c["run"]) >= self.chunk:
+            self.flush()
+
+    def columns(self) -> Dict[str, list]:
+        cols = self._cols
+        self._cols = {name: [] for name in TRAJECTORY_FIELDS}
+        return cols
+
+    def flush(self) -> None:
+        self.sink.write(self.columns())
+
+def open_export(ctx, fmt: Optional[str] = None, directory: str = EXPORT_DIR) -> TrajectoryRecorder:
+    """Export du run qui démarre (après begin_run) : fichiers <directory>/<run>.*."""
+    return TrajectoryRecorder(sink=TrajectoryExport(os.path.join(directory, new_run_name(ctx["rng"].seed)), fmt))
+
+def close_export(ctx, status: Optional[str] = None) -> Optional[dict]:
+    """Écrit l'issue du run (status None : interrompu) et ferme les fichiers ; renvoie leur résumé."""
+    rec = ctx.get("export")
+    if rec is None:
+        return None
+    ctx["export"] = None
+    if rec.sink is None:
+        return None  # lignes gardées en mémoire (run d'un balayage) : lues par l'appelant
+    state = ctx["state"]
+    rec.flush()
+    rec.sink.write_outcome(rec.run, status, state.t, ctx["rng"].seed, state.engine, state.params, state.history.last())
+    return rec.sink.close()
+
+def history_csv(history, chunk: int = 1000) -> Iterator[str]:
+    """
+    Historique d'effectifs d'un monde en CSV (t, species, count), par blocs de
+    `chunk` steps : exact sur les lignes récentes, moyenne arrondie dans
+    l'archive repliée (simulation/history.py).
+    """
+    yield "t,species,count\n"
+    t_end = history.t
+    for t0 in range(0, t_end + 1, chunk):
+        t1 = min(t_end, t0 + chunk - 1)
+        q = history.query(t0, t1, buckets=t1 - t0 + 1)
+        lines = []
+        for k, t in enumerate(q["times"]):
+            for sp, v in q["species"].items():
+                lines.append(f"{t},{sp},{round(v['mean'][k])}\n")
+        yield "".join(lines)
+
+def read_table(path: str):
+    """Table exportée (pyarrow.Table si Parquet / Arrow, lignes dict si CSV) ; pour les scripts d'analyse."""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    if pa is None:
+        raise ValueError("pyarrow requis pour lire Parquet / Arrow")
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    with pa.memory_map(path) as src:
+        return pa.ipc.open_file(src).read_all()
@@ -0,0 +1,53 @@
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+FEED_MAXLEN = 1024
+
+class StepFeed:
+    """
+    Deltas des derniers steps (buffer circulaire) et notification des abonnés
+    (/api/stream). Un curseur = (run, t) : un client qui se reconnecte reprend
+    après son dernier t, ou repart d'un snapshot s'il est trop en retard.
+    """
+
+    def __init__(self, maxlen: int = FEED_MAXLEN):
+        self._buf = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.run = 0
+
+    def reset(self) -> int:
+        """Nouveau run : vide le buffer et réveille les abonnés."""
+        with self._cond:
+            self.run += 1
+            self._buf.clear()
+            self._cond.notify_all()
+            return self.run
+
+    def publish(self, delta: dict) -> None:
+        with self._cond:
+            self._buf.append(delta)
+            self._cond.notify_all()
+
+    def _since(self, t: int) -> Optional[List[dict]]:
+        if self._buf and self._buf[0]["t"] > t + 1:
+            return None  # trou : le client doit repartir d'un snapshot
+        return [d for d in self._buf if d["t"] > t]
+
+    def since(self, run: int, t: int) -> Tuple[int, Optional[List[dict]]]:
+        """(run courant, deltas après t) ; None si run changé ou curseur trop ancien."""
+        with self._cond:
+            if run != self.run:
+                return self.run, None
+            return self.run, self._since(t)
+
+    def wait(self, run: int, t: int, timeout: float) -> Tuple[int, Optional[List[dict]]]:
+        """Comme since(), mais attend au plus `timeout` s qu'un delta arrive."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: run != self.run or (self._buf and self._buf[-1]["t"] > t),
+                timeout=timeout,
+            )
+            if run != self.run:
+                return self.run, None
+            return self.run, self._since(t)
@@ -0,0 +1,242 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+HISTORY_MAX_ROWS = 8192
+
+class PopulationHistory:
+    """
+    Effectifs par espèce au cours du temps, en colonnes NumPy (une par espèce).
+
+    Seuls les changements sont stockés (run-length sur le vecteur d'effectifs) :
+    une ligne (t, effectifs) quand au moins une espèce change, rien pendant
+    les plateaux. Au-delà de `max_rows` lignes, la plus ancienne moitié est
+    repliée dans une archive de segments (début, durée, min, max, somme) qui
+    est elle-même grossie par paires : mémoire bornée, résolution dégradée
+    seulement pour le passé lointain.
+    """
+
+    def __init__(self, max_rows: int = HISTORY_MAX_ROWS):
+        self.max_rows = max(16, max_rows)
+        self.species: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.start: List[int] = []   # premier t enregistré par espèce
+        self.t = -1                  # dernier t enregistré
+
+        # lignes exactes (points de changement)
+        self._n = 0
+        self._t = np.zeros(64, dtype=np.int64)
+        self._rows = np.zeros((64, 0), dtype=np.int32)
+
+        # archive : segments [a_t, a_t + a_n) résumés par min / max / somme
+        self._a_t = np.zeros(0, dtype=np.int64)
+        self._a_n = np.zeros(0, dtype=np.int64)
+        self._a_min = np.zeros((0, 0), dtype=np.int32)
+        self._a_max = np.zeros((0, 0), dtype=np.int32)
+        self._a_sum = np.zeros((0, 0), dtype=np.float64)
+
+    # --- écriture ---
+
+    def __len__(self) -> int:
+        return self.t + 1
+
+    def __contains__(self, sp) -> bool:
+        return sp in self.index
+
+    def clear(self) -> None:
+        self.__init__(self.max_rows)
+
+    def ensure(self, sp: str, t: int) -> int:
+        """Colonne de l'espèce (créée au besoin, à 0 avant `t`)."""
+        c = self.index.get(sp)
+        if c is not None:
+            return c
+        c = self.index[sp] = len(self.species)
+        self.species.append(sp)
+        self.start.append(t)
+        self._rows = np.hstack([self._rows, np.zeros((len(self._rows), 1), dtype=np.int32)])
+        self._a_min = np.hstack([self._a_min, np.zeros((len(self._a_t), 1), dtype=np.int32)])
+        self._a_max = np.hstack([self._a_max, np.zeros((len(self._a_t), 1), dtype=np.int32)])
+        self._a_sum = np.hstack([self._a_sum, np.zeros((len(self._a_t), 1), dtype=np.float64)])
+        return c
+
+    def append(self, t: int, counts: Dict[str, int]) -> None:
+        """Effectifs au temps t (0 pour les espèces absentes de `counts` ; espèces sans colonne ignorées)."""
+        row = np.zeros(len(self.species), dtype=np.int32)
+        for sp, n in counts.items():
+            c = self.index.get(sp)
+            if c is not None:
+                row[c] = n
+        self.t = t
+
+        if self._n and np.array_equal(self._rows[self._n - 1], row):
+            return  # plateau : rien à stocker
+        if self._n == len(self._t):
+            self._t = np.concatenate([self._t, np.zeros_like(self._t)])
+            self._rows = np.vstack([self._rows, np.zeros_like(self._rows)])
+        self._t[self._n] = t
+        self._rows[self._n] = row
+        self._n += 1
+        if self._n > self.max_rows:
+            self._fold()
+
+    def _fold(self) -> None:
+        """Replie la plus ancienne moitié des lignes exactes dans l'archive."""
+        k = self._n // 2
+        t = self._t[:k + 1]
+        n = np.diff(t)
+        rows = self._rows[:k]
+        self._a_t = np.concatenate([self._a_t, t[:-1]])
+        self._a_n = np.concatenate([self._a_n, n])
+        self._a_min = np.vstack([self._a_min, rows])
+        self._a_max = np.vstack([self._a_max, rows])
+        self._a_sum = np.vstack([self._a_sum, rows * n[:, None].astype(np.float64)])
+
+        self._t[:self._n - k] = self._t[k:self._n]
+        self._rows[:self._n - k] = self._rows[k:self._n]
+        self._n -= k
+
+        while len(self._a_t) > self.max_rows:
+            self._coarsen()
+
+    def _coarsen(self) -> None:
+        """Fusionne les segments d'archive deux à deux."""
+        m = len(self._a_t) // 2 * 2
+        tail = slice(m, None)
+        self._a_t = np.concatenate([self._a_t[:m:2], self._a_t[tail]])
+        self._a_n = np.concatenate([self._a_n[:m:2] + self._a_n[1:m:2], self._a_n[tail]])
+        self._a_min = np.vstack([np.minimum(self._a_min[:m:2], self._a_min[1:m:2]), self._a_min[tail]])
+        self._a_max = np.vstack([np.maximum(self._a_max[:m:2], self._a_max[1:m:2]), self._a_max[tail]])
+        self._a_sum = np.vstack([self._a_sum[:m:2] + self._a_sum[1:m:2], self._a_sum[tail]])
+
+    # --- lecture ---
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self._t, self._rows, self._a_t, self._a_n, self._a_min, self._a_max, self._a_sum))
+
+    def last(self) -> Dict[str, int]:
+        """Effectifs au dernier t enregistré."""
+        if not self._n:
+            return {}
+        row = self._rows[self._n - 1]
+        return {sp: int(row[c]) for sp, c in self.index.items()}
+
+    def length(self, sp: str) -> int:
+        """Nombre de valeurs enregistrées pour l'espèce (comme len(history[sp]) avant)."""
+        c = self.index.get(sp)
+        return 0 if c is None else self.t - self.start[c] + 1
+
+    def window_range(self, t0: int) -> np.ndarray:
+        """
+        max - min par espèce sur [t0, t]. Exact tant que t - t0 < max_rows / 2
+        (il reste toujours au moins max_rows / 2 lignes exactes) ; au-delà,
+        majoré par les segments d'archive.
+        """
+        i = max(0, int(np.searchsorted(self._t[:self._n], t0, side="right")) - 1)
+        rows = self._rows[i:self._n]
+        lo = rows.min(axis=0)
+        hi = rows.max(axis=0)
+        if len(self._a_t) and (not self._n or t0 < self._t[0]):
+            j = max(0, int(np.searchsorted(self._a_t, t0, side="right")) - 1)
+            lo = np.minimum(lo, self._a_min[j:].min(axis=0))
+            hi = np.maximum(hi, self._a_max[j:].max(axis=0))
+        return hi - lo
+
+    def _segments(self, t0: int, t1: int, edges: Optional[np.ndarray] = None):
+        """
+        Segments couvrant [t0, t1), découpés aux bornes `edges` : (début, durée,
+        min, max, somme). Un segment d'archive coupé garde son min / max (bornes)
+        et sa somme au prorata de la durée de chaque morceau.
+        """
+        starts, lens, mins, maxs, sums = [], [], [], [], []
+        bounds = np.unique(np.concatenate([[t0, t1], edges if edges is not None else []]).astype(np.int64))
+
+        if len(self._a_t):
+            sel = np.flatnonzero((self._a_t < t1) & (self._a_t + self._a_n > t0))
+            a = np.maximum(self._a_t[sel], t0)
+            e = np.minimum(self._a_t[sel] + self._a_n[sel], t1)
+            # intervalles [bounds[k], bounds[k + 1]) touchés par chaque segment : first..last
+            first = np.searchsorted(bounds, a, side="right") - 1
+            last = np.searchsorted(bounds, e - 1, side="right") - 1
+            count = last - first + 1
+            seg = np.repeat(np.arange(len(sel)), count)
+            k = np.repeat(first, count) + (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count))
+            p_t = np.maximum(a[seg], bounds[k])
+            p_n = np.minimum(e[seg], bounds[k + 1]) - p_t
+            src = sel[seg]
+            starts.append(p_t)
+            lens.append(p_n)
+            mins.append(self._a_min[src])
+            maxs.append(self._a_max[src])
+            sums.append(self._a_sum[src] * (p_n / self._a_n[src])[:, None])
+
+        if self._n:
+            ts = self._t[:self._n]
+            lo = max(t0, int(ts[0]))
+            if lo < t1:
+                cut = np.unique(np.concatenate([ts, [lo], bounds]).astype(np.int64))
+                cut = cut[(cut >= lo) & (cut <= t1)]
+                # chaque segment tient dans une seule ligne (les débuts de ligne sont des coupures)
+                seg_t, seg_n = cut[:-1], np.diff(cut)
+                vals = self._rows[np.searchsorted(ts, seg_t, side="right") - 1]
+                starts.append(seg_t)
+                lens.append(seg_n)
+                mins.append(vals)
+                maxs.append(vals)
+                sums.append(vals * seg_n[:, None].astype(np.float64))
+
+        S = len(self.species)
+        if not starts:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                    np.zeros((0, S), dtype=np.int32), np.zeros((0, S), dtype=np.int32), np.zeros((0, S)))
+        return (np.concatenate(starts), np.concatenate(lens),
+                np.vstack(mins), np.vstack(maxs), np.vstack(sums))
+
+    def query(self, t0: int = 0, t1: Optional[int] = None, buckets: int = 200, species: Optional[Iterable[str]] = None) -> dict:
+        """
+        [t0, t1] découpé en au plus `buckets` intervalles de même largeur ;
+        min / max / moyenne par intervalle et par espèce. Taille de réponse
+        O(buckets x espèces), quelle que soit la durée du run.
+        """
+        t1 = self.t if t1 is None else min(t1, self.t)
+        cols = [self.index[sp] for sp in (species if species is not None else self.species) if sp in self.index]
+        out = {"t0": t0, "t1": t1, "width": 0, "times": [], "species": {}}
+        if t1 < t0 or self.t < 0:
+            return out
+
+        width = max(1, -(-(t1 - t0 + 1) // max(1, buckets)))
+        edges = np.arange(t0, t1 + 1, width, dtype=np.int64)
+        B = len(edges)
+        starts, lens, mins, maxs, sums = self._segments(t0, t1 + 1, edges)
+        b = np.clip(np.searchsorted(edges, starts, side="right") - 1, 0, B - 1)
+
+        n = np.zeros(B, dtype=np.int64)
+        np.add.at(n, b, lens)
+        out["width"] = int(width)
+        out["times"] = edges.tolist()
+        for c in cols:
+            lo = np.full(B, np.iinfo(np.int32).max, dtype=np.int64)
+            hi = np.full(B, -1, dtype=np.int64)
+            total = np.zeros(B)
+            np.minimum.at(lo, b, mins[:, c])
+            np.maximum.at(hi, b, maxs[:, c])
+            np.add.at(total, b, sums[:, c])
+            empty = n == 0
+            lo[empty] = 0
+            hi[empty] = 0
+            out["species"][self.species[c]] = {
+                "min": lo.tolist(),
+                "max": hi.tolist(),
+                "mean": np.round(np.divide(total, n, out=np.zeros(B), where=~empty), 3).tolist(),
+            }
+        return out
+
+    def series(self, max_points: int = 1000) -> dict:
+        """Série pour un graphe : valeurs exactes si le run est court, moyennes par intervalle sinon."""
+        q = self.query(0, self.t, buckets=max_points)
+        return {
+            "times": q["times"],
+            "width": q["width"],
+            "values": {sp: (v["min"] if q["width"] == 1 else v["mean"]) for sp, v in q["species"].items()},
+        }
@@ -0,0 +1,62 @@
+from typing import Dict, Optional
+
+from rdflib import URIRef
+
+from ontology.loader import AWO4
+from ontology.species import local_name
+
+class IdAllocator:
+    """
+    Ids entiers des individus d'un monde : compteur croissant (jamais réutilisé,
+    donc jamais de collision) + table d'internement id <-> URIRef remplie à
+    la demande, seulement pour les individus qui apparaissent dans l'overlay
+    ou dans une réponse de l'API. Tout le reste (active, energy,
+    indiv_species, journal, moteur array) est indexé par l'entier.
+    """
+
+    def __init__(self, start: int = 1):
+        self.next_id = start
+        self.uris: Dict[int, URIRef] = {}    # id -> URIRef (internés)
+        self.by_uri: Dict[URIRef, int] = {}  # URIRef -> id
+
+    def __len__(self) -> int:
+        return len(self.uris)
+
+    def new(self) -> int:
+        i = self.next_id
+        self.next_id += 1
+        return i
+
+    def reserve(self, count: int) -> int:
+        """`count` ids consécutifs ; renvoie le premier."""
+        i = self.next_id
+        self.next_id += count
+        return i
+
+    @staticmethod
+    def mint(i: int, species_str: Optional[str] = None) -> URIRef:
+        """URIRef <espèce><id>, sans l'interner (ex. individu déjà mort)."""
+        name = local_name(species_str).lower() if species_str else "individual"
+        return AWO4[f"{name}{i}"]
+
+    def uri(self, i: int, species_str: Optional[str] = None) -> URIRef:
+        """URIRef de l'individu (créée au premier appel : <espèce><id>)."""
+        u = self.uris.get(i)
+        if u is None:
+            u = self.mint(i, species_str)
+            self.uris[i] = u
+            self.by_uri[u] = i
+        return u
+
+    def lookup(self, u: URIRef) -> Optional[int]:
+        """Id d'une URIRef déjà internée (None sinon)."""
+        return self.by_uri.get(URIRef(u))
+
+    def release(self, i: int) -> None:
+        """Oublie l'URIRef d'un individu mort (une fois l'overlay à jour)."""
+        u = self.uris.pop(i, None)
+        if u is not None:
+            self.by_uri.pop(u, None)
+
+    def clear(self) -> None:
+        self.__init__()
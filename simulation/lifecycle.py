@@ -1,47 +1,58 @@
-import random
 from rdflib import URIRef, RDF
 from rdflib import Graph
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 
-from ontology.loader import AWO4
-from ontology.species import local_name
-from graph.eats import add_edges_for_new_individual
+from graph.overlay import OverlayJournal, remove_individual_triples
+from simulation.ids import IdAllocator
 
 def create_individual(
-    overlay_g: Graph,
-    active: Set[URIRef],
-    energy: Dict[URIRef, int],
+    overlay_g: Optional[Graph],
+    active: Set[int],
+    energy: Dict[int, int],
     params: dict,
-    indiv_species: Dict[URIRef, str],
+    indiv_species: Dict[int, str],
     known_species: Set[str],
-    species_prey: dict,
     species_str: str,
-) -> URIRef:
-    uri = AWO4[f"{local_name(species_str).lower()}{random.randint(1000,9999)}"]
-    overlay_g.add((uri, RDF.type, URIRef(species_str)))
-    active.add(uri)
+    ids: IdAllocator,
+    journal: Optional[OverlayJournal] = None,
+) -> int:
+    """overlay_g=None : l'overlay n'est pas touché, la naissance va dans `journal`. Renvoie l'id."""
+    # id neuf : jamais de collision avec un individu vivant ou mort
+    u = ids.new()
+    active.add(u)
 
-    indiv_species[uri] = species_str
+    indiv_species[u] = species_str
     known_species.add(species_str)
-    energy[uri] = params["E_INIT"]
+    energy[u] = params["E_INIT"]
 
-    # edges locales si rules déjà construites
-    if species_prey:
-        add_edges_for_new_individual(overlay_g, active, indiv_species, species_prey, uri)
+    if overlay_g is None:
+        if journal is not None:
+            journal.record_birth(u, species_str)
+        return u
 
-    return uri
+    overlay_g.add((ids.uri(u, species_str), RDF.type, URIRef(species_str)))
+    return u
 
 def remove_individual(
-    overlay_g: Graph,
-    active: Set[URIRef],
-    energy: Dict[URIRef, int],
-    indiv_species: Dict[URIRef, str],
-    u: URIRef,
+    overlay_g: Optional[Graph],
+    active: Set[int],
+    energy: Dict[int, int],
+    indiv_species: Dict[int, str],
+    u: int,
+    ids: IdAllocator,
+    journal: Optional[OverlayJournal] = None,
 ) -> None:
     active.discard(u)
     indiv_species.pop(u, None)
     energy.pop(u, None)
 
+    if overlay_g is None:
+        if journal is not None:
+            journal.record_death(u)
+        return
+
     # enlever triples liés dans overlay
-    for t in list(overlay_g.triples((u, None, None))) + list(overlay_g.triples((None, None, u))):
-        overlay_g.remove(t)
+    uri = ids.uris.get(u)
+    if uri is not None:
+        remove_individual_triples(overlay_g, uri)
+        ids.release(u)
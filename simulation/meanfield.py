@@ -0,0 +1,165 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from simulation.aggregate import AggregatePopulation, shift_levels
+from simulation.vectorized import H
+
+# en dessous d'un demi-individu, une espèce est considérée éteinte (pas de "queue" infinitésimale)
+EXTINCT = 0.5
+
+def _graze_left(plants: float, herbivores: float) -> float:
+    """
+    Plantes restantes après le passage de `herbivores` herbivores, chacun
+    mangeant avec p = R / (R + H) (R : plantes restantes) : solution de
+    dR/dn = -R / (R + H), soit R + H ln R = R0 + H ln R0 - n (Newton en x = ln R).
+    """
+    if plants <= 0 or herbivores <= 0:
+        return max(plants, 0.0)
+    c = plants + H * np.log(plants) - herbivores
+    x = np.log(plants)
+    for _ in range(60):  # g(x) = e^x + Hx - c convexe croissante : Newton monotone depuis la droite
+        step = (np.exp(x) + H * x - c) / (np.exp(x) + H)
+        x -= step
+        if abs(step) < 1e-12:
+            break
+    return float(np.exp(x))
+
+def _fill(demand: np.ndarray, rows: np.ndarray, avail: np.ndarray) -> np.ndarray:
+    """
+    Version déterministe de aggregate._spread : demandes du groupe g réparties
+    également entre les espèces de rows[g] encore disponibles, espèces
+    sur-demandées partagées au prorata, reliquat redistribué. Prises (G x S).
+    """
+    taken = np.zeros(rows.shape)
+    remaining = np.asarray(demand, dtype=float).copy()
+    avail = np.asarray(avail, dtype=float).copy()
+    for _ in range(rows.shape[1] + 1):
+        choice = rows & (avail > 1e-9)[None, :]
+        n_choice = choice.sum(axis=1)
+        remaining[n_choice == 0] = 0.0
+        if remaining.sum() <= 1e-9:
+            break
+        req = choice * (remaining / np.maximum(n_choice, 1))[:, None]
+        tot = req.sum(axis=0)
+        frac = np.where(tot > avail, avail / np.where(tot > 0, tot, 1.0), 1.0)
+        win = req * frac[None, :]
+        taken += win
+        avail -= win.sum(axis=0)
+        remaining -= win.sum(axis=1)
+    return taken
+
+def meanfield_step(pop: AggregatePopulation, params: dict) -> None:
+    """
+    Un step du modèle de champ moyen : espérance des règles R1-R4 sur les
+    histogrammes espèce x énergie (réels) de `pop`, sans tirage.
+    Mêmes termes que les moteurs stochastiques : broutage à demi-saturation H,
+    chasse HUNT_PROB, logistique K_PLANT, reproduction des individus nourris.
+    """
+    p = params
+    S = len(pop.species)
+    hungry = pop.hungry + pop.fed
+    fed = np.zeros_like(hungry)
+    animal = np.append(~pop.is_plant, True)
+
+    # R1: coût de vie (sauf plantes)
+    hungry[animal] = shift_levels(hungry[animal], -p["COST_STEP"])
+
+    # R2a: broutage
+    plants = hungry[:S].sum(axis=1) * pop.is_plant
+    herb_rows = np.flatnonzero(pop.is_herb)
+    n_herbs = hungry[herb_rows].sum()
+    feeders = plants.sum() - _graze_left(plants.sum(), n_herbs)
+    if feeders > 0:
+        eaten = _fill(np.array([feeders]), pop.is_plant[None, :], plants)[0]
+        hungry[:S] *= (1.0 - eaten / np.where(plants > 0, plants, 1.0))[:, None]
+        picked = hungry[herb_rows] * (feeders / n_herbs)
+        hungry[herb_rows] -= picked
+        fed[herb_rows] += shift_levels(picked, p["GAIN_PLANT"])
+
+    # R2b: chasse ; un chasseur tué dans la même phase ne profite pas de sa proie
+    carn_rows = np.flatnonzero(pop.is_carn & pop.prey.any(axis=1))
+    counts = (hungry + fed).sum(axis=1)
+    hunters = counts[carn_rows] * p["HUNT_PROB"]
+    if hunters.sum() > 0:
+        prey_avail = counts[:S] * ~pop.is_plant
+        taken = _fill(hunters, pop.prey[carn_rows], prey_avail)
+        victims = taken.sum(axis=0)
+        survive = 1.0 - victims / np.where(counts[:S] > 0, counts[:S], 1.0)
+        hungry[:S] *= survive[:, None]
+        fed[:S] *= survive[:, None]
+        for k, s in enumerate(carn_rows.tolist()):
+            left = hungry[s].sum() + fed[s].sum()
+            eaters = taken[k].sum() * survive[s]
+            if eaters <= 0 or left <= 0:
+                continue
+            q = min(1.0, eaters / left)
+            moved = (hungry[s] + fed[s]) * q
+            hungry[s] *= 1.0 - q
+            fed[s] *= 1.0 - q
+            fed[s] += shift_levels(moved, p["GAIN_PREY"])
+
+    # R3: famine
+    dead = pop.levels <= 0
+    hungry[np.ix_(animal, dead)] = 0.0
+    fed[np.ix_(animal, dead)] = 0.0
+
+    # R4a: plantes (logistique)
+    counts = (hungry + fed).sum(axis=1)[:S]
+    K = p["K_PLANT"]
+    grow = pop.is_plant & (counts > 0) & (counts < K)
+    births = np.where(grow, counts * p["P_REPRO_PLANT"] * np.clip(1.0 - counts / K, 0.0, None), 0.0)
+
+    # R4b/R4c: animaux nourris, énergie suffisante, >= 2 individus
+    ready = pop.levels >= p["E_REPRO"]
+    for role, p_repro in ((pop.is_herb, p["P_REPRO_HERB"]), (pop.is_carn, p["P_REPRO_CARN"])):
+        rows = np.flatnonzero(role & (counts >= 2))
+        k = fed[rows] * ready * p_repro
+        fed[rows] += shift_levels(k, -p["REPRO_COST"]) - k
+        births[rows] += (k * (pop.levels - p["REPRO_COST"] > 0)).sum(axis=1)
+
+    hungry[:S, min(p["E_INIT"], p["E_MAX"]) - pop.lo] += births
+
+    # espèces sous EXTINCT : éteintes
+    total = (hungry + fed).sum(axis=1)
+    gone = total < EXTINCT
+    hungry[gone] = 0.0
+    fed[gone] = 0.0
+    pop.hungry, pop.fed = hungry, fed
+    pop.update_counts()
+
+def meanfield_run(pop: AggregatePopulation, params: dict, steps: int, tol: Optional[float] = None) -> Dict[str, object]:
+    """
+    Intègre `steps` steps (moins si `tol` : arrêt quand aucun effectif ne varie
+    plus que tol en relatif). Renvoie les trajectoires {"times", "values", "equilibrium"}.
+    """
+    pop.hungry = pop.hungry.astype(float)
+    pop.fed = pop.fed.astype(float)
+    series = [pop.species_counts.astype(float)]
+    equilibrium = False
+    for _ in range(steps):
+        meanfield_step(pop, params)
+        series.append(pop.species_counts.astype(float))
+        if tol is not None:
+            prev, cur = series[-2], series[-1]
+            if np.all(np.abs(cur - prev) <= tol * np.maximum(prev, 1.0)):
+                equilibrium = True
+                break
+    values = np.array(series)
+    return {
+        "times": list(range(len(series))),
+        "values": {sp: values[:, s].round(3).tolist() for s, sp in enumerate(pop.species)},
+        "equilibrium": equilibrium,
+    }
+
+def round_histogram(h: np.ndarray) -> np.ndarray:
+    """Histogramme réel -> entier, par ligne (plus forts restes : effectif de l'espèce = arrondi de son total)."""
+    floor = np.floor(h).astype(np.int64)
+    target = np.rint(h.sum(axis=1)).astype(np.int64)
+    out = floor.copy()
+    rest = h - floor
+    for r in range(h.shape[0]):
+        k = int(target[r] - floor[r].sum())
+        if k > 0:
+            out[r, np.argsort(-rest[r], kind="stable")[:k]] += 1
+    return out
@@ -0,0 +1,187 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+# bornes (s) des histogrammes de phases : 10 µs .. 2.5 s
+PHASE_BUCKETS = (1e-5, 2.5e-5, 1e-4, 2.5e-4, 1e-3, 2.5e-3, 1e-2, 2.5e-2, 0.1, 0.25, 1.0, 2.5)
+
+# phases d'un step, dans l'ordre (mêmes noms pour tous les moteurs ; "move" : spatial seulement) ;
+# "sync" : report dans l'overlay, hors step
+PHASES = ("move", "cost", "graze", "hunt", "starve", "repro_plant", "repro_animal", "history", "total", "sync")
+
+class Histogram:
+    """Histogramme à bornes fixes (format Prometheus : buckets cumulés à l'export)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = PHASE_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # dernier : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+class StepTimer:
+    """Chronomètre d'un step : lap(phase) enregistre le temps depuis le lap précédent."""
+
+    __slots__ = ("metrics", "engine", "t0", "t")
+
+    def __init__(self, metrics: "Metrics", engine: str):
+        self.metrics = metrics
+        self.engine = engine
+        self.t0 = self.t = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.metrics.observe(self.engine, phase, now - self.t)
+        self.t = now
+
+    def done(self) -> None:
+        self.metrics.observe(self.engine, "total", time.perf_counter() - self.t0)
+
+def no_lap(phase: str) -> None:
+    pass
+
+class Metrics:
+    """
+    Métriques du processus, partagées par tous les mondes : temps par phase
+    de step (histogrammes) et compteurs (steps, naissances, morts, mutations
+    de l'overlay), par moteur. Coût : un perf_counter + un lock par phase.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    def timer(self, engine: str) -> StepTimer:
+        return StepTimer(self, engine)
+
+    def observe(self, engine: str, phase: str, seconds: float) -> None:
+        with self._lock:
+            h = self.phases.get((engine, phase))
+            if h is None:
+                h = self.phases[(engine, phase)] = Histogram()
+            h.observe(seconds)
+
+    def inc(self, name: str, engine: str, v: float = 1) -> None:
+        with self._lock:
+            self.counters[(name, engine)] = self.counters.get((name, engine), 0) + v
+
+    def render(self, gauges: Dict[str, float], reasoner: Dict[str, float]) -> str:
+        """Format texte Prometheus (exposition 0.0.4)."""
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda kv: (kv[0][0], _phase_order(kv[0][1])))
+            phases = [(k, list(h.counts), h.sum, h.count, h.bounds) for k, h in phases]
+            counters = sorted(self.counters.items())
+
+        out = [
+            "# HELP eco_step_phase_seconds Wall time of each simulation step phase.",
+            "# TYPE eco_step_phase_seconds histogram",
+        ]
+        for (engine, phase), counts, total, count, bounds in phases:
+            labels = f'engine="{engine}",phase="{phase}"'
+            acc = 0
+            for le, c in zip(list(bounds) + ["+Inf"], counts):
+                acc += c
+                out.append(f'eco_step_phase_seconds_bucket{{{labels},le="{le}"}} {acc}')
+            out.append(f"eco_step_phase_seconds_sum{{{labels}}} {total:.9g}")
+            out.append(f"eco_step_phase_seconds_count{{{labels}}} {count}")
+
+        for name in sorted({n for (n, _), _ in counters}):
+            out.append(f"# HELP eco_{name}_total {COUNTER_HELP.get(name, name)}")
+            out.append(f"# TYPE eco_{name}_total counter")
+            for (n, engine), v in counters:
+                if n == name:
+                    out.append(f'eco_{name}_total{{engine="{engine}"}} {v:.9g}')
+
+        for key, help_ in REASONER_HELP.items():
+            out.append(f"# HELP eco_reasoner_{key}_total {help_}")
+            out.append(f"# TYPE eco_reasoner_{key}_total counter")
+            out.append(f"eco_reasoner_{key}_total {reasoner.get(key, 0):.9g}")
+
+        for name, v in gauges.items():
+            out.append(f"# HELP eco_{name} {GAUGE_HELP.get(name, name)}")
+            out.append(f"# TYPE eco_{name} gauge")
+            out.append(f"eco_{name} {v:.9g}")
+        return "\n".join(out) + "\n"
+
+COUNTER_HELP = {
+    "steps": "Simulation steps.",
+    "births": "Individuals born.",
+    "deaths": "Individuals dead (eaten or starved).",
+    "overlay_mutations": "Individuals added to / removed from overlay graphs.",
+}
+REASONER_HELP = {
+    "hits": "Reasoned graph served from cache.",
+    "misses": "Reasoned graph recomputed (delta or full closure).",
+    "closures": "OWL-RL closures computed.",
+    "closure_seconds": "Time spent in OWL-RL closures.",
+    "recompute_seconds": "Time spent recomputing the reasoned graph.",
+}
+GAUGE_HELP = {
+    "worlds": "Live worlds (sessions).",
+    "individuals": "Live individuals over all worlds.",
+    "overlay_triples": "Triples in overlay graphs over all worlds.",
+}
+
+def _phase_order(phase: str) -> int:
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+class StepProfile:
+    """Capture cProfile sur les `steps` prochains steps d'un monde (toggle via /api/metrics/profile)."""
+
+    def __init__(self, steps: int, top: int = 40):
+        self.steps = steps
+        self.remaining = steps
+        self.top = top
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self._prof = cProfile.Profile()
+
+    @property
+    def active(self) -> bool:
+        return self.remaining > 0
+
+    def call(self, fn, *args):
+        try:
+            self._prof.enable()
+        except ValueError as e:  # un autre profiler tourne déjà (autre monde) : capture abandonnée
+            self.error = str(e)
+            self.remaining = 0
+            self._prof = None
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            self._prof.disable()
+            self.remaining -= 1
+            if not self.remaining:
+                self._finish()
+
+    def _finish(self) -> None:
+        buf = io.StringIO()
+        pstats.Stats(self._prof, stream=buf).sort_stats("cumulative").print_stats(self.top)
+        self.result = buf.getvalue()
+        self._prof = None
+
+    def report(self) -> dict:
+        return {"steps": self.steps, "remaining": self.remaining, "error": self.error, "result": self.result}
+
+def sum_gauges(contexts: Iterable[dict]) -> Dict[str, float]:
+    """Jauges instantanées sur tous les mondes (sans lock : len() seulement)."""
+    worlds = individuals = triples = 0
+    for ctx in contexts:
+        worlds += 1
+        state = ctx["state"]
+        individuals += state.population.n_alive if state.population is not None else len(state.active)
+        triples += len(ctx["overlay_g"])
+    return {"worlds": worlds, "individuals": individuals, "overlay_triples": triples}
@@ -0,0 +1,38 @@
+"""
+Surcharges de SIMULATION_PARAMS venues de l'extérieur (scénarios, /api/fork,
+/api/preview) : clés connues, type de la valeur par défaut, bornes, et
+conditions d'arrêt constructibles (StopMonitor.from_params).
+"""
+from config import SIMULATION_PARAMS
+from simulation.stopping import StopMonitor
+
+PROBABILITIES = ("P_REPRO_PLANT", "P_REPRO_HERB", "P_REPRO_CARN", "HUNT_PROB")
+POSITIVE = ("E_MAX", "K_PLANT", "GRID_W", "GRID_H", "K_CELL", "H_CELL", "stable_window", "max_steps")
+
+def validate_params(params) -> dict:
+    """Copie de `params` ; ValueError si clé inconnue, valeur mal typée ou hors bornes."""
+    if not isinstance(params, dict):
+        raise ValueError("params doit être un objet")
+    bad = [k for k in params if k not in SIMULATION_PARAMS]
+    if bad:
+        raise ValueError(f"Paramètres inconnus: {', '.join(bad)}")
+    for k, v in params.items():
+        if k == "stop_conditions":
+            if not isinstance(v, list):
+                raise ValueError("stop_conditions doit être une liste")
+            continue
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"{k} doit être un nombre")
+        if isinstance(SIMULATION_PARAMS[k], int) and not isinstance(v, int):
+            raise ValueError(f"{k} doit être un entier")
+        if k in PROBABILITIES and not 0 <= v <= 1:
+            raise ValueError(f"{k} doit être entre 0 et 1")
+        if k in POSITIVE and v <= 0:
+            raise ValueError(f"{k} doit être > 0")
+        if v < 0:
+            raise ValueError(f"{k} doit être >= 0")
+    try:
+        StopMonitor.from_params(dict(SIMULATION_PARAMS, **params), {})
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"stop_conditions invalide: {e}")
+    return dict(params)
@@ -0,0 +1,243 @@
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from rdflib import Graph, URIRef, RDF
+
+from graph.overlay import remove_individual_triples
+from simulation.ids import IdAllocator
+
+COLUMNS = ("sp", "energy", "alive", "ate", "ids", "x", "y")
+
+def species_roles(species: List[str], species_traits: Dict[str, dict], species_prey: Dict[str, List[str]]):
+    """Masques par index d'espèce : (plante, herbivore, carnivore, matrice proie S x S)."""
+    index = {sp: i for i, sp in enumerate(species)}
+    S = len(species)
+    is_plant = np.zeros(S, dtype=bool)
+    is_herb = np.zeros(S, dtype=bool)
+    is_carn = np.zeros(S, dtype=bool)
+    prey = np.zeros((S, S), dtype=bool)
+    for sp, i in index.items():
+        tr = species_traits.get(sp, {})
+        is_plant[i] = tr.get("is_plant", False)
+        is_carn[i] = tr.get("is_carnivore", False)
+        is_herb[i] = tr.get("is_herbivore", False) and not tr.get("is_carnivore", False)
+        for prey_sp in species_prey.get(sp, []):
+            j = index.get(prey_sp)
+            if j is not None:
+                prey[i, j] = True
+    return is_plant, is_herb, is_carn, prey
+
+class PopulationArrays:
+    """
+    Population stockée en colonnes NumPy (un slot par individu) :
+    espèce (int), énergie, masque vivant, flag "a mangé ce step", id,
+    cellule x / y (moteur spatial seulement).
+    Les ids viennent de l'IdAllocator du monde (mêmes ids que le moteur
+    dict) ; les URIRef ne sont créées qu'à la demande (API / overlay).
+    """
+
+    def __init__(
+        self,
+        species: List[str],
+        species_traits: Dict[str, dict],
+        species_prey: Dict[str, List[str]],
+        ids: IdAllocator,
+        capacity: int = 1024,
+    ):
+        self.species = list(species)
+        self.species_index = {sp: i for i, sp in enumerate(self.species)}
+
+        S = len(self.species)
+        self.is_plant, self.is_herb, self.is_carn, self.prey = species_roles(self.species, species_traits, species_prey)
+
+        self.n = 0
+        self.sp = np.zeros(capacity, dtype=np.int32)   # -1 = espèce inconnue
+        self.energy = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.ate = np.zeros(capacity, dtype=bool)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+
+        # effectifs vivants par espèce / total, tenus à jour par le step (sous-produit des phases)
+        self.species_counts = np.zeros(S, dtype=np.int64)
+        self.n_alive = 0
+
+        self.id_alloc = ids
+        self._synced: Set[int] = set()        # ids présents dans SimulationState / overlay
+
+    @classmethod
+    def from_state(
+        cls,
+        active: Set[int],
+        energy: Dict[int, int],
+        indiv_species: Dict[int, str],
+        species_traits: Dict[str, dict],
+        species_prey: Dict[str, List[str]],
+        known_species: Set[str],
+        params: dict,
+        ids: IdAllocator,
+    ) -> "PopulationArrays":
+        species = sorted(set(known_species) | set(indiv_species.values()))
+        pop = cls(species, species_traits, species_prey, ids, capacity=max(1024, 2 * len(active)))
+        n = len(active)
+        pop._grow(n)
+        # ordre d'insertion (ActiveSet) : slots identiques d'un process à l'autre
+        pop.ids[:n] = np.fromiter(active, dtype=np.int64, count=n)
+        pop.sp[:n] = [pop.species_index.get(indiv_species.get(u), -1) for u in active]
+        pop.energy[:n] = [energy.get(u, params["E_INIT"]) for u in active]
+        pop.alive[:n] = True
+        pop.n = n
+        pop._synced = set(active)
+        pop.species_counts = pop.counts()
+        pop.n_alive = pop.alive_count()
+        return pop
+
+    # --- stockage ---
+
+    def _grow(self, needed: int) -> None:
+        cap = len(self.sp)
+        if needed <= cap:
+            return
+        new_cap = max(needed, 2 * cap)
+        for name in COLUMNS:
+            old = getattr(self, name)
+            arr = np.zeros(new_cap, dtype=old.dtype)
+            arr[:self.n] = old[:self.n]
+            setattr(self, name, arr)
+
+    def _append(self, sp_idx, energy, count: int, x=0, y=0) -> int:
+        """Ajoute `count` individus (en x, y) ; renvoie l'index du premier slot."""
+        start = self.n
+        self._grow(start + count)
+        end = start + count
+        self.sp[start:end] = sp_idx
+        self.energy[start:end] = energy
+        self.alive[start:end] = True
+        self.ate[start:end] = False
+        self.x[start:end] = x
+        self.y[start:end] = y
+        first = self.id_alloc.reserve(count)
+        self.ids[start:end] = np.arange(first, first + count)
+        self.n = end
+        return start
+
+    def add_births(self, births: np.ndarray, e_init: int) -> int:
+        """births[s] = nombre de naissances pour l'espèce s."""
+        total = int(births.sum())
+        if total:
+            self._append(np.repeat(np.arange(len(births), dtype=np.int32), births), e_init, total)
+        return total
+
+    def add_at(self, sp_idx: np.ndarray, x: np.ndarray, y: np.ndarray, e_init: int) -> int:
+        """Naissances positionnées (moteur spatial) : une entrée par nouveau-né."""
+        if len(sp_idx):
+            self._append(sp_idx, e_init, len(sp_idx), x, y)
+        return len(sp_idx)
+
+    def scatter(self, rng: np.random.Generator, width: int, height: int) -> None:
+        """Positions initiales uniformes sur la grille."""
+        self.x[:self.n] = rng.integers(0, width, self.n)
+        self.y[:self.n] = rng.integers(0, height, self.n)
+
+    def grid_counts(self, width: int, height: int, species: Optional[np.ndarray] = None) -> np.ndarray:
+        """Effectifs vivants par cellule (height x width) ; `species` : masque des espèces comptées."""
+        alive = self.alive[:self.n] & (self.sp[:self.n] >= 0)
+        if species is not None:
+            alive &= species[np.maximum(self.sp[:self.n], 0)]
+        cell = self.y[:self.n][alive].astype(np.int64) * width + self.x[:self.n][alive]
+        return np.bincount(cell, minlength=width * height).reshape(height, width)
+
+    def kill(self, idx: np.ndarray) -> None:
+        self.alive[idx] = False
+
+    def compact(self) -> None:
+        """Supprime les slots morts quand ils dominent (ordre conservé)."""
+        if self.n == 0 or self.alive[:self.n].sum() * 2 > self.n:
+            return
+        keep = np.flatnonzero(self.alive[:self.n])
+        k = len(keep)
+        for name in COLUMNS:
+            arr = getattr(self, name)
+            arr[:k] = arr[keep]
+        self.n = k
+
+    # --- vues ---
+
+    def view(self, name: str) -> np.ndarray:
+        return getattr(self, name)[:self.n]
+
+    def alive_count(self) -> int:
+        return int(self.alive[:self.n].sum())
+
+    def counts(self) -> np.ndarray:
+        sp = self.sp[:self.n][self.alive[:self.n]]
+        return np.bincount(sp[sp >= 0], minlength=len(self.species))
+
+    def counts_by_species(self) -> Dict[str, int]:
+        """Effectifs au dernier step (sans recompter les slots)."""
+        return {sp: int(c) for sp, c in zip(self.species, self.species_counts)}
+
+    def energy_stats(self) -> Dict[str, dict]:
+        """Par espèce vivante : effectif, énergie moyenne / min / max (sans matérialiser la population)."""
+        alive = self.alive[:self.n] & (self.sp[:self.n] >= 0)
+        sp, e = self.sp[:self.n][alive], self.energy[:self.n][alive]
+        S = len(self.species)
+        count = np.bincount(sp, minlength=S)
+        total = np.bincount(sp, weights=e, minlength=S)
+        lo = np.full(S, np.iinfo(np.int32).max)
+        hi = np.full(S, np.iinfo(np.int32).min)
+        np.minimum.at(lo, sp, e)
+        np.maximum.at(hi, sp, e)
+        return {
+            self.species[s]: {"count": int(count[s]), "energy_mean": float(total[s] / count[s]),
+                              "energy_min": int(lo[s]), "energy_max": int(hi[s])}
+            for s in np.flatnonzero(count).tolist()
+        }
+
+    def uri(self, slot: int) -> URIRef:
+        s = int(self.sp[slot])
+        return self.id_alloc.uri(int(self.ids[slot]), self.species[s] if s >= 0 else None)
+
+    # --- matérialisation vers les structures "dict" / RDF ---
+
+    def sync_to(
+        self,
+        overlay_g: Graph,
+        active: Set[int],
+        energy: Dict[int, int],
+        indiv_species: Dict[int, str],
+    ) -> int:
+        """
+        Reporte la population dans SimulationState (active/energy) et
+        l'overlay (rdf:type) ; appelé seulement quand l'API lit l'état.
+        Renvoie le nombre d'individus ajoutés / retirés.
+        """
+        alive_slots = np.flatnonzero(self.alive[:self.n])
+        alive_ids = set(self.ids[alive_slots].tolist())
+
+        gone = self._synced - alive_ids
+        n = len(gone)
+        for i in gone:
+            active.discard(i)
+            energy.pop(i, None)
+            indiv_species.pop(i, None)
+            u = self.id_alloc.uris.get(i)
+            if u is not None:
+                remove_individual_triples(overlay_g, u)
+                self.id_alloc.release(i)
+
+        for slot in alive_slots.tolist():
+            i = int(self.ids[slot])
+            energy[i] = int(self.energy[slot])
+            if i in self._synced:
+                continue
+            s = int(self.sp[slot])
+            active.add(i)
+            n += 1
+            if s >= 0:
+                indiv_species[i] = self.species[s]
+                overlay_g.add((self.uri(slot), RDF.type, URIRef(self.species[s])))
+
+        self._synced = alive_ids
+        return n
@@ -0,0 +1,223 @@
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from rdflib import Graph
+
+from ontology.reasoner import ReasonerCache
+from ontology.species import EatsRulesCache
+from simulation.metrics import Metrics
+from simulation.world import new_world
+from simulation.eventlog import close_log
+from simulation.export import close_export
+
+# rdflib Memory store : ~1.2 kB par triple (mesuré avec tracemalloc)
+TRIPLE_BYTES = 1250
+
+def _deep_size(obj, seen: set) -> int:
+    """sys.getsizeof récursif sur les conteneurs Python ; nbytes pour NumPy."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, Graph):
+        return len(obj) * TRIPLE_BYTES
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(x, seen) for x in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_size(vars(obj), seen)
+    return size
+
+def world_memory(ctx, shared: set) -> Dict[str, int]:
+    """Octets (estimés) propres à un monde, hors objets partagés (`shared` : ids)."""
+    state = ctx["state"]
+    seen = set(shared)
+    report = {
+        "overlay": _deep_size(ctx["overlay_g"], seen),
+        "state": sum(_deep_size(x, seen) for x in (state.active, state.energy, state.history, state.known_species)),
+        "mappings": sum(_deep_size(ctx[k], seen) for k in ("ids", "indiv_species", "species_traits", "species_prey")),
+        "population": _deep_size(state.population, seen) if state.population is not None else 0,
+        "reasoner": ctx["reasoner"].memory_triples() * TRIPLE_BYTES,
+        "journal": _deep_size(ctx["overlay_journal"], seen),
+    }
+    report["total"] = sum(report.values())
+    return report
+
+class RegistryFull(RuntimeError):
+    """max_worlds atteint et aucun monde évinçable (boucles serveur en cours)."""
+
+class WorldRegistry:
+    """
+    Mondes isolés par session. base_g, la clôture TBox (et ses templates) et
+    EatsRulesCache sont partagés en lecture entre tous les mondes ; chaque monde
+    a son overlay, son état, ses mappings et le cache ABox de son reasoner.
+    Les mondes inactifs sont évincés (TTL), et au-delà de `max_worlds` le moins
+    récemment utilisé (LRU). Un monde dont la boucle serveur tourne n'est
+    jamais évincé : si tous le sont, create() lève RegistryFull.
+    """
+
+    def __init__(
+        self,
+        base_g: Graph,
+        reasoner: ReasonerCache,
+        eats_cache: EatsRulesCache,
+        onto_meta: dict,
+        params: dict,
+        engine: str = "dict",
+        lazy_overlay: bool = True,
+        max_worlds: int = 32,
+        ttl: float = 3600.0,
+        metrics: Optional[Metrics] = None,
+        event_log: bool = False,
+        export: Optional[str] = None,
+    ):
+        self.base_g = base_g
+        self.reasoner = reasoner
+        self.eats_cache = eats_cache
+        self.onto_meta = onto_meta
+        self.params = dict(params)
+        self.engine = engine
+        self.lazy_overlay = lazy_overlay
+        self.max_worlds = max_worlds
+        self.ttl = ttl
+        self.metrics = metrics
+        self.event_log = event_log
+        self.export = export
+
+        # TBox calculée avant tout fork, pour qu'elle soit partagée
+        reasoner.tbox_graph(base_g)
+        reasoner.taxonomy(base_g)
+
+        self._worlds: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def species_list(self):
+        return self.onto_meta["species"]
+
+    def _new_ctx(self) -> dict:
+        return new_world(
+            self.base_g, self.reasoner.fork(), self.eats_cache, self.onto_meta,
+            params=self.params, engine=self.engine, lazy_overlay=self.lazy_overlay,
+            metrics=self.metrics, event_log=self.event_log, export=self.export,
+        )
+
+    def create(self) -> Tuple[str, dict]:
+        """Nouvelle session et son monde ; RegistryFull si aucune place ne peut être libérée."""
+        sid = secrets.token_urlsafe(12)
+        with self._lock:
+            evicted = self._collect(reserve=1)
+            full = len(self._worlds) >= self.max_worlds
+            if not full:
+                ctx = self._new_ctx()
+                self._worlds[sid] = (ctx, time.monotonic())
+        self._stop(evicted)
+        if full:
+            raise RegistryFull(f"{self.max_worlds} mondes actifs, tous avec une simulation en cours")
+        return sid, ctx
+
+    def get(self, sid: str) -> Optional[dict]:
+        """Monde de la session `sid` (None si inconnue ou évincée) ; le marque comme utilisé."""
+        with self._lock:
+            entry = self._worlds.pop(sid, None)
+            if entry is not None:
+                self._worlds[sid] = (entry[0], time.monotonic())
+            evicted = self._collect()
+        self._stop(evicted)
+        return entry[0] if entry is not None else None
+
+    def peek(self, sid: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._worlds.get(sid)
+        return entry[0] if entry else None
+
+    def drop(self, sid: str) -> bool:
+        with self._lock:
+            entry = self._worlds.pop(sid, None)
+        if entry:
+            self._stop([entry[0]])
+        return entry is not None
+
+    def evict(self) -> int:
+        with self._lock:
+            evicted = self._collect()
+        self._stop(evicted)
+        return len(evicted)
+
+    @staticmethod
+    def _running(ctx) -> bool:
+        loop = ctx.get("run_loop")
+        return loop is not None and loop.alive
+
+    def _collect(self, reserve: int = 0) -> list:
+        """
+        Retire les mondes expirés puis les moins récemment utilisés, pour qu'il
+        reste `reserve` places sous max_worlds ; jamais un monde dont la boucle
+        serveur tourne (sous self._lock).
+        """
+        now = time.monotonic()
+        evicted = []
+        for sid, (ctx, last) in list(self._worlds.items()):
+            if now - last > self.ttl and not self._running(ctx):
+                evicted.append(self._worlds.pop(sid)[0])
+        excess = len(self._worlds) + reserve - self.max_worlds
+        if excess > 0:
+            for sid in [sid for sid, (ctx, _) in self._worlds.items() if not self._running(ctx)][:excess]:
+                evicted.append(self._worlds.pop(sid)[0])
+        return evicted
+
+    @staticmethod
+    def _stop(worlds) -> None:
+        for ctx in worlds:
+            loop = ctx.get("run_loop")
+            if loop is not None:
+                loop.stop()
+            close_log(ctx)
+            close_export(ctx)
+
+    def __len__(self) -> int:
+        return len(self._worlds)
+
+    def contexts(self) -> list:
+        """Mondes vivants (copie de la liste, sous self._lock)."""
+        with self._lock:
+            return [ctx for ctx, _ in self._worlds.values()]
+
+    def report(self) -> dict:
+        """Mémoire par session (hors ontologie partagée) + taille de l'ontologie partagée."""
+        with self._lock:
+            items = [(sid, ctx, last) for sid, (ctx, last) in self._worlds.items()]
+        tbox_g = self.reasoner.tbox_graph(self.base_g)
+        shared = {id(self.base_g), id(tbox_g)}
+        now = time.monotonic()
+        sessions = []
+        for sid, ctx, last in items:
+            with ctx["lock"]:
+                mem = world_memory(ctx, shared)
+                sessions.append({
+                    "session": sid[:8],  # préfixe : l'id complet sert de jeton
+                    "idle_s": round(now - last, 1),
+                    "running": ctx["state"].running,
+                    "t": ctx["state"].t,
+                    "individuals": len(ctx["state"].active) if ctx["state"].population is None else ctx["state"].population.alive_count(),
+                    "memory": mem,
+                })
+        return {
+            "shared": {
+                "base_triples": len(self.base_g),
+                "tbox_triples": len(tbox_g),
+                "templates": len(self.reasoner._templates),
+                "bytes": (len(self.base_g) + len(tbox_g)) * TRIPLE_BYTES,
+            },
+            "max_worlds": self.max_worlds,
+            "ttl_s": self.ttl,
+            "sessions": sessions,
+        }
@@ -0,0 +1,36 @@
+import secrets
+from typing import Optional
+
+import numpy as np
+
+# un flux par phase : ajouter une phase à la fin ne change pas les flux existants
+PHASES = ("feed", "hunt", "repro", "move")
+
+class WorldRNG:
+    """
+    Aléa d'un monde : une graine (SeedSequence) et un Generator NumPy
+    indépendant par phase du step. Même graine + même population initiale
+    = même trajectoire, que le run soit lancé par l'API ou la CLI batch, et quel que soit
+    PYTHONHASHSEED ; une phase qui tire plus ou moins ne décale pas les autres.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        if seed is None:
+            seed = secrets.randbits(32)  # 32 bits : passe sans perte par JSON / JavaScript
+        self.seed = seed  # graine effective : à renvoyer pour rejouer le run
+        self.seq = np.random.SeedSequence(seed)
+        self.streams = {name: np.random.default_rng(s) for name, s in zip(PHASES, self.seq.spawn(len(PHASES)))}
+
+    def __getattr__(self, name: str) -> np.random.Generator:
+        try:
+            return self.__dict__["streams"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def get_state(self) -> dict:
+        return {"seed": self.seed, "streams": {k: g.bit_generator.state for k, g in self.streams.items()}}
+
+    def set_state(self, st: dict) -> None:
+        self.seed = st.get("seed", self.seed)
+        for k, s in st["streams"].items():
+            self.streams[k].bit_generator.state = s
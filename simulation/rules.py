@@ -1,21 +1,32 @@
-import random
-from typing import Dict, Set
-from rdflib import URIRef, Graph
+from typing import Dict, Optional, Set
+from rdflib import Graph
 
-from graph.eats import cleanup_dead_eats_links
 from ontology.species import pop_by_species
+from simulation.rng import WorldRNG
+from simulation.metrics import StepTimer, no_lap
+from simulation.eventlog import EventLog, BIRTH, REPRO, GRAZE, HUNT, STARVE
 
 def simulation_step_energy(
-    overlay_g: Graph,
-    active: Set[URIRef],
-    energy: Dict[URIRef, int],
+    overlay_g: Optional[Graph],
+    active: Set[int],
+    energy: Dict[int, int],
     params: dict,
-    indiv_species: Dict[URIRef, str],
+    indiv_species: Dict[int, str],
     species_traits: Dict[str, dict],
     species_prey: Dict[str, list],
     create_individual_fn,
     remove_individual_fn,
+    rng: WorldRNG,
+    timer: Optional[StepTimer] = None,
+    events: Optional[EventLog] = None,
 ) -> None:
+    """
+    Un step (règles R1-R4). Tirages en bloc sur les flux de `rng` (feed /
+    hunt / repro) : reproductible à graine et population initiale égales.
+    `timer` : temps par phase (simulation/metrics.py) ; `events` : journal
+    d'événements (simulation/eventlog.py), create_individual_fn doit renvoyer l'id.
+    """
+    lap = timer.lap if timer else no_lap
     p = params
     pop = pop_by_species(active, indiv_species)
 
@@ -27,6 +38,7 @@ def simulation_step_energy(
         if sp and species_traits.get(sp, {}).get("is_plant", False):
             continue
         energy[u] = energy.get(u, p["E_INIT"]) - p["COST_STEP"]
+    lap("cost")
 
     # R2: alimentation
     # 2a) Herbivores mangent plantes (densité-dépendant)
@@ -45,25 +57,31 @@ def simulation_step_energy(
         if tr.get("is_herbivore", False) and not tr.get("is_carnivore", False):
             herb_individuals.extend(inds)
 
-    random.shuffle(herb_individuals)
+    herb_individuals = [herb_individuals[i] for i in rng.feed.permutation(len(herb_individuals))]
+    u_feed = rng.feed.random(len(herb_individuals))
+    u_pick = rng.feed.random(len(herb_individuals))
 
-    for herb in herb_individuals:
+    for k, herb in enumerate(herb_individuals):
         if total_plants <= 0:
             break
 
         p_feed = min(1.0, total_plants / (total_plants + H))
-        if random.random() < p_feed:
+        if u_feed[k] < p_feed:
             available_species = [sp for sp in plant_pools if len(plant_pools[sp]) > 0]
             if not available_species:
                 break
-            plant_sp = random.choice(available_species)
+            plant_sp = available_species[int(u_pick[k] * len(available_species))]
             victim = plant_pools[plant_sp].pop()
 
             if victim in active:
                 remove_individual_fn(victim)
                 ate_this_step.add(herb)
-                energy[herb] = min(p["E_MAX"], energy.get(herb, p["E_INIT"]) + p["GAIN_PLANT"])
+                e = energy.get(herb, p["E_INIT"])
+                energy[herb] = min(p["E_MAX"], e + p["GAIN_PLANT"])
+                if events is not None:
+                    events.add(GRAZE, herb, victim, indiv_species.get(herb), plant_sp, energy[herb] - e)
                 total_plants -= 1
+    lap("graze")
 
     # 2b) Carnivores chassent herbivores (1 tentative max / step)
     pop2 = pop_by_species(active, indiv_species)
@@ -79,9 +97,11 @@ def simulation_step_energy(
         if tr.get("is_carnivore", False):
             carn_individuals.extend(inds)
 
-    random.shuffle(carn_individuals)
+    carn_individuals = [carn_individuals[i] for i in rng.hunt.permutation(len(carn_individuals))]
+    u_hunt = rng.hunt.random(len(carn_individuals))
+    u_pick = rng.hunt.random(len(carn_individuals))
 
-    for carn in carn_individuals:
+    for k, carn in enumerate(carn_individuals):
         if carn not in active:
             continue
         sp_c = indiv_species.get(carn)
@@ -95,13 +115,17 @@ def simulation_step_energy(
         if not candidates:
             continue
 
-        if random.random() < p["HUNT_PROB"]:
-            prey_sp = random.choice(candidates)
+        if u_hunt[k] < p["HUNT_PROB"]:
+            prey_sp = candidates[int(u_pick[k] * len(candidates))]
             victim = prey_pools[prey_sp].pop()
             if victim in active:
                 remove_individual_fn(victim)
                 ate_this_step.add(carn)
-                energy[carn] = min(p["E_MAX"], energy.get(carn, p["E_INIT"]) + p["GAIN_PREY"])
+                e = energy.get(carn, p["E_INIT"])
+                energy[carn] = min(p["E_MAX"], e + p["GAIN_PREY"])
+                if events is not None:
+                    events.add(HUNT, carn, victim, sp_c, prey_sp, energy[carn] - e)
+    lap("hunt")
 
     # R3: mort par famine (énergie <= 0), sauf plantes
     for u in list(active):
@@ -109,9 +133,10 @@ def simulation_step_energy(
         if sp and species_traits.get(sp, {}).get("is_plant", False):
             continue
         if energy.get(u, p["E_INIT"]) <= 0:
+            if events is not None:
+                events.add(STARVE, u, species=sp)
             remove_individual_fn(u)
-
-    cleanup_dead_eats_links(overlay_g, active)
+    lap("starve")
 
     # R4: reproduction
     # 4a) plantes (logistique)
@@ -125,9 +150,12 @@ def simulation_step_energy(
         if n <= 0 or n >= K:
             continue
         p_eff = p["P_REPRO_PLANT"] * max(0.0, 1.0 - (n / K))
-        births = sum(1 for _ in range(n) if random.random() < p_eff)
+        births = int(rng.repro.binomial(n, p_eff))
         for _ in range(births):
-            create_individual_fn(sp)
+            child = create_individual_fn(sp)
+            if events is not None:
+                events.add(BIRTH, child, species=sp, delta=p["E_INIT"])
+    lap("repro_plant")
 
     # 4b) herbivores
     pop4 = pop_by_species(active, indiv_species)
@@ -137,17 +165,22 @@ def simulation_step_energy(
             continue
         if len(inds) < 2:
             continue
-        for u in inds:
+        u_repro = rng.repro.random(len(inds))
+        for k, u in enumerate(inds):
             if u not in active:
                 continue
             if u not in ate_this_step:
                 continue
             if energy.get(u, p["E_INIT"]) < p["E_REPRO"]:
                 continue
-            if random.random() < p["P_REPRO_HERB"]:
+            if u_repro[k] < p["P_REPRO_HERB"]:
                 energy[u] -= p["REPRO_COST"]
+                if events is not None:
+                    events.add(REPRO, u, species=sp, delta=-p["REPRO_COST"])
                 if energy[u] > 0:
-                    create_individual_fn(sp)
+                    child = create_individual_fn(sp)
+                    if events is not None:
+                        events.add(BIRTH, child, species=sp, delta=p["E_INIT"])
 
     # 4c) carnivores
     pop5 = pop_by_species(active, indiv_species)
@@ -157,14 +190,20 @@ def simulation_step_energy(
             continue
         if len(inds) < 2:
             continue
-        for u in inds:
+        u_repro = rng.repro.random(len(inds))
+        for k, u in enumerate(inds):
             if u not in active:
                 continue
             if u not in ate_this_step:
                 continue
             if energy.get(u, p["E_INIT"]) < p["E_REPRO"]:
                 continue
-            if random.random() < p["P_REPRO_CARN"]:
+            if u_repro[k] < p["P_REPRO_CARN"]:
                 energy[u] -= p["REPRO_COST"]
+                if events is not None:
+                    events.add(REPRO, u, species=sp, delta=-p["REPRO_COST"])
                 if energy[u] > 0:
-                    create_individual_fn(sp)
+                    child = create_individual_fn(sp)
+                    if events is not None:
+                        events.add(BIRTH, child, species=sp, delta=p["E_INIT"])
+    lap("repro_animal")
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from simulation.world import start_world, step_world
+from simulation.view import writing
+
+SNAPSHOT_POINTS = 1000
+
+def step_delta(ctx, status=None) -> dict:
+    """Ce qui a changé au dernier step : effectifs, naissances / morts, statut. Taille O(espèces)."""
+    state = ctx["state"]
+    return {
+        "t": state.t,
+        "counts": state.history.last(),
+        "births": int(ctx["last_step"]["births"]),
+        "deaths": int(ctx["last_step"]["deaths"]),
+        "status": status,
+    }
+
+def snapshot(ctx, max_points: int = SNAPSHOT_POINTS) -> dict:
+    """Historique (rattrapage d'un client sans curseur valide), sous-échantillonné au-delà de max_points."""
+    state = ctx["state"]
+    return dict(
+        state.history.series(max_points),
+        run=ctx["feed"].run,
+        t=state.t,
+        running=state.running,
+    )
+
+def start_run(ctx, engine: str = "dict", seed=None, events=None, export=None) -> None:
+    """start_world + nouveau run dans le feed (delta t=0)."""
+    with writing(ctx):
+        start_world(ctx, engine=engine, seed=seed, events=events, export=export)
+        ctx["last_step"] = {"births": 0, "deaths": 0}
+        ctx["feed"].reset()
+        ctx["feed"].publish(step_delta(ctx))
+
+def advance(ctx) -> Optional[dict]:
+    """Un step + publication du delta (et d'un WorldView si un lecteur l'attend) ; None si aucune simulation en cours."""
+    with writing(ctx):
+        if not ctx["state"].running:
+            return None
+        prof = ctx.get("profile")
+        status = prof.call(step_world, ctx) if prof is not None and prof.active else step_world(ctx)
+        delta = step_delta(ctx, status)
+        ctx["feed"].publish(delta)
+        return delta
+
+class RunLoop:
+    """Avance la simulation dans un thread, à `rate` steps/s (0 : au plus vite)."""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.rate = 0.0
+        self.checkpoint: Optional[Callable[[dict, dict], None]] = None  # (ctx, delta) après chaque step
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, rate: float) -> None:
+        self.rate = max(0.0, float(rate))
+        if self.alive:
+            return  # déjà lancé : seul le rythme change
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="sim-run-loop", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """À appeler sans tenir ctx["lock"] (le thread le prend à chaque step)."""
+        self._stop.set()
+        if self.alive and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            delta = advance(self.ctx)
+            if delta is not None and self.checkpoint is not None:
+                self.checkpoint(self.ctx, delta)
+            if delta is None or delta["status"]:
+                break
+            if self.rate > 0:
+                next_at = max(next_at + 1.0 / self.rate, time.monotonic() - 1.0)
+                self._stop.wait(max(0.0, next_at - time.monotonic()))
+
+def run_loop(ctx) -> RunLoop:
+    loop = ctx.get("run_loop")
+    if loop is None:
+        loop = ctx["run_loop"] = RunLoop(ctx)
+    return loop
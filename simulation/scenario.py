@@ -0,0 +1,74 @@
+"""
+Scénarios : population initiale (+ paramètres, graine, moteur) dans un
+fichier JSON, chargés par /api/populate ou `python -m simulation.batch --scenario`.
+
+    {
+      "description": "...",
+      "population": {"Lion": 10, "Impala": 50, "Grass": 200},
+      "params": {"HUNT_PROB": 0.3},
+      "seed": 1,
+      "engine": "array"
+    }
+
+Seul "population" est obligatoire ; les espèces sont des URIs ou des noms locaux.
+"""
+import json
+import os
+
+from simulation.params import validate_params
+from simulation.world import ENGINES
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scenarios")
+SCENARIO_KEYS = ("description", "population", "params", "seed", "engine")
+
+def scenario_path(name: str, directory: str = SCENARIO_DIR, allow_path: bool = False) -> str:
+    """
+    Nom d'un scénario de `directory` (sans .json) ; allow_path (CLI seulement,
+    jamais pour l'API) : aussi un chemin de fichier.
+    """
+    if allow_path and os.path.isfile(name):
+        return name
+    if os.path.basename(name) != name or name.startswith("."):
+        raise ValueError(f"Nom de scénario invalide: {name}")
+    path = os.path.join(directory, f"{name}.json")
+    if not os.path.isfile(path):
+        raise ValueError(f"Scénario inconnu: {name}")
+    return path
+
+def parse_scenario(data: dict) -> dict:
+    """Vérifie la structure d'un scénario (ValueError sinon) ; renvoie une copie normalisée."""
+    if not isinstance(data, dict):
+        raise ValueError("Scénario : objet JSON attendu")
+    unknown = [k for k in data if k not in SCENARIO_KEYS]
+    if unknown:
+        raise ValueError(f"Clés inconnues: {', '.join(unknown)}")
+    population = data.get("population")
+    if not isinstance(population, dict) or not population:
+        raise ValueError("Scénario : \"population\" ({espèce: effectif}) requis")
+    params = validate_params(data.get("params") or {})
+    seed = data.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("seed doit être un entier >= 0")
+    engine = data.get("engine")
+    if engine is not None and engine not in ENGINES:
+        raise ValueError(f"Moteur inconnu: {engine}")
+    return {
+        "description": data.get("description", ""),
+        "population": dict(population),
+        "params": dict(params),
+        "seed": seed,
+        "engine": engine,
+    }
+
+def load_scenario(name: str, directory: str = SCENARIO_DIR, allow_path: bool = False) -> dict:
+    with open(scenario_path(name, directory, allow_path), encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Scénario {name}: JSON invalide ({e})")
+    return parse_scenario(data)
+
+def list_scenarios(directory: str = SCENARIO_DIR) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:-5] for f in os.listdir(directory) if f.endswith(".json"))
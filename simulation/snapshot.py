@@ -0,0 +1,371 @@
+"""
+Snapshots d'un monde : état complet (individus, overlay, mappings, journal,
+population du moteur, aléa, historique, conditions d'arrêt) dans un répertoire
+
+    <nom>/meta.json   format, t, moteur, paramètres, table des classes, résumé
+    <nom>/state.pkl   historique, conditions d'arrêt, traits / proies, état des générateurs
+    <nom>/overlay.nt  triples de l'overlay autres que les rdf:type d'individus (ex. eats)
+    <nom>/*.npy       colonnes : individus, rdf:type de l'overlay, journal, population du moteur
+
+Les .npy sont relus en mmap copy-on-write (np.load(mmap_mode="c")) : le
+chargement ne lit que les en-têtes, les pages sont lues (et copiées si le
+step les modifie) au premier accès. fork_world copie un monde en mémoire
+(colonnes comprises), sans passer par le disque. Monde restauré + même état des générateurs =
+même suite de steps que le monde d'origine. Checkpoint : sauvegarde
+périodique d'un run de la boucle serveur (reprise après un crash).
+"""
+import json
+import os
+import pickle
+import shutil
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from rdflib import Graph, URIRef, RDF
+
+from graph.foodweb import FoodWeb
+from graph.overlay import OverlayJournal
+from simulation.state import ActiveSet, SimulationState
+from simulation.ids import IdAllocator
+from simulation.rng import WorldRNG
+from simulation.population import COLUMNS, PopulationArrays
+from simulation.aggregate import AggregatePopulation
+from simulation.stopping import StopMonitor
+from simulation.runner import step_delta
+from simulation.eventlog import close_log
+from simulation.export import close_export
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots")
+
+# paramètres qui fixent la forme de la population du moteur (grille, niveaux d'énergie) :
+# pas de surcharge par un fork tant que cette population existe
+SHAPE_PARAMS = {
+    "spatial": ("GRID_W", "GRID_H"),
+    "aggregate": ("E_MAX", "E_REPRO", "REPRO_COST", "COST_STEP"),
+}
+# paramètres lus par les conditions d'arrêt : leur surcharge reconstruit le StopMonitor du fork
+STOP_PARAMS = ("stop_conditions", "stable_window", "stable_range", "max_steps")
+
+def snapshot_path(name: str, directory: str = SNAPSHOT_DIR) -> str:
+    """Répertoire du snapshot `name` (nom simple, pas de chemin) ; ValueError sinon."""
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        raise ValueError(f"Nom de snapshot invalide: {name}")
+    return os.path.join(directory, name)
+
+def list_snapshots(directory: str = SNAPSHOT_DIR) -> list:
+    """Résumé (meta.json) des snapshots de `directory`, par nom."""
+    if not os.path.isdir(directory):
+        return []
+    out = []
+    for name in sorted(os.listdir(directory)):
+        try:
+            with open(os.path.join(directory, name, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue  # pas un snapshot (ou écriture interrompue)
+        out.append({"name": name, **meta["summary"]})
+    return out
+
+# --- capture / application (en mémoire) ---
+
+class _Classes:
+    """Table classe (str) -> code entier, pour stocker les espèces en colonnes int32."""
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+
+    def code(self, cls) -> int:
+        cls = str(cls)
+        c = self.index.get(cls)
+        if c is None:
+            c = self.index[cls] = len(self.names)
+            self.names.append(cls)
+        return c
+
+    def codes(self, values) -> np.ndarray:
+        return np.fromiter((self.code(v) for v in values), dtype=np.int32)
+
+def _ids(values) -> np.ndarray:
+    return np.fromiter(values, dtype=np.int64)
+
+def capture(ctx) -> Tuple[dict, Dict[str, np.ndarray], dict]:
+    """
+    État du monde en (meta JSON, colonnes NumPy, objets Python) ; à appeler
+    sous ctx["lock"]. Les colonnes de la population sont des vues (pas de copie).
+    """
+    state, ids = ctx["state"], ctx["ids"]
+    classes = _Classes()
+    arrays = {}
+
+    arrays["active"] = _ids(state.active)  # ordre d'insertion (ActiveSet)
+    arrays["energy_ids"] = _ids(state.energy.keys())
+    arrays["energy"] = np.fromiter(state.energy.values(), dtype=np.int64)
+    arrays["species_ids"] = _ids(ctx["indiv_species"].keys())
+    arrays["species_cls"] = classes.codes(ctx["indiv_species"].values())
+
+    # URIRef internées : <espèce><id> le plus souvent, recalculée au chargement
+    uri_ids, uri_cls, uri_other = [], [], {}
+    for i, u in ids.uris.items():
+        uri_ids.append(i)
+        if u == ids.mint(i):
+            uri_cls.append(-1)
+            continue
+        sp = ctx["indiv_species"].get(i)
+        if sp is not None and u == ids.mint(i, sp):
+            uri_cls.append(classes.code(sp))
+        else:
+            uri_cls.append(-2)
+            uri_other[i] = str(u)
+    arrays["uri_ids"] = np.array(uri_ids, dtype=np.int64)
+    arrays["uri_cls"] = np.array(uri_cls, dtype=np.int32)
+
+    # overlay : rdf:type des individus en colonnes, le reste en N-Triples
+    type_ids, type_cls = [], []
+    extra = Graph()
+    for s, p, o in ctx["overlay_g"]:
+        i = ids.by_uri.get(s) if p == RDF.type and isinstance(o, URIRef) else None
+        if i is None:
+            extra.add((s, p, o))
+        else:
+            type_ids.append(i)
+            type_cls.append(classes.code(o))
+    arrays["type_ids"] = np.array(type_ids, dtype=np.int64)
+    arrays["type_cls"] = np.array(type_cls, dtype=np.int32)
+
+    journal = ctx["overlay_journal"]
+    arrays["born_ids"] = _ids(journal.born.keys())
+    arrays["born_cls"] = classes.codes(journal.born.values())
+    arrays["dead_ids"] = _ids(journal.dead)
+
+    pop = state.population
+    pop_meta = None
+    if isinstance(pop, PopulationArrays):
+        pop_meta = {"kind": "arrays", "species": pop.species, "n_alive": pop.n_alive}
+        for name in COLUMNS:
+            arrays[f"pop_{name}"] = pop.view(name)
+        arrays["pop_counts"] = pop.species_counts
+        arrays["pop_synced"] = _ids(pop._synced)
+    elif isinstance(pop, AggregatePopulation):
+        pop_meta = {"kind": "aggregate", "species": pop.species}
+        arrays["pop_hungry"] = pop.hungry
+        arrays["pop_fed"] = pop.fed
+        arrays["pop_synced"] = np.array([i for row in pop._synced for i in row], dtype=np.int64)
+        arrays["pop_synced_len"] = np.array([len(row) for row in pop._synced], dtype=np.int64)
+
+    objects = {
+        "history": state.history,
+        "stop": state.stop,
+        "known_species": sorted(state.known_species),
+        "species_counts": state.species_counts,
+        "species_traits": ctx["species_traits"],
+        "species_prey": ctx["species_prey"],
+        "rng": ctx["rng"].get_state(),
+        "uri_other": uri_other,
+        "overlay": extra.serialize(format="nt"),
+    }
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "t": state.t,
+        "running": state.running,
+        "frozen_reasoner": state.frozen_reasoner,
+        "engine": state.engine,
+        "world_engine": ctx["engine"],
+        "lazy_overlay": ctx["lazy_overlay"],
+        "params": state.params,
+        "next_id": ids.next_id,
+        "last_step": {k: int(v) for k, v in ctx["last_step"].items()},
+        "classes": classes.names,
+        "population": pop_meta,
+        "summary": {
+            "t": state.t,
+            "running": state.running,
+            "engine": state.engine if pop is not None else "dict",
+            "individuals": pop.alive_count() if pop is not None else len(state.active),
+            "seed": ctx["rng"].seed,
+        },
+    }
+    return meta, arrays, objects
+
+def apply(ctx, meta: dict, arrays: Dict[str, np.ndarray], objects: dict) -> None:
+    """
+    Remplace l'état de `ctx` par celui capturé (sous ctx["lock"]) ; le feed
+    repart sur un nouveau run dont le premier delta est l'état restauré.
+    """
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Format de snapshot non supporté: {meta.get('format')}")
+    classes = [URIRef(c) for c in meta["classes"]]
+    names = meta["classes"]
+
+    def cls_of(codes: np.ndarray) -> list:
+        return [names[c] for c in codes.tolist()]
+
+    state = SimulationState(params=dict(meta["params"]))
+    state.running = meta["running"]
+    state.frozen_reasoner = meta["frozen_reasoner"]
+    state.t = meta["t"]
+    state.engine = meta["engine"]
+    state.history = objects["history"]
+    state.stop = objects["stop"]
+    state.known_species = set(objects["known_species"])
+    state.species_counts = dict(objects["species_counts"])
+    state.active = ActiveSet(arrays["active"].tolist())
+    state.energy = dict(zip(arrays["energy_ids"].tolist(), arrays["energy"].tolist()))
+
+    indiv_species = dict(zip(arrays["species_ids"].tolist(), cls_of(arrays["species_cls"])))
+
+    ids = IdAllocator(meta["next_id"])
+    uri_other = objects["uri_other"]
+    for i, c in zip(arrays["uri_ids"].tolist(), arrays["uri_cls"].tolist()):
+        u = URIRef(uri_other[i]) if c == -2 else ids.mint(i, names[c] if c >= 0 else None)
+        ids.uris[i] = u
+        ids.by_uri[u] = i
+
+    overlay_g = ctx["overlay_g"]
+    overlay_g.remove((None, None, None))
+    uris = ids.uris
+    overlay_g.addN(
+        (uris[i], RDF.type, classes[c], overlay_g)
+        for i, c in zip(arrays["type_ids"].tolist(), arrays["type_cls"].tolist())
+    )
+    if objects["overlay"]:
+        overlay_g.parse(data=objects["overlay"], format="nt")
+
+    journal = OverlayJournal()
+    journal.born.update(zip(arrays["born_ids"].tolist(), cls_of(arrays["born_cls"])))
+    journal.dead.update(arrays["dead_ids"].tolist())
+
+    species_traits, species_prey = objects["species_traits"], objects["species_prey"]
+    pop_meta = meta["population"]
+    if pop_meta is not None and pop_meta["kind"] == "arrays":
+        pop = PopulationArrays(pop_meta["species"], species_traits, species_prey, ids, capacity=0)
+        # colonnes affectées telles quelles (mmap possible) : _grow les recopie à la première croissance
+        for name in COLUMNS:
+            setattr(pop, name, arrays[f"pop_{name}"])
+        pop.n = len(pop.sp)
+        pop.species_counts = np.array(arrays["pop_counts"])
+        pop.n_alive = pop_meta["n_alive"]
+        pop._synced = set(arrays["pop_synced"].tolist())
+        state.population = pop
+    elif pop_meta is not None:
+        pop = AggregatePopulation(pop_meta["species"], species_traits, species_prey, ids, state.params)
+        pop.hungry = np.array(arrays["pop_hungry"])
+        pop.fed = np.array(arrays["pop_fed"])
+        flat = arrays["pop_synced"].tolist()
+        bounds = np.cumsum(arrays["pop_synced_len"]).tolist()
+        pop._synced = [flat[a:b] for a, b in zip([0] + bounds[:-1], bounds)]
+        pop.update_counts()
+        state.population = pop
+
+    rng = WorldRNG(objects["rng"]["seed"])
+    rng.set_state(objects["rng"])
+
+    close_log(ctx)  # journal et export du run remplacé
+    close_export(ctx)
+
+    ctx["state"] = state
+    ctx["ids"] = ids
+    ctx["overlay_journal"] = journal
+    ctx["indiv_species"] = indiv_species
+    ctx["species_traits"] = species_traits
+    ctx["species_prey"] = species_prey
+    ctx["food_web"] = FoodWeb(species_prey)
+    ctx["rng"] = rng
+    ctx["engine"] = meta["world_engine"]
+    ctx["lazy_overlay"] = meta["lazy_overlay"]
+    ctx["last_step"] = dict(meta["last_step"])
+    ctx["reasoner"].mark_dirty()
+    ctx["feed"].reset()
+    ctx["feed"].publish(step_delta(ctx))
+
+# --- disque ---
+
+def save_snapshot(ctx, path: str) -> dict:
+    """
+    Écrit le snapshot de `ctx` dans le répertoire `path` (sous ctx["lock"]).
+    Écriture dans un répertoire temporaire puis renommage : un crash pendant
+    l'écriture laisse le snapshot précédent intact. Renvoie le résumé.
+    """
+    meta, arrays, objects = capture(ctx)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+    with open(os.path.join(tmp, "state.pkl"), "wb") as f:
+        pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+    meta["summary"]["bytes"] = sum(e.stat().st_size for e in os.scandir(tmp)) + len(json.dumps(meta))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    old = None
+    if os.path.exists(path):
+        old = f"{path}.old-{os.getpid()}"
+        os.replace(path, old)
+    os.replace(tmp, path)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    return meta["summary"]
+
+def load_snapshot(ctx, path: str, mmap: bool = True) -> dict:
+    """Restaure `ctx` depuis le répertoire `path` (sous ctx["lock"]) ; ValueError si absent / invalide."""
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"Snapshot introuvable ou invalide: {os.path.basename(path)}")
+    with open(os.path.join(path, "state.pkl"), "rb") as f:
+        objects = pickle.load(f)
+    arrays = {}
+    for entry in os.scandir(path):
+        if entry.name.endswith(".npy"):
+            arrays[entry.name[:-4]] = np.load(entry.path, mmap_mode="c" if mmap else None, allow_pickle=False)
+    apply(ctx, meta, arrays, objects)
+    return meta["summary"]
+
+# --- fork ---
+
+def fork_world(src, dst, params: Optional[dict] = None, seed: Optional[int] = None) -> dict:
+    """
+    Copie le monde `src` dans `dst` (contexte neuf d'une autre session) pour
+    un what-if à partir de src.t : `params` surcharge les paramètres, `seed`
+    re-graine l'aléa (sinon les deux mondes tirent la même suite). Surcharger
+    une clé de STOP_PARAMS reconstruit les conditions d'arrêt (fenêtres
+    glissantes vides à src.t). Sans passage par le disque mais O(N) : les
+    colonnes sont copiées, les deux mondes les modifiant en place. À appeler
+    sous les deux locks.
+    """
+    meta, arrays, objects = capture(src)
+    params = params or {}
+    fixed = [k for k in SHAPE_PARAMS.get(meta["engine"], ()) if meta["population"] and k in params]
+    if fixed:
+        raise ValueError(f"Paramètres non modifiables pendant un run {meta['engine']}: {', '.join(fixed)}")
+    # vues sur les colonnes de src : copiées, le reste est déjà neuf ; objets Python copiés par pickle
+    arrays = {k: v if v.flags.owndata else v.copy() for k, v in arrays.items()}
+    objects = pickle.loads(pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL))
+    meta = dict(meta, params=dict(meta["params"], **params))
+    apply(dst, meta, arrays, objects)
+    if any(k in params for k in STOP_PARAMS):
+        state = dst["state"]
+        state.stop = StopMonitor.from_params(state.params, dst["species_traits"])
+    if seed is not None:
+        dst["rng"] = WorldRNG(seed)
+    return dict(meta["summary"], seed=dst["rng"].seed)
+
+# --- checkpoint ---
+
+class Checkpoint:
+    """Sauvegarde d'un run de la boucle serveur dans `path` tous les `every` steps et au dernier step."""
+
+    def __init__(self, path: str, every: int):
+        self.path = path
+        self.every = max(1, int(every))
+        self.last_t: Optional[int] = None
+
+    def __call__(self, ctx, delta: dict) -> None:
+        if delta["t"] % self.every and not delta["status"]:
+            return
+        with ctx["lock"]:
+            save_snapshot(ctx, self.path)
+        self.last_t = delta["t"]
@@ -0,0 +1,248 @@
+from typing import Optional
+
+import numpy as np
+
+from simulation.population import PopulationArrays
+from simulation.rng import WorldRNG
+from simulation.metrics import StepTimer, no_lap
+from simulation.eventlog import EventLog, BIRTH, REPRO, GRAZE, HUNT, STARVE
+
+def _diet(rows: np.ndarray) -> np.ndarray:
+    """Matrice booléenne (S x S) -> indices d'espèces par ligne, complétés par -1 (S x max)."""
+    width = max(1, int(rows.sum(axis=1).max(initial=0)))
+    out = np.full((len(rows), width), -1, dtype=np.int64)
+    for i, row in enumerate(rows):
+        idx = np.flatnonzero(row)
+        out[i, :len(idx)] = idx
+    return out
+
+def _stable_order(key: np.ndarray) -> np.ndarray:
+    """
+    argsort stable de clés entières >= 0 : NumPy ne trie en radix (linéaire) que
+    les entiers 16 bits, d'où deux passes 16 bits (poids faibles puis forts) pour les clés < 2**32.
+    """
+    if key.max(initial=0) < 2 ** 16:
+        return np.argsort(key.astype(np.uint16), kind="stable")
+    if key.max() >= 2 ** 32:
+        return np.argsort(key, kind="stable")
+    order = np.argsort((key & 0xFFFF).astype(np.uint16), kind="stable")
+    return order[np.argsort((key[order] >> 16).astype(np.uint16), kind="stable")]
+
+def _cell_pools(slots: np.ndarray, key: np.ndarray, rng: np.random.Generator):
+    """
+    Slots mélangés puis groupés par clé (cellule * S + espèce) :
+    renvoie (clés triées, début de chaque clé, taille, slots).
+    """
+    order = rng.permutation(len(slots))
+    slots, key = slots[order], key[order]
+    order = _stable_order(key)
+    slots, key = slots[order], key[order]
+    keys, start, size = np.unique(key, return_index=True, return_counts=True)
+    return keys, start, size, slots
+
+def _candidates(keys: np.ndarray, cell: np.ndarray, diet: np.ndarray, S: int) -> np.ndarray:
+    """Pour chaque demande (cellule, ligne de régime) : index des pools de sa cellule qu'elle peut prendre, ou -1."""
+    q = cell[:, None] * S + diet
+    pos = np.minimum(np.searchsorted(keys, q), max(len(keys) - 1, 0))
+    found = (diet >= 0) & (len(keys) > 0)
+    if len(keys):
+        found &= keys[pos] == q
+    return np.where(found, pos, -1)
+
+def _take_local(pools, cand: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Comme vectorized._take_from_pools, mais les pools sont des (cellule, espèce) :
+    la demande i tire uniformément un pool encore non vide parmi cand[i] (sa
+    cellule), puis prend le prochain individu ; les perdants d'un pool épuisé
+    retentent. Renvoie le slot de la victime par demande, ou -1.
+    """
+    keys, start, size, slots = pools
+    taken = np.zeros(len(keys), dtype=np.int64)
+    victims = np.full(len(cand), -1, dtype=np.int64)
+    pending = np.arange(len(cand))
+    while len(pending):
+        c = cand[pending]
+        safe = np.maximum(c, 0)
+        avail = (c >= 0) & (taken[safe] < size[safe])
+        n_avail = avail.sum(axis=1)
+        ok = n_avail > 0
+        pending, c, avail, n_avail = pending[ok], c[ok], avail[ok], n_avail[ok]
+        if not len(pending):
+            break
+        pick = (rng.random(len(pending)) * n_avail).astype(np.int64)
+        col = np.argmax(np.cumsum(avail, axis=1) > pick[:, None], axis=1)
+        chosen = c[np.arange(len(pending)), col]
+
+        # rang de chaque demande dans son pool (ordre de passage conservé)
+        order = np.argsort(chosen, kind="stable")
+        pending, chosen = pending[order], chosen[order]
+        rank = np.arange(len(chosen)) - np.searchsorted(chosen, chosen, side="left")
+        win = rank < (size - taken)[chosen]
+        victims[pending[win]] = slots[start[chosen[win]] + taken[chosen[win]] + rank[win]]
+        taken += np.bincount(chosen[win], minlength=len(taken))
+        pending = np.sort(pending[~win])
+    return victims
+
+def simulation_step_spatial(
+    pop: PopulationArrays,
+    params: dict,
+    rng: WorldRNG,
+    timer: Optional[StepTimer] = None,
+    events: Optional[EventLog] = None,
+) -> dict:
+    """
+    Variante spatiale de simulation_step_arrays : grille torique GRID_W x GRID_H,
+    chaque cellule est un petit milieu homogène. Les animaux se déplacent
+    (marche aléatoire de pas <= MOVE), broutent / chassent dans leur cellule,
+    se reproduisent s'ils sont >= 2 de leur espèce dans la cellule ; les
+    plantes suivent une logistique par cellule (K_CELL) et se dispersent
+    dans les cellules voisines. Index spatial = tri des slots par
+    (cellule, espèce) : coût linéaire en population (+ tri), pas en taille des pools.
+    `events` : journal d'événements, comme simulation_step_arrays (déplacements non journalisés).
+    """
+    lap = timer.lap if timer else no_lap
+    p = params
+    W, Hg = p["GRID_W"], p["GRID_H"]
+    S = len(pop.species)
+    sp = pop.view("sp")
+    energy = pop.view("energy")
+    alive = pop.view("alive")
+    ate = pop.view("ate")
+    x, y = pop.view("x"), pop.view("y")
+    ate[:] = False
+
+    known = sp >= 0
+    sp_k = np.where(known, sp, 0)
+    plant = known & pop.is_plant[sp_k]
+    herb = known & pop.is_herb[sp_k]
+    carn = known & pop.is_carn[sp_k]
+
+    deaths = 0
+
+    # R0: déplacement des animaux
+    mob = np.flatnonzero(alive & ~plant)
+    m = p["MOVE"]
+    if len(mob) and m:
+        x[mob] = (x[mob] + rng.move.integers(-m, m + 1, len(mob))) % W
+        y[mob] = (y[mob] + rng.move.integers(-m, m + 1, len(mob))) % Hg
+    cell = y.astype(np.int64) * W + x
+    lap("move")
+
+    # R1: coût de vie (sauf plantes)
+    energy[alive & ~plant] -= p["COST_STEP"]
+    lap("cost")
+
+    # R2a: herbivores mangent une plante de leur cellule (p_feed = T / (T + H_CELL), T de la cellule)
+    plants = np.flatnonzero(alive & plant)
+    pools = _cell_pools(plants, cell[plants] * S + sp[plants], rng.feed)
+    T = np.bincount(cell[plants], minlength=W * Hg)
+    herbs = np.flatnonzero(alive & herb)
+    rng.feed.shuffle(herbs)
+    t_h = T[cell[herbs]]
+    feeders = herbs[rng.feed.random(len(herbs)) < t_h / (t_h + p["H_CELL"])]
+    if len(feeders):
+        diet = np.repeat(_diet(pop.is_plant[None, :]), len(feeders), axis=0)
+        cand = _candidates(pools[0], cell[feeders], diet, S)
+        victims = _take_local(pools, cand, rng.feed)
+        ok = victims >= 0
+        feeders, victims = feeders[ok], victims[ok]
+        if events is not None:
+            events.add_slots(GRAZE, pop, feeders, victims, np.minimum(p["E_MAX"], energy[feeders] + p["GAIN_PLANT"]) - energy[feeders])
+        alive[victims] = False
+        ate[feeders] = True
+        energy[feeders] = np.minimum(p["E_MAX"], energy[feeders] + p["GAIN_PLANT"])
+        deaths += len(victims)
+    lap("graze")
+
+    # R2b: carnivores chassent dans leur cellule (1 tentative max / step)
+    prey_slots = np.flatnonzero(alive & ~plant & known)
+    pools = _cell_pools(prey_slots, cell[prey_slots] * S + sp[prey_slots], rng.hunt)
+    carns = np.flatnonzero(alive & carn)
+    rng.hunt.shuffle(carns)
+    hunters = carns[rng.hunt.random(len(carns)) < p["HUNT_PROB"]]
+    if len(hunters):
+        cand = _candidates(pools[0], cell[hunters], _diet(pop.prey)[sp[hunters]], S)
+        victims = _take_local(pools, cand, rng.hunt)
+        ok = victims >= 0
+        hunters, victims = hunters[ok], victims[ok]
+        # un chasseur tué dans la même phase ne profite pas de sa proie
+        fed = hunters[~np.isin(hunters, victims)]
+        if events is not None:
+            gain = np.minimum(p["E_MAX"], energy[hunters] + p["GAIN_PREY"]) - energy[hunters]
+            events.add_slots(HUNT, pop, hunters, victims, np.where(np.isin(hunters, fed), gain, 0))
+        alive[victims] = False
+        ate[fed] = True
+        energy[fed] = np.minimum(p["E_MAX"], energy[fed] + p["GAIN_PREY"])
+        deaths += len(victims)
+    lap("hunt")
+
+    # R3: mort par famine (énergie <= 0), sauf plantes
+    starving = alive & ~plant & (energy <= 0)
+    alive[starving] = False
+    if events is not None:
+        events.add_slots(STARVE, pop, np.flatnonzero(starving))
+    deaths += int(starving.sum())
+    lap("starve")
+
+    counts = np.bincount(sp[alive & known], minlength=S)
+    births = np.zeros(S, dtype=np.int64)
+    new_sp, new_x, new_y = [], [], []
+
+    # R4a: plantes (logistique par cellule), graines dans la cellule ou une voisine
+    plants = np.flatnonzero(alive & plant)
+    n_cell = np.bincount(cell[plants], minlength=W * Hg)
+    keys, n = np.unique(cell[plants] * S + sp[plants], return_counts=True)
+    c = keys // S
+    p_eff = p["P_REPRO_PLANT"] * np.clip(1.0 - n_cell[c] / p["K_CELL"], 0.0, None)
+    k = rng.repro.binomial(n, p_eff)
+    if k.sum():
+        c, s = np.repeat(c, k), np.repeat(keys % S, k)
+        gx = (c % W + rng.repro.integers(-1, 2, len(c))) % W
+        gy = (c // W + rng.repro.integers(-1, 2, len(c))) % Hg
+        # une graine ne germe que s'il reste de la place dans sa cellule d'arrivée (K_CELL)
+        target = gy.astype(np.int64) * W + gx
+        order = rng.repro.permutation(len(target))
+        order = order[_stable_order(target[order])]
+        t_sorted = target[order]
+        rank = np.arange(len(order)) - np.searchsorted(t_sorted, t_sorted, side="left")
+        keep = np.sort(order[rank < np.maximum(p["K_CELL"] - n_cell[t_sorted], 0)])
+        s = s[keep]
+        new_sp.append(s)
+        new_x.append(gx[keep])
+        new_y.append(gy[keep])
+        births += np.bincount(s, minlength=S)
+    lap("repro_plant")
+
+    # R4b/R4c: herbivores puis carnivores (ont mangé, énergie suffisante, >= 2 de l'espèce dans la cellule)
+    animals = np.flatnonzero(alive & known & ~plant)
+    keys, n = np.unique(cell[animals] * S + sp[animals], return_counts=True)
+    local = np.zeros(len(sp), dtype=np.int64)
+    if len(keys):
+        local[animals] = n[np.searchsorted(keys, cell[animals] * S + sp[animals])]
+    for role, p_repro in ((herb, p["P_REPRO_HERB"]), (carn, p["P_REPRO_CARN"])):
+        eligible = alive & role & ate & (energy >= p["E_REPRO"]) & (local >= 2)
+        idx = np.flatnonzero(eligible)
+        idx = idx[rng.repro.random(len(idx)) < p_repro]
+        energy[idx] -= p["REPRO_COST"]
+        if events is not None:
+            events.add_slots(REPRO, pop, idx, delta=-p["REPRO_COST"])
+        parents = idx[energy[idx] > 0]
+        new_sp.append(sp[parents])
+        new_x.append(x[parents])
+        new_y.append(y[parents])
+        births += np.bincount(sp[parents], minlength=S)
+
+    n0 = pop.n
+    n_births = pop.add_at(
+        np.concatenate(new_sp).astype(np.int32) if new_sp else np.zeros(0, dtype=np.int32),
+        np.concatenate(new_x) if new_x else np.zeros(0, dtype=np.int32),
+        np.concatenate(new_y) if new_y else np.zeros(0, dtype=np.int32),
+        p["E_INIT"],
+    )
+    if events is not None:
+        events.add_slots(BIRTH, pop, np.arange(n0, pop.n), delta=p["E_INIT"])
+    pop.species_counts = counts + births
+    pop.n_alive = int(pop.alive[:pop.n].sum())
+    pop.compact()
+    lap("repro_animal")
+    return {"births": n_births, "deaths": deaths}
@@ -1,17 +1,61 @@
+from collections.abc import MutableSet
 from dataclasses import dataclass, field
 from typing import Dict, Set, Any
 
+from simulation.history import PopulationHistory
+
+class ActiveSet(MutableSet):
+    """
+    Ensemble ordonné par insertion (dict sans valeurs) : l'itération suit
+    l'ordre des naissances, pas la table de hachage -> runs reproductibles.
+    """
+
+    def __init__(self, items=()):
+        self._d = dict.fromkeys(items)
+
+    def __contains__(self, x) -> bool:
+        return x in self._d
+
+    def __iter__(self):
+        return iter(self._d)
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    def __repr__(self) -> str:
+        return f"ActiveSet({list(self._d)!r})"
+
+    def add(self, x) -> None:
+        self._d[x] = None
+
+    def discard(self, x) -> None:
+        self._d.pop(x, None)
+
+    def clear(self) -> None:
+        self._d.clear()
+
+    def update(self, items) -> None:
+        self._d.update(dict.fromkeys(items))
+
 @dataclass
 class SimulationState:
     running: bool = False
     frozen_reasoner: bool = False
     t: int = 0
 
-    history: Dict[str, list] = field(default_factory=dict)
+    history: PopulationHistory = field(default_factory=PopulationHistory)
 
     # ensembles/dicos "dynamiques"
-    active: Set[Any] = field(default_factory=set)     # contient des URIRef
-    energy: Dict[Any, int] = field(default_factory=dict)  # URIRef -> int
+    active: ActiveSet = field(default_factory=ActiveSet)  # ids d'individus (simulation/ids.py), ordre d'insertion
+    energy: Dict[int, int] = field(default_factory=dict)  # id -> énergie
     known_species: Set[str] = field(default_factory=set)
+    species_counts: Dict[str, int] = field(default_factory=dict)  # moteur dict : effectifs tenus à jour par create/remove
 
     params: Dict[str, Any] = field(default_factory=dict)
+
+    # moteur de simulation ("dict" ou "array") ; population = PopulationArrays en mode array
+    engine: str = "dict"
+    population: Any = None
+
+    # conditions d'arrêt en flux (simulation/stopping.py::StopMonitor), construites au démarrage du run
+    stop: Any = None
@@ -1,35 +1,241 @@
-from ontology.species import pop_by_species
+import math
+from collections import deque
+from typing import Dict, Iterable, List, Optional
 
-def update_history_and_check_stop(active, indiv_species, history: dict, known_species: set, t: int, params: dict):
-    pop = pop_by_species(active, indiv_species)
+from simulation.history import PopulationHistory
 
+# conditions d'arrêt par défaut (même comportement que l'ancien test STABLE / EXTINCTION / TIMEOUT)
+DEFAULT_STOP_CONDITIONS = ["extinction", "stable", "timeout"]
+
+class WindowMinMax:
+    """min / max glissants sur les `size` dernières valeurs (deques monotones, O(1) amorti)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.n = 0
+        self._min = deque()  # (i, v), v croissant
+        self._max = deque()  # (i, v), v décroissant
+
+    def push(self, v) -> None:
+        i = self.n
+        self.n += 1
+        while self._min and self._min[-1][1] >= v:
+            self._min.pop()
+        self._min.append((i, v))
+        while self._max and self._max[-1][1] <= v:
+            self._max.pop()
+        self._max.append((i, v))
+        lo = i - self.size
+        if self._min[0][0] <= lo:
+            self._min.popleft()
+        if self._max[0][0] <= lo:
+            self._max.popleft()
+
+    @property
+    def full(self) -> bool:
+        return self.n >= self.size
+
+    def range(self):
+        return self._max[0][1] - self._min[0][1]
+
+class WindowMoments:
+    """Moyenne / écart-type glissants (sommes incrémentales)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.s = 0.0
+        self.s2 = 0.0
+
+    def push(self, v) -> None:
+        self.values.append(v)
+        self.s += v
+        self.s2 += v * v
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.s -= old
+            self.s2 -= old * old
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) >= self.size
+
+    def mean(self) -> float:
+        return self.s / len(self.values)
+
+    def std(self) -> float:
+        m = self.mean()
+        return math.sqrt(max(0.0, self.s2 / len(self.values) - m * m))
+
+class StopCondition:
+    """
+    Condition d'arrêt en flux : update() est appelé à chaque step avec les
+    effectifs de toutes les espèces suivies ; coût O(espèces), indépendant
+    de la fenêtre et de la population. Renvoie un statut ou None.
+    """
+
+    def update(self, t: int, counts: Dict[str, int], n_active: int) -> Optional[str]:
+        raise NotImplementedError
+
+class ExtinctionCondition(StopCondition):
+    def __init__(self, params: dict, species_traits: dict):
+        pass
+
+    def update(self, t, counts, n_active):
+        return "EXTINCTION" if n_active == 0 else None
+
+class StableCondition(StopCondition):
+    """Chaque espèce a >= W valeurs, toutes dans une bande de largeur R (t >= W)."""
+
+    def __init__(self, params: dict, species_traits: dict, window: Optional[int] = None, tolerance: Optional[int] = None):
+        self.W = window or params["stable_window"]
+        self.R = params["stable_range"] if tolerance is None else tolerance
+        self.windows: Dict[str, WindowMinMax] = {}
+
+    def update(self, t, counts, n_active):
+        stable = t >= self.W
+        for sp, n in counts.items():
+            w = self.windows.get(sp)
+            if w is None:
+                w = self.windows[sp] = WindowMinMax(self.W)
+            w.push(n)
+            stable = stable and w.full and w.range() <= self.R
+        return "STABLE" if stable else None
+
+class TimeoutCondition(StopCondition):
+    def __init__(self, params: dict, species_traits: dict, max_steps: Optional[int] = None):
+        self.max_steps = params["max_steps"] if max_steps is None else max_steps
+
+    def update(self, t, counts, n_active):
+        return "TIMEOUT" if t >= self.max_steps else None
+
+class TrophicExtinctionCondition(StopCondition):
+    """Un niveau trophique (plant / herbivore / carnivore) présent au départ a disparu."""
+
+    TRAITS = {"plant": "is_plant", "herbivore": "is_herbivore", "carnivore": "is_carnivore"}
+
+    def __init__(self, params: dict, species_traits: dict, level: str = "carnivore"):
+        trait = self.TRAITS[level]
+        self.level = level
+        self.species = {sp for sp, tr in species_traits.items() if tr.get(trait)}
+        self.seen = False
+
+    def update(self, t, counts, n_active):
+        total = sum(counts.get(sp, 0) for sp in self.species)
+        if total:
+            self.seen = True
+            return None
+        return f"EXTINCTION_{self.level.upper()}" if self.seen else None
+
+class OscillationCondition(StopCondition):
+    """
+    Cycle installé : une espèce a changé de sens au moins `reversals` fois dans
+    les `window` derniers steps, avec une amplitude >= `amplitude`.
+    """
+
+    def __init__(self, params: dict, species_traits: dict, window: int = 60, reversals: int = 6, amplitude: int = 4):
+        self.window = window
+        self.reversals = reversals
+        self.amplitude = amplitude
+        self.state: Dict[str, list] = {}  # sp -> [dernière valeur, dernier sens, deque des t d'inversion, WindowMinMax]
+
+    def update(self, t, counts, n_active):
+        status = None
+        for sp, n in counts.items():
+            st = self.state.get(sp)
+            if st is None:
+                self.state[sp] = [n, 0, deque(), WindowMinMax(self.window)]
+                self.state[sp][3].push(n)
+                continue
+            last, direction, flips, mm = st
+            mm.push(n)
+            d = (n > last) - (n < last)
+            if d and direction and d != direction:
+                flips.append(t)
+            if d:
+                st[1] = d
+            st[0] = n
+            while flips and flips[0] <= t - self.window:
+                flips.popleft()
+            if len(flips) >= self.reversals and mm.range() >= self.amplitude:
+                status = "OSCILLATION"
+        return status
+
+class CVStableCondition(StopCondition):
+    """Stabilité relative : coefficient de variation <= max_cv pour chaque espèce présente."""
+
+    def __init__(self, params: dict, species_traits: dict, window: Optional[int] = None, max_cv: float = 0.05):
+        self.W = window or params["stable_window"]
+        self.max_cv = max_cv
+        self.windows: Dict[str, WindowMoments] = {}
+
+    def update(self, t, counts, n_active):
+        stable = t >= self.W
+        for sp, n in counts.items():
+            w = self.windows.get(sp)
+            if w is None:
+                w = self.windows[sp] = WindowMoments(self.W)
+            w.push(n)
+            if stable:
+                m = w.mean()
+                stable = w.full and (m == 0 or w.std() / m <= self.max_cv)
+        return "STABLE" if stable else None
+
+STOP_CONDITIONS = {
+    "extinction": ExtinctionCondition,
+    "stable": StableCondition,
+    "timeout": TimeoutCondition,
+    "trophic_extinction": TrophicExtinctionCondition,
+    "oscillation": OscillationCondition,
+    "cv_stable": CVStableCondition,
+}
+
+def register_condition(name: str, cls) -> None:
+    """Ajoute un type de condition utilisable dans params["stop_conditions"]."""
+    STOP_CONDITIONS[name] = cls
+
+class StopMonitor:
+    """
+    Conditions d'arrêt évaluées dans l'ordre ; la première qui renvoie un
+    statut l'emporte. Spécifications : "nom" ou {"name": "nom", **kwargs}.
+    """
+
+    def __init__(self, conditions: List[StopCondition]):
+        self.conditions = conditions
+
+    @classmethod
+    def from_params(cls, params: dict, species_traits: dict) -> "StopMonitor":
+        conditions = []
+        for spec in params.get("stop_conditions") or DEFAULT_STOP_CONDITIONS:
+            if isinstance(spec, str):
+                spec = {"name": spec}
+            kwargs = dict(spec)
+            name = kwargs.pop("name")
+            if name not in STOP_CONDITIONS:
+                raise ValueError(f"Condition d'arrêt inconnue: {name}")
+            conditions.append(STOP_CONDITIONS[name](params, species_traits, **kwargs))
+        return cls(conditions)
+
+    def update(self, t: int, counts: Dict[str, int], n_active: int) -> Optional[str]:
+        status = None
+        for cond in self.conditions:
+            s = cond.update(t, counts, n_active)
+            status = status or s
+        return status
+
+def update_history_from_counts(
+    counts: dict,
+    n_active: int,
+    history: PopulationHistory,
+    known_species: Iterable[str],
+    t: int,
+    monitor: StopMonitor,
+) -> Optional[str]:
+    """Ajoute les effectifs du step à l'historique et évalue les conditions d'arrêt."""
     # ajouter toutes espèces vues
-    for sp in list(known_species):
-        history.setdefault(sp, [])
+    for sp in sorted(known_species):
+        history.ensure(sp, t)
 
     # append counts (0 si absente)
-    for sp in list(history.keys()):
-        history[sp].append(len(pop.get(sp, [])))
-
-    if len(active) == 0:
-        return "EXTINCTION"
-
-    W = params["stable_window"]
-    R = params["stable_range"]
-    if t >= W:
-        stable = True
-        for hist in history.values():
-            if len(hist) < W:
-                stable = False
-                break
-            recent = hist[-W:]
-            if max(recent) - min(recent) > R:
-                stable = False
-                break
-        if stable:
-            return "STABLE"
-
-    if t >= params["max_steps"]:
-        return "TIMEOUT"
-
-    return None
+    history.append(t, counts)
+    return monitor.update(t, {sp: counts.get(sp, 0) for sp in history.species}, n_active)
@@ -0,0 +1,186 @@
+from typing import Optional
+
+import numpy as np
+
+from simulation.population import PopulationArrays
+from simulation.rng import WorldRNG
+from simulation.metrics import StepTimer, no_lap
+from simulation.eventlog import EventLog, BIRTH, REPRO, GRAZE, HUNT, STARVE
+
+H = 5  # demi-saturation (même valeur que simulation/rules.py)
+
+def _species_pools(pop: PopulationArrays, mask: np.ndarray, rng: np.random.Generator):
+    """
+    Slots vivants des espèces de `mask`, mélangés puis groupés par espèce :
+    renvoie (slots, début de chaque espèce, taille de chaque espèce).
+    """
+    S = len(pop.species)
+    sp = pop.view("sp")
+    slots = np.flatnonzero(pop.view("alive") & (sp >= 0))
+    slots = slots[mask[sp[slots]]]
+    rng.shuffle(slots)
+    slots = slots[np.argsort(sp[slots], kind="stable")]
+    size = np.bincount(sp[slots], minlength=S)
+    start = np.concatenate(([0], np.cumsum(size)[:-1])).astype(np.int64)
+    return slots, start, size
+
+def _take_from_pools(pools, taken: np.ndarray, groups: np.ndarray, group_rows: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Une demande par entrée de `groups` (dans l'ordre de passage) ; la demande k
+    tire uniformément une espèce parmi `group_rows[groups[k]]` encore disponibles,
+    puis prend le prochain individu du pool (équivalent des pop() successifs
+    de la version dict). Les perdants d'une espèce épuisée retentent au tour suivant.
+    Renvoie le slot de la victime par demande, ou -1.
+    """
+    slots, start, size = pools
+    victims = np.full(len(groups), -1, dtype=np.int64)
+    pending = np.arange(len(groups))
+    while len(pending):
+        avail = group_rows & (taken < size)
+        chosen = np.full(len(pending), -1, dtype=np.int64)
+        g_pending = groups[pending]
+        for g in np.unique(g_pending).tolist():
+            cands = np.flatnonzero(avail[g])
+            if len(cands):
+                sel = g_pending == g
+                chosen[sel] = cands[rng.integers(len(cands), size=int(sel.sum()))]
+        ok = chosen >= 0
+        pending, chosen = pending[ok], chosen[ok]
+        if not len(pending):
+            break
+
+        # rang de chaque demande dans son espèce (ordre de passage conservé)
+        order = np.argsort(chosen, kind="stable")
+        pending, chosen = pending[order], chosen[order]
+        rank = np.arange(len(chosen)) - np.searchsorted(chosen, chosen, side="left")
+        win = rank < (size - taken)[chosen]
+        victims[pending[win]] = slots[start[chosen[win]] + taken[chosen[win]] + rank[win]]
+        taken += np.bincount(chosen[win], minlength=len(taken))
+        pending = np.sort(pending[~win])
+    return victims
+
+def simulation_step_arrays(
+    pop: PopulationArrays,
+    params: dict,
+    rng: WorldRNG,
+    timer: Optional[StepTimer] = None,
+    events: Optional[EventLog] = None,
+) -> dict:
+    """
+    Version vectorisée de simulation_step_energy : mêmes règles R1-R4,
+    appliquées par phases sur les colonnes de PopulationArrays.
+    Tirages sur les flux feed / hunt / repro de `rng` ; `timer` : temps par phase ;
+    `events` : journal des naissances / broutages / chasses / morts (simulation/eventlog.py).
+    Renvoie les compteurs de naissances / morts du step.
+    """
+    lap = timer.lap if timer else no_lap
+    p = params
+    S = len(pop.species)
+    sp = pop.view("sp")
+    energy = pop.view("energy")
+    alive = pop.view("alive")
+    ate = pop.view("ate")
+    ate[:] = False
+
+    # traits par slot (espèce inconnue = ni plante, ni herbivore, ni carnivore)
+    known = sp >= 0
+    sp_k = np.where(known, sp, 0)
+    plant = known & pop.is_plant[sp_k]
+    herb = known & pop.is_herb[sp_k]
+    carn = known & pop.is_carn[sp_k]
+
+    deaths = 0
+
+    # R1: coût de vie (sauf plantes)
+    energy[alive & ~plant] -= p["COST_STEP"]
+    lap("cost")
+
+    # R2a: herbivores mangent plantes (p_feed = T / (T + H), T décroissant)
+    pools = _species_pools(pop, pop.is_plant, rng.feed)
+    taken = np.zeros(S, dtype=np.int64)
+    total_plants = int(pools[2].sum())
+    herbs = np.flatnonzero(alive & herb)
+    rng.feed.shuffle(herbs)
+    u = rng.feed.random(len(herbs))
+    plant_row = pop.is_plant[None, :]
+
+    pos = 0
+    while total_plants > 0 and pos < len(herbs):
+        # bloc sur lequel p_feed varie peu
+        block = max(1, total_plants // 8)
+        p_feed = min(1.0, total_plants / (total_plants + H))
+        feeders = herbs[pos:pos + block][u[pos:pos + block] < p_feed][:total_plants]
+        pos += block
+        if not len(feeders):
+            continue
+        victims = _take_from_pools(pools, taken, np.zeros(len(feeders), dtype=np.int64), plant_row, rng.feed)
+        ok = victims >= 0
+        feeders, victims = feeders[ok], victims[ok]
+        if events is not None:
+            events.add_slots(GRAZE, pop, feeders, victims, np.minimum(p["E_MAX"], energy[feeders] + p["GAIN_PLANT"]) - energy[feeders])
+        alive[victims] = False
+        ate[feeders] = True
+        energy[feeders] = np.minimum(p["E_MAX"], energy[feeders] + p["GAIN_PLANT"])
+        total_plants -= len(victims)
+        deaths += len(victims)
+    lap("graze")
+
+    # R2b: carnivores chassent (1 tentative max / step)
+    pools = _species_pools(pop, ~pop.is_plant, rng.hunt)
+    taken = np.zeros(S, dtype=np.int64)
+    carns = np.flatnonzero(alive & carn)
+    rng.hunt.shuffle(carns)
+    hunters = carns[rng.hunt.random(len(carns)) < p["HUNT_PROB"]]
+    hunters = hunters[pop.prey[sp[hunters]].any(axis=1)]
+    if len(hunters):
+        victims = _take_from_pools(pools, taken, sp[hunters].astype(np.int64), pop.prey, rng.hunt)
+        ok = victims >= 0
+        hunters, victims = hunters[ok], victims[ok]
+        # un chasseur tué dans la même phase ne profite pas de sa proie
+        fed = hunters[~np.isin(hunters, victims)]
+        if events is not None:
+            gain = np.minimum(p["E_MAX"], energy[hunters] + p["GAIN_PREY"]) - energy[hunters]
+            events.add_slots(HUNT, pop, hunters, victims, np.where(np.isin(hunters, fed), gain, 0))
+        alive[victims] = False
+        ate[fed] = True
+        energy[fed] = np.minimum(p["E_MAX"], energy[fed] + p["GAIN_PREY"])
+        deaths += len(victims)
+    lap("hunt")
+
+    # R3: mort par famine (énergie <= 0), sauf plantes
+    starving = alive & ~plant & (energy <= 0)
+    alive[starving] = False
+    if events is not None:
+        events.add_slots(STARVE, pop, np.flatnonzero(starving))
+    deaths += int(starving.sum())
+    lap("starve")
+
+    # R4a: plantes (logistique)
+    counts = np.bincount(sp[alive & known], minlength=S)
+    K = p["K_PLANT"]
+    grow = pop.is_plant & (counts > 0) & (counts < K)
+    p_eff = np.where(grow, p["P_REPRO_PLANT"] * np.clip(1.0 - counts / K, 0.0, None), 0.0)
+    births = rng.repro.binomial(counts, p_eff)
+    lap("repro_plant")
+
+    # R4b/R4c: herbivores puis carnivores (ont mangé, énergie suffisante, >= 2 individus)
+    for role, p_repro in ((herb, p["P_REPRO_HERB"]), (carn, p["P_REPRO_CARN"])):
+        eligible = alive & role & ate & (energy >= p["E_REPRO"]) & (counts[sp_k] >= 2)
+        idx = np.flatnonzero(eligible)
+        idx = idx[rng.repro.random(len(idx)) < p_repro]
+        energy[idx] -= p["REPRO_COST"]
+        if events is not None:
+            events.add_slots(REPRO, pop, idx, delta=-p["REPRO_COST"])
+        parents = idx[energy[idx] > 0]
+        births += np.bincount(sp[parents], minlength=S)
+
+    n0 = pop.n
+    n_births = pop.add_births(births, p["E_INIT"])
+    if events is not None:
+        events.add_slots(BIRTH, pop, np.arange(n0, pop.n), delta=p["E_INIT"])
+    # effectifs de fin de step : survivants (counts, déjà calculés) + naissances
+    pop.species_counts = counts + births
+    pop.n_alive = int(alive.sum()) + n_births
+    pop.compact()
+    lap("repro_animal")
+    return {"births": n_births, "deaths": deaths}
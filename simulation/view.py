@@ -0,0 +1,110 @@
+"""
+Accès concurrent à un monde : un écrivain, des lecteurs sans lock.
+
+Toute mutation (step, ajouts / retraits, reset, chargement, fork) passe par
+writing(ctx) : ctx["lock"], puis un nouveau numéro d'écriture (ctx["seq"]).
+Les lecteurs de /api/state lisent un WorldView : copie immuable et versionnée
+de l'état, faite sous le lock une fois par numéro d'écriture, puis servie
+(filtres, pagination, JSON) sans le lock. read_view() ne bloque pas un step
+en cours : il sert le dernier WorldView publié, et le step suivant en publie
+un nouveau à sa fin (ctx["view_wanted"]), sans attendre une autre requête.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+from rdflib import URIRef
+
+from graph.foodweb import FoodWeb
+from simulation.changes import changes_since
+from simulation.ids import IdAllocator
+from simulation.world import species_energy_stats, sync_world
+
+@dataclass(frozen=True, eq=False)
+class WorldView:
+    """État d'un monde au numéro d'écriture `seq` ; version : celle de StateChanges (?since=)."""
+    seq: int
+    version: int
+    run: int
+    t: int
+    running: bool
+    engine: str
+    active: FrozenSet[int]
+    species: Dict[int, str]     # id -> espèce (copie)
+    energy: Dict[int, int]      # id -> énergie (copie)
+    uris: Dict[int, URIRef]     # id -> URIRef internée (copie)
+    food_web: FoodWeb           # remplacé, jamais modifié, par rebuild_rules
+    taxonomy: object            # TaxonomyIndex du reasoner à la capture
+    changes: tuple = field(repr=False)  # journal de StateChanges (cf. StateChanges.log)
+
+    def uri(self, i: int) -> URIRef:
+        """URIRef internée à la capture, sinon <espèce><id> (cf. IdAllocator.uri)."""
+        u = self.uris.get(i)
+        return u if u is not None else IdAllocator.mint(i, self.species.get(i))
+
+    def since(self, version: int) -> Optional[Tuple[Set[int], Dict[int, Optional[str]], Set[int], bool]]:
+        """StateChanges.since, figé à cette vue."""
+        return changes_since(self.changes, self.version, version)
+
+    @cached_property
+    def stats(self) -> Dict[str, dict]:
+        """energy_stats de la vue (calculé hors lock, au premier accès)."""
+        return species_energy_stats(self.active, self.species, self.energy)
+
+def capture_view(ctx) -> WorldView:
+    """Copie de l'état courant ; sous ctx["lock"]."""
+    sync_world(ctx)  # moteurs NumPy / mode lazy : active / energy à jour
+    state = ctx["state"]
+    return WorldView(
+        seq=ctx["seq"],
+        version=ctx["changes"].commit(ctx),
+        run=ctx["feed"].run,
+        t=state.t,
+        running=state.running,
+        engine=state.engine,
+        active=frozenset(state.active),
+        species=dict(ctx["indiv_species"]),
+        energy=dict(state.energy),
+        uris=dict(ctx["ids"].uris),
+        food_web=ctx["food_web"],
+        taxonomy=ctx["reasoner"].taxonomy(ctx["base_g"]),
+        changes=ctx["changes"].log(),
+    )
+
+def publish(ctx) -> None:
+    """Fin d'écriture (sous le lock) : nouveau numéro ; vue capturée tout de suite si un lecteur l'attend."""
+    ctx["seq"] += 1
+    if ctx["view_wanted"]:
+        ctx["view_wanted"] = False
+        ctx["view"] = capture_view(ctx)
+
+@contextmanager
+def writing(ctx):
+    """`with writing(ctx):` pour toute mutation du monde (à la place de `with ctx["lock"]:`)."""
+    with ctx["lock"]:
+        try:
+            yield ctx
+        finally:
+            publish(ctx)
+
+def read_view(ctx) -> WorldView:
+    """
+    WorldView du dernier numéro d'écriture si le lock est libre ; sinon (step
+    en cours) la dernière vue publiée, rafraîchie à la fin du step. N'attend
+    le lock que si aucune vue n'a encore été capturée.
+    """
+    view = ctx["view"]
+    if view is not None and view.seq == ctx["seq"]:
+        return view
+    ctx["view_wanted"] = True
+    lock = ctx["lock"]
+    if lock.acquire(blocking=view is None):
+        try:
+            view = ctx["view"]
+            if view is None or view.seq != ctx["seq"]:
+                view = ctx["view"] = capture_view(ctx)
+                ctx["view_wanted"] = False
+        finally:
+            lock.release()
+    return view
@@ -0,0 +1,427 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from rdflib import Graph, URIRef, RDF
+
+from ontology.loader import new_overlay_graph, BIOLOGICAL_SPECIES, PLANT
+from ontology.reasoner import ReasonerCache
+from ontology.species import EatsRulesCache, rebuild_species_mapping_and_rules, pop_by_species, local_name
+from graph.foodweb import FoodWeb
+from graph.overlay import OverlayJournal
+from simulation.state import SimulationState
+from simulation.history import PopulationHistory
+from simulation.feed import StepFeed
+from simulation.changes import StateChanges
+from simulation.rng import WorldRNG
+from simulation.ids import IdAllocator
+from simulation.metrics import Metrics
+from simulation.rules import simulation_step_energy
+from simulation.stopping import StopMonitor, update_history_from_counts
+from simulation.population import PopulationArrays
+from simulation.vectorized import simulation_step_arrays
+from simulation.spatial import simulation_step_spatial
+from simulation.aggregate import AggregatePopulation, simulation_step_aggregate
+from simulation.meanfield import meanfield_run, round_histogram
+from simulation.eventlog import open_log, close_log
+from simulation.export import open_export, close_export
+from simulation.lifecycle import create_individual as _create, remove_individual as _remove
+
+ENGINES = ("dict", "array", "spatial", "aggregate")
+
+# moteurs à population NumPy : fonction de step
+POPULATION_STEPS = {
+    "array": simulation_step_arrays,
+    "spatial": simulation_step_spatial,
+    "aggregate": simulation_step_aggregate,
+}
+
+def new_world(
+    base_g: Graph,
+    reasoner: ReasonerCache,
+    eats_cache: EatsRulesCache,
+    onto_meta: dict,
+    params: dict,
+    engine: str = "dict",
+    lazy_overlay: bool = True,
+    seed=None,
+    metrics: Optional[Metrics] = None,
+    event_log: bool = False,
+    export: Optional[str] = None,
+) -> dict:
+    """Contexte d'un monde (dict partagé par les blueprints, la CLI batch, ...)."""
+    return {
+        "base_g": base_g,
+        "overlay_g": new_overlay_graph(),
+        "state": SimulationState(params=dict(params)),
+        "reasoner": reasoner,
+        "eats_cache": eats_cache,
+        "ids": IdAllocator(),   # id entier <-> URIRef (internée à la demande)
+        "indiv_species": {},    # id -> species_str
+        "species_traits": {},   # species_str -> traits dict
+        "species_prey": {},     # pred_species_str -> [prey_species_str]
+        "species_list": onto_meta["species"],
+        "base_taxonomy": onto_meta["taxonomy"],
+        "food_web": FoodWeb(),
+        "rng": WorldRNG(seed),  # re-graine à chaque run (begin_run)
+        "engine": engine,
+        "run_seed": None,          # graine des runs lancés sans "seed" (celle du scénario chargé)
+        "defaults": {"params": dict(params), "engine": engine},  # rétablis par /api/reset
+        "lazy_overlay": lazy_overlay,
+        "overlay_journal": OverlayJournal(),
+        "headless": False,      # True : pas de resynchro overlay en fin de run (CLI batch)
+        "lock": threading.RLock(),  # écritures : simulation/view.py writing()
+        "seq": 0,                   # numéro d'écriture (publish)
+        "view": None,               # dernier WorldView publié (lectures sans lock : read_view)
+        "view_wanted": False,       # un lecteur attend une vue plus récente
+        "feed": StepFeed(),         # deltas par step pour /api/stream
+        "changes": StateChanges(),  # versions de l'état pour /api/state?since=
+        "last_step": {"births": 0, "deaths": 0},
+        "metrics": metrics,         # partagé par le processus (None : pas de mesure)
+        "profile": None,            # StepProfile en cours (/api/metrics/profile)
+        "event_log": event_log,     # True : journal d'événements de chaque run (simulation/eventlog.py)
+        "events": None,             # EventLog du run en cours
+        "export_format": export,    # "parquet" / "arrow" / "csv" : export de chaque run (simulation/export.py)
+        "export": None,             # TrajectoryRecorder du run en cours
+    }
+
+def resolve_species(species_list: List[str], name: str) -> str:
+    """URI complète ou nom local (insensible à la casse)."""
+    if name in species_list:
+        return name
+    for sp in species_list:
+        if local_name(sp).lower() == name.lower():
+            return sp
+    raise ValueError(f"Espèce inconnue: {name}")
+
+def check_species(ctx, species_uri: URIRef) -> None:
+    """ValueError si la classe n'est ni une espèce animale ni une plante."""
+    tax = ctx["base_taxonomy"]
+    if not (tax.is_subclass(species_uri, BIOLOGICAL_SPECIES) or tax.is_subclass(species_uri, PLANT)):
+        raise ValueError("Classe non supportée")
+
+def add_individual(ctx, species_uri: URIRef) -> int:
+    """Ajoute un individu de l'espèce donnée (renvoie son id) ; ValueError si la classe n'est pas une espèce."""
+    check_species(ctx, species_uri)
+
+    u = ctx["ids"].new()
+    ctx["overlay_g"].add((ctx["ids"].uri(u, str(species_uri)), RDF.type, species_uri))
+    ctx["state"].active.add(u)
+    ctx["state"].energy[u] = ctx["state"].params["E_INIT"]
+    ctx["indiv_species"][u] = str(species_uri)  # affiné (classe la plus spécifique) par rebuild_rules
+
+    ctx["reasoner"].mark_dirty()
+    return u
+
+def add_population(ctx, population: Dict[str, int]) -> Dict[str, int]:
+    """
+    Ajoute {espèce (URI ou nom local) : effectif} en un batch : espèces
+    validées une fois, un bloc d'ids par espèce, triples ajoutés d'un coup
+    (journalisés en mode lazy), reasoner invalidé une fois. Tout ou rien :
+    ValueError avant toute modification. Renvoie {species_str: effectif}.
+    """
+    plan = {}
+    for name, n in sorted(population.items(), key=lambda kv: str(kv[0])):  # ids par espèce : indépendants de l'ordre du dict
+        name = str(name)
+        sp = name if "#" in name else resolve_species(ctx["species_list"], name)
+        check_species(ctx, URIRef(sp))
+        if isinstance(n, bool) or not isinstance(n, int) or n < 0:
+            raise ValueError(f"Effectif invalide pour {name}: {n!r}")
+        plan[sp] = plan.get(sp, 0) + n
+
+    state, ids = ctx["state"], ctx["ids"]
+    journal = ctx["overlay_journal"] if ctx["lazy_overlay"] else None
+    overlay_g = ctx["overlay_g"]
+    e0 = state.params["E_INIT"]
+    quads = []
+    for sp, n in plan.items():
+        first = ids.reserve(n)
+        new = range(first, first + n)
+        state.active.update(new)
+        state.energy.update(dict.fromkeys(new, e0))
+        ctx["indiv_species"].update(dict.fromkeys(new, sp))
+        if journal is not None:
+            journal.record_births(first, n, sp)
+        else:
+            cls = URIRef(sp)
+            quads.extend((ids.uri(i, sp), RDF.type, cls, overlay_g) for i in new)
+    if quads:
+        overlay_g.addN(quads)
+
+    ctx["reasoner"].mark_dirty()
+    return plan
+
+def rebuild_rules(ctx) -> None:
+    """Raisonne puis reconstruit mapping individus -> espèces, traits, proies et réseau trophique."""
+    state = ctx["state"]
+    sync_world(ctx)
+
+    g = ctx["reasoner"].reasoned_graph(ctx["base_g"], ctx["overlay_g"], freeze_ok=False, frozen_reasoner=False)
+    rebuild_species_mapping_and_rules(
+        reasoned_g=g,
+        active=state.active,
+        eats_cache=ctx["eats_cache"],
+        base_g=ctx["base_g"],
+        indiv_species=ctx["indiv_species"],
+        species_traits=ctx["species_traits"],
+        species_prey=ctx["species_prey"],
+        known_species=state.known_species,
+        taxonomy=ctx["reasoner"].taxonomy(ctx["base_g"]),
+        uri_of=ctx["ids"].uri,  # individus déjà dans l'overlay, donc internés
+    )
+    ctx["food_web"] = FoodWeb(ctx["species_prey"])
+
+def start_world(ctx, engine: str = "dict", seed=None, events: Optional[bool] = None, export: Optional[str] = None) -> None:
+    """Démarre la simulation du monde `ctx` (même déroulé que l'ancien /api/start)."""
+    # 1-2) calc OWL une fois + rebuild mapping / traits / prey rules
+    rebuild_rules(ctx)
+    begin_run(ctx, engine, seed=seed, events=events, export=export)
+
+def begin_run(ctx, engine: str = "dict", seed=None, events: Optional[bool] = None, export: Optional[str] = None) -> None:
+    """
+    Démarre un run sur le mapping espèces / règles déjà construit (sans reasoner).
+    seed=None : graine tirée, lisible ensuite dans ctx["rng"].seed pour rejouer le run.
+    events : journal d'événements du run (None : ctx["event_log"] ; jamais pour le moteur aggregate).
+    export : format d'export de la trajectoire (None : ctx["export_format"]).
+    """
+    state = ctx["state"]
+    close_log(ctx)
+    close_export(ctx)
+    ctx["rng"] = WorldRNG(seed)
+
+    # 3) init énergie manquante
+    for u in list(state.active):
+        state.energy.setdefault(u, state.params["E_INIT"])
+
+    # 4) init history t=0
+    state.history = PopulationHistory()
+    pop0 = pop_by_species(state.active, ctx["indiv_species"])
+    state.known_species.update(pop0)
+    for sp in sorted(state.known_species):  # colonnes de l'historique : ordre indépendant du hash
+        state.history.ensure(sp, 0)
+    state.species_counts = {sp: len(inds) for sp, inds in pop0.items()}
+    state.history.append(0, state.species_counts)
+
+    # conditions d'arrêt : fenêtres initialisées avec t=0 (jamais d'arrêt à t=0)
+    state.stop = StopMonitor.from_params(state.params, ctx["species_traits"])
+    state.stop.update(0, {sp: state.species_counts.get(sp, 0) for sp in state.history.species}, len(state.active))
+
+    # 5) moteur
+    state.engine = engine
+    state.population = None
+    if engine in POPULATION_STEPS:
+        build = AggregatePopulation if engine == "aggregate" else PopulationArrays
+        state.population = build.from_state(
+            state.active, state.energy, ctx["indiv_species"],
+            ctx["species_traits"], ctx["species_prey"], state.known_species, state.params, ctx["ids"],
+        )
+    if engine == "spatial":
+        # positions tirées au démarrage (flux "move") : n'existent que le temps du run
+        state.population.scatter(ctx["rng"].move, state.params["GRID_W"], state.params["GRID_H"])
+
+    # 6) start
+    state.t = 0
+    state.frozen_reasoner = True
+    state.running = True
+
+    if (ctx["event_log"] if events is None else events) and engine != "aggregate":
+        ctx["events"] = open_log(ctx)
+    export = export or ctx["export_format"]
+    if export:
+        ctx["export"] = open_export(ctx, export)
+        ctx["export"].record(0, state.history.last(), energy_stats(ctx))
+
+def _step_dict(ctx, timer=None) -> dict:
+    state = ctx["state"]
+    stats = {"births": 0, "deaths": 0}
+
+    # mode lazy : l'overlay n'est pas touché pendant le step, tout passe par le journal
+    overlay_g = None if ctx["lazy_overlay"] else ctx["overlay_g"]
+    journal = ctx["overlay_journal"]
+
+    # wrappers lifecycle
+    counts = state.species_counts
+
+    def create_individual(species_str: str):
+        stats["births"] += 1
+        counts[species_str] = counts.get(species_str, 0) + 1
+        return _create(
+            overlay_g=overlay_g,
+            active=state.active,
+            energy=state.energy,
+            params=state.params,
+            indiv_species=ctx["indiv_species"],
+            known_species=state.known_species,
+            species_str=species_str,
+            ids=ctx["ids"],
+            journal=journal,
+        )
+
+    def remove_individual(u):
+        stats["deaths"] += 1
+        sp = ctx["indiv_species"].get(u)
+        if sp:
+            counts[sp] -= 1
+        return _remove(
+            overlay_g=overlay_g,
+            active=state.active,
+            energy=state.energy,
+            indiv_species=ctx["indiv_species"],
+            u=u,
+            ids=ctx["ids"],
+            journal=journal,
+        )
+
+    simulation_step_energy(
+        overlay_g=overlay_g,
+        active=state.active,
+        energy=state.energy,
+        params=state.params,
+        indiv_species=ctx["indiv_species"],
+        species_traits=ctx["species_traits"],
+        species_prey=ctx["species_prey"],
+        create_individual_fn=create_individual,
+        remove_individual_fn=remove_individual,
+        rng=ctx["rng"],
+        timer=timer,
+        events=ctx["events"],
+    )
+    return stats
+
+def _engine_label(state) -> str:
+    # moteur effectif : après un run array / spatial, la population est rendue au mode dict
+    return state.engine if state.population is not None else "dict"
+
+def step_world(ctx):
+    """Avance d'un step ; renvoie le statut d'arrêt (ou None)."""
+    state = ctx["state"]
+    metrics = ctx["metrics"]
+    engine = _engine_label(state)
+    timer = metrics.timer(engine) if metrics is not None else None
+    events = ctx["events"]
+    if events is not None:
+        events.t = state.t + 1
+
+    if state.population is not None:
+        ctx["last_step"] = POPULATION_STEPS[state.engine](state.population, state.params, ctx["rng"], timer=timer, events=events)
+        state.t += 1
+        status = update_history_from_counts(
+            counts=state.population.counts_by_species(),
+            n_active=state.population.n_alive,
+            history=state.history,
+            known_species=state.known_species,
+            t=state.t,
+            monitor=state.stop,
+        )
+    else:
+        ctx["last_step"] = _step_dict(ctx, timer)
+        state.t += 1
+        # effectifs tenus à jour par les wrappers create / remove : pas de regroupement par espèce
+        status = update_history_from_counts(
+            counts=state.species_counts,
+            n_active=len(state.active),
+            history=state.history,
+            known_species=state.known_species,
+            t=state.t,
+            monitor=state.stop,
+        )
+
+    if ctx["export"] is not None:
+        ctx["export"].record(state.t, state.history.last(), energy_stats(ctx))
+
+    if metrics is not None:
+        timer.lap("history")
+        timer.done()
+        metrics.inc("steps", engine)
+        metrics.inc("births", engine, ctx["last_step"]["births"])
+        metrics.inc("deaths", engine, ctx["last_step"]["deaths"])
+        if engine == "dict" and not ctx["lazy_overlay"]:  # overlay modifié pendant le step
+            metrics.inc("overlay_mutations", engine, ctx["last_step"]["births"] + ctx["last_step"]["deaths"])
+
+    if status:
+        state.running = False
+        state.frozen_reasoner = False
+        close_log(ctx)
+        close_export(ctx, status)
+        if not ctx["headless"]:
+            sync_world(ctx)
+            state.population = None
+
+    # en mode lazy / array, l'overlay n'a pas bougé : dirty au prochain sync_world
+    if state.population is None and not ctx["lazy_overlay"]:
+        ctx["reasoner"].mark_dirty()
+    return status
+
+def energy_stats(ctx) -> Dict[str, dict]:
+    """Par espèce présente : effectif, énergie moyenne / min / max ; moteurs NumPy : lu dans la population (pas de sync)."""
+    state = ctx["state"]
+    if state.population is not None:
+        return state.population.energy_stats()
+    return species_energy_stats(state.active, ctx["indiv_species"], state.energy)
+
+def species_energy_stats(active, species: Dict[int, str], energy: Dict[int, int]) -> Dict[str, dict]:
+    """energy_stats sur des individus donnés (id -> espèce, id -> énergie)."""
+    acc = {}
+    for i in active:
+        sp = species.get(i)
+        e = energy.get(i, 0)
+        a = acc.get(sp)
+        if a is None:
+            acc[sp] = [1, e, e, e]
+        else:
+            a[0] += 1
+            a[1] += e
+            a[2] = min(a[2], e)
+            a[3] = max(a[3], e)
+    return {
+        sp: {"count": n, "energy_mean": s / n, "energy_min": lo, "energy_max": hi}
+        for sp, (n, s, lo, hi) in acc.items() if sp is not None
+    }
+
+def meanfield_population(ctx) -> AggregatePopulation:
+    """Population courante en histogrammes espèce x énergie (point de départ du champ moyen) ; copie, sous le lock."""
+    sync_world(ctx)
+    state = ctx["state"]
+    return AggregatePopulation.from_state(
+        state.active, state.energy, ctx["indiv_species"],
+        ctx["species_traits"], ctx["species_prey"], state.known_species, state.params, ctx["ids"],
+    )
+
+def fast_forward(ctx, steps: int, tol: Optional[float] = None) -> dict:
+    """
+    Hors run : remplace la population par l'état du champ moyen après `steps`
+    steps (ou à l'équilibre si `tol`), arrondi espèce par espèce ; ids existants
+    conservés dans la limite des effectifs. Renvoie trajectoire et effectifs.
+    """
+    state = ctx["state"]
+    pop = meanfield_population(ctx)
+    res = meanfield_run(pop, state.params, steps, tol)
+    pop.hungry = round_histogram(pop.hungry + pop.fed)
+    pop.fed = np.zeros_like(pop.hungry)
+    pop.update_counts()
+    changed = pop.sync_to(ctx["overlay_g"], state.active, state.energy, ctx["indiv_species"])
+    if changed:
+        ctx["reasoner"].mark_dirty()
+    return dict(res, steps=len(res["times"]) - 1, counts=pop.counts_by_species())
+
+def sync_world(ctx) -> None:
+    """
+    Reporte dans overlay_g (en un batch) ce que la simulation a fait depuis
+    le dernier appel : population du moteur array, ou journal du mode lazy.
+    À appeler avant toute lecture de l'overlay.
+    """
+    state = ctx["state"]
+    metrics = ctx["metrics"]
+    t0 = time.perf_counter()
+    changed = ctx["overlay_journal"].flush(ctx["overlay_g"], ctx["ids"])
+    n = changed
+    if state.population is not None:
+        n += state.population.sync_to(ctx["overlay_g"], state.active, state.energy, ctx["indiv_species"])
+        changed = True
+    if changed:
+        ctx["reasoner"].mark_dirty()
+        if metrics is not None:
+            engine = _engine_label(state)
+            metrics.observe(engine, "sync", time.perf_counter() - t0)
+            metrics.inc("overlay_mutations", engine, n)